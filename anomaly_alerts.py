@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Roster-wide anomaly alerts
+
+Scans every athlete's weigh-ins and weekly assessments and writes an
+athlete_alerts row when a recent value is far from that athlete's own
+rolling baseline (|z| >= Z_THRESHOLD). The nutritionist alerts API reads
+those rows.
+
+- weight_change: change since the previous weigh-in day (first weigh-in
+  of the day), against the changes of the WEIGHT_BASELINE_DAYS before it;
+- sleep_hours, sleep_quality, appetite, water_intake: each assessment
+  answer, against the athlete's previous ASSESSMENT_BASELINE assessments.
+
+Athletes are processed CHUNK_SIZE at a time, one transaction per chunk.
+The weight series of a chunk is loaded into one athletes x days NumPy
+matrix (weight_cut.morning_matrix). anomaly_scan_state remembers what
+each athlete's data looked like at the last scan, so an incremental run
+only rescans athletes with new, changed or deleted rows:
+
+    python anomaly_alerts.py [db_path]            # incremental
+    python anomaly_alerts.py [db_path] --full     # every athlete
+
+Unacknowledged alerts of the last ALERT_DAYS are recomputed on every scan
+of an athlete; acknowledged ones are kept.
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from datetime import date, timedelta
+
+from weight_cut import morning_matrix
+
+Z_THRESHOLD = 3.0
+# Only values from the last ALERT_DAYS days raise alerts
+ALERT_DAYS = 14
+CHUNK_SIZE = 500
+
+WEIGHT_BASELINE_DAYS = 28
+# A change is only compared when the previous weigh-in is at most this many days older
+WEIGHT_MAX_GAP_DAYS = 3
+# Lower bounds for the baseline standard deviation, so a very steady
+# athlete is not flagged for ordinary noise
+WEIGHT_STD_FLOOR_KG = 0.3
+ASSESSMENT_BASELINE = 8
+ASSESSMENT_STD_FLOOR = 0.5
+MIN_BASELINE_POINTS = 4
+
+# Litres per unit of the questionnaire's waterUnit field
+WATER_UNITS = {'liters': 1.0, 'cups': 0.25, 'bottles': 0.5}
+# Range answers of the sleepHours question
+SLEEP_HOURS = {'less-than-6': 5.5, '6-7': 6.5, '7-8': 7.5, 'more-than-8': 8.5}
+
+METRICS = ('weight_change', 'sleep_hours', 'sleep_quality', 'appetite', 'water_intake')
+
+
+def data_signatures(conn):
+    """{athlete_id: (user_id, weight rows, max ts, assessment rows, max assessment id)}"""
+    weights = {row[0]: row[1:] for row in conn.execute(
+        'SELECT athlete_id, COUNT(*), MAX(ts) FROM weight_log GROUP BY athlete_id')}
+    assessments = {row[0]: row[1:] for row in conn.execute(
+        'SELECT athlete_id, COUNT(*), MAX(id) FROM weekly_assessments GROUP BY athlete_id')}
+    return {
+        athlete_id: (user_id,) + weights.get(user_id, (0, None)) + assessments.get(athlete_id, (0, None))
+        for athlete_id, user_id in conn.execute('SELECT id, user_id FROM athletes WHERE user_id IS NOT NULL ORDER BY id')
+    }
+
+
+def athletes_to_scan(conn, full=False):
+    """[(athlete_id, signature)] of every athlete, or only of those whose data changed since the last scan"""
+    signatures = data_signatures(conn)
+    if full:
+        return list(signatures.items())
+    scanned = {row[0]: tuple(row[1:]) for row in conn.execute(
+        'SELECT athlete_id, weight_rows, weight_max_ts, assessment_rows, assessment_max_id FROM anomaly_scan_state')}
+    return [(athlete_id, signature) for athlete_id, signature in signatures.items()
+            if scanned.get(athlete_id) != signature[1:]]
+
+
+def weight_alerts(athlete_ids, matrix, first_day, alert_from):
+    """Alert rows for day-over-day weight changes; matrix columns are first_day + j"""
+    import numpy as np  # deferred: only the batch job needs NumPy
+
+    n, days = matrix.shape
+    columns = np.arange(days)
+    seen = ~np.isnan(matrix)
+    # Column of the latest weigh-in strictly before each column (-1: none)
+    last_seen = np.maximum.accumulate(np.where(seen, columns, -1), axis=1)
+    previous = np.full((n, days), -1)
+    previous[:, 1:] = last_seen[:, :-1]
+    valid = seen & (previous >= 0) & (columns - previous <= WEIGHT_MAX_GAP_DAYS)
+    change = np.where(valid, matrix - np.take_along_axis(matrix, np.maximum(previous, 0), axis=1), 0.0)
+
+    # Rolling mean/std of the changes in the WEIGHT_BASELINE_DAYS columns before each column
+    def window_sum(values):
+        cumulative = np.zeros((n, days + 1))
+        cumulative[:, 1:] = np.cumsum(values, axis=1)
+        return cumulative[:, columns] - cumulative[:, np.maximum(columns - WEIGHT_BASELINE_DAYS, 0)]
+
+    count = window_sum(valid.astype(float))
+    total = window_sum(change)
+    total_sq = window_sum(change * change)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq - count * mean * mean, 0) / (count - 1))
+    std = np.maximum(np.nan_to_num(std), WEIGHT_STD_FLOOR_KG)
+    z = np.where(valid & (count >= MIN_BASELINE_POINTS), (change - mean) / std, 0.0)
+    z[:, :(alert_from - first_day).days] = 0.0
+
+    alerts = []
+    for i, j in zip(*np.nonzero(np.abs(z) >= Z_THRESHOLD)):
+        alerts.append((athlete_ids[i], 'weight_change', (first_day + timedelta(days=int(j))).isoformat(),
+                       round(float(change[i, j]), 2), round(float(mean[i, j]), 3),
+                       round(float(std[i, j]), 3), round(float(z[i, j]), 2)))
+    return alerts
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def assessment_values(answers):
+    """{metric: float} for the monitored answers of one assessment"""
+    sleep_hours = answers.get('sleepHours')
+    water = _number(answers.get('waterIntake'))
+    values = {
+        'sleep_hours': SLEEP_HOURS.get(sleep_hours, _number(sleep_hours)),
+        'sleep_quality': _number(answers.get('sleepQuality')),
+        'appetite': _number(answers.get('appetite')),
+        'water_intake': None if water is None else water * WATER_UNITS.get(answers.get('waterUnit') or 'liters', 1.0),
+    }
+    return {metric: value for metric, value in values.items() if value is not None}
+
+
+def assessment_alerts(rows, alert_from):
+    """Alert rows for assessments completed since alert_from; rows are (athlete_id, day, responses) in time order"""
+    series = {}
+    for athlete_id, day, responses in rows:
+        try:
+            answers = json.loads(responses or '{}')
+        except ValueError:
+            continue
+        if not isinstance(answers, dict):
+            continue
+        for metric, value in assessment_values(answers).items():
+            series.setdefault((athlete_id, metric), []).append((day, value))
+
+    # A handful of values per series: plain arithmetic beats NumPy's per-call overhead here
+    alerts = []
+    since = alert_from.isoformat()
+    for (athlete_id, metric), points in series.items():
+        for k in range(len(points) - 1, MIN_BASELINE_POINTS - 1, -1):
+            day, value = points[k]
+            if day < since:
+                break
+            baseline = [v for _, v in points[max(0, k - ASSESSMENT_BASELINE):k]]
+            mean = sum(baseline) / len(baseline)
+            variance = sum((v - mean) ** 2 for v in baseline) / (len(baseline) - 1)
+            std = max(math.sqrt(variance), ASSESSMENT_STD_FLOOR)
+            z = (value - mean) / std
+            if abs(z) >= Z_THRESHOLD:
+                alerts.append((athlete_id, metric, day, round(value, 2), round(mean, 3),
+                               round(std, 3), round(z, 2)))
+    return alerts
+
+
+def scan_chunk(conn, chunk, today):
+    """Recompute the alerts of one chunk of (athlete_id, signature); returns the alert rows written"""
+    athlete_ids = [athlete_id for athlete_id, _ in chunk]
+    user_ids = [signature[0] for _, signature in chunk]
+    alert_from = today - timedelta(days=ALERT_DAYS - 1)
+
+    first_day = alert_from - timedelta(days=WEIGHT_BASELINE_DAYS + WEIGHT_MAX_GAP_DAYS)
+    matrix = morning_matrix(conn, user_ids, first_day, (today - first_day).days + 1)
+    alerts = weight_alerts(athlete_ids, matrix, first_day, alert_from)
+
+    # Enough weekly assessments to fill the baseline of the oldest one that can alert
+    since = alert_from - timedelta(weeks=ASSESSMENT_BASELINE + 2)
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS scan_athletes (athlete_id INTEGER PRIMARY KEY)')
+    conn.execute('DELETE FROM scan_athletes')
+    conn.executemany('INSERT INTO scan_athletes (athlete_id) VALUES (?)', [(a,) for a in athlete_ids])
+    rows = conn.execute('''
+        SELECT w.athlete_id, DATE(w.completed_at), w.responses
+        FROM weekly_assessments w JOIN scan_athletes s ON s.athlete_id = w.athlete_id
+        WHERE w.completed_at >= ? AND w.completed_at < ?
+        ORDER BY w.athlete_id, w.completed_at, w.id
+    ''', (since.isoformat(), (today + timedelta(days=1)).isoformat())).fetchall()
+    alerts += assessment_alerts(rows, alert_from)
+
+    with conn:
+        conn.execute('''
+            DELETE FROM athlete_alerts
+            WHERE athlete_id IN (SELECT athlete_id FROM scan_athletes) AND day >= ? AND acknowledged_at IS NULL
+        ''', (alert_from.isoformat(),))
+        conn.executemany('''
+            INSERT OR IGNORE INTO athlete_alerts
+                (athlete_id, metric, day, value, baseline_mean, baseline_std, z_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', alerts)
+        conn.executemany('''
+            INSERT OR REPLACE INTO anomaly_scan_state
+                (athlete_id, weight_rows, weight_max_ts, assessment_rows, assessment_max_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(athlete_id,) + tuple(signature[1:]) for athlete_id, signature in chunk])
+        conn.execute('DELETE FROM scan_athletes')
+    return len(alerts)
+
+
+def run_scan(conn, full=False, today=None, chunk_size=CHUNK_SIZE, progress=None):
+    """Scan the roster (or, incrementally, the athletes with new data); returns a summary dict"""
+    today = today or date.today()
+    pending = athletes_to_scan(conn, full)
+    summary = {'athletes': len(pending), 'chunks': 0, 'alerts': 0}
+    for start in range(0, len(pending), chunk_size):
+        summary['alerts'] += scan_chunk(conn, pending[start:start + chunk_size], today)
+        summary['chunks'] += 1
+        if progress:
+            progress(f"   {min(start + chunk_size, len(pending))}/{len(pending)} athletes")
+    return summary
+
+
+def main():
+    from database import DATABASE, get_db_connection
+
+    parser = argparse.ArgumentParser(description='Write z-score alerts for weight and assessment anomalies')
+    parser.add_argument('db_path', nargs='?', default=DATABASE)
+    parser.add_argument('--full', action='store_true', help='Rescan every athlete, not only those with new data')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    conn = get_db_connection(args.db_path)
+    started = time.perf_counter()
+    summary = run_scan(conn, full=args.full, chunk_size=args.chunk_size, progress=print)
+    elapsed = time.perf_counter() - started
+    open_alerts = dict(conn.execute('''
+        SELECT metric, COUNT(*) FROM athlete_alerts WHERE acknowledged_at IS NULL GROUP BY metric
+    ''').fetchall())
+    conn.close()
+    print(f"🔎 Scanned {summary['athletes']} athletes in {summary['chunks']} chunks "
+          f"({elapsed:.2f}s), {summary['alerts']} alerts written")
+    for metric in METRICS:
+        print(f"   {metric}: {open_alerts.get(metric, 0)} open")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,60 +1,160 @@
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+import sqlite3
+from flask import Flask, Blueprint, render_template, request, jsonify, session, redirect, url_for, send_file, current_app
 from datetime import datetime, date, timedelta
 import json
-import secrets
+import time
+import threading
 import uuid
-from database import init_db, get_db_connection
+import database
+from database import (DATABASE, get_db_connection, InvalidWeightEntry, add_weight_entries, get_weight_series,
+                      create_user, get_user_by_email, get_user_by_id, update_password_hash, get_messages_after,
+                      search_athletes, mark_messages_as_read, get_unread_messages_count)
+from migrations import ensure_schema
+from job_queue import queue_stats
+from mail_outbox import OutboxSender, SMTPTransport, ConsoleTransport, enqueue_email, outbox_counts
+import fragment_cache
+import sql_profiler
+import metrics
+import rate_limit
+import structured_logging
+from structured_logging import sampled_debug
+from password_hashing import HashingBusy, hash_password, check_password
+from reset_tokens import ResetTokenSweeper, create_reset_token, find_reset_token_user, consume_reset_token
+from fragment_cache import data_versions
+from chat_events import notifier as chat_notifier
+from chat_search import MIN_TERM_LENGTH, search_messages
+from attachments import (CHUNK_SIZE, UploadError, accessible_attachment, blob_path, completed_upload, create_upload,
+                         is_sha256, thumbnail_path, thumbnailer, upload_status, write_chunk)
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+# All pages and API routes live on this blueprint; create_app() registers it
+main = Blueprint('main', __name__)
 
-# Initialize database
-init_db()
+# No DDL at import: the first get_db_connection() per database file runs the
+# pending migrations (migrations.ensure_schema)
+
+# Outgoing mail goes through the mail_outbox table and a background sender.
+# Without MAIL_SERVER the messages are printed to the console.
+if os.environ.get('MAIL_SERVER'):
+    mail_transport = SMTPTransport(
+        os.environ['MAIL_SERVER'],
+        int(os.environ.get('MAIL_PORT', 587)),
+        username=os.environ.get('MAIL_USERNAME'),
+        password=os.environ.get('MAIL_PASSWORD'),
+        use_tls=os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true',
+        sender=os.environ.get('MAIL_DEFAULT_SENDER')
+    )
+else:
+    mail_transport = ConsoleTransport()
+outbox = OutboxSender(DATABASE, mail_transport)
+
+def mail_outbox_depth():
+    ensure_schema(outbox.db_path)
+    conn = sqlite3.connect(outbox.db_path)
+    try:
+        return [({'status': status}, count) for status, count in outbox_counts(conn).items()]
+    finally:
+        conn.close()
+
+# Background work (rollups, anomaly scans, ...) is queued in the jobs table and run by
+# `python job_queue.py worker`, a separate process with its own pool
+def background_job_depth():
+    ensure_schema(database.DATABASE)
+    conn = sqlite3.connect(database.DATABASE)
+    try:
+        return [({'queue': queue, 'status': status}, count)
+                for (queue, status), (count, due) in queue_stats(conn).items()]
+    finally:
+        conn.close()
+
+# Upper bound for ?timeout= of /api/chat/wait (seconds)
+CHAT_WAIT_MAX_TIMEOUT = 30
+
+# Expired reset tokens are deleted in the background once tokens are being issued
+reset_token_sweeper = ResetTokenSweeper(DATABASE)
 
 # Simple in-memory storage for demo purposes
 # In production, this would be replaced with a proper database
 users = {}
 athletes = {}
 nutritionists = {}
-weight_entries = {}
 assessments = {}
 tasks = {}
 chat_messages = {}
 
+# Maximum number of weigh-ins accepted in one /api/weight/sync batch
+WEIGHT_SYNC_MAX_BATCH = 500
+
+# weight_cut.STATUSES (kept here so importing the app doesn't import the planner)
+WEIGHT_CUT_STATUSES = ('on_track', 'behind', 'ahead', 'no_data')
+# Metrics of the athlete_alerts rows written by `python anomaly_alerts.py`
+ALERT_METRICS = ('weight_change', 'sleep_hours', 'sleep_quality', 'appetite', 'water_intake')
+# Cohort dimensions of the cohort_weekly rollup (cohort_rollups.py)
+COHORT_DIMENSIONS = ('weight_category', 'sport_level', 'gender', 'all')
+
 # Helper functions
 def generate_id():
     return str(len(users) + 1)
 
-def hash_password(password):
-    # Simple hash for demo - in production use proper hashing
-    return password + "_hashed"
+def hashing_busy_response(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status_code
+
+def user_to_dict(row):
+    return {
+        'id': row['id'],
+        'email': row['email'],
+        'role': row['role'],
+        'created_at': row['created_at'],
+        'is_active': bool(row['is_active'])
+    }
+
+def message_to_dict(msg):
+    return {
+        'id': msg['id'],
+        'sender_id': msg['sender_id'],
+        'receiver_id': msg['receiver_id'],
+        'role': msg['role'],
+        'message': msg['message'],
+        'timestamp': msg['timestamp'],
+        'message_type': msg['message_type'],
+        'context': msg['context'],
+        'is_read': bool(msg['is_read'])
+    }
 
-def check_password(password, hashed):
-    return hash_password(password) == hashed
+def weight_entry_to_dict(athlete_id, entry):
+    return {
+        'athlete_id': athlete_id,
+        'weight': entry['weight'],
+        'date': entry['day'],
+        'ts': entry['ts'],
+        'timing': entry['timing'],
+        'notes': entry['notes']
+    }
 
 # Routes
-@app.route('/')
+@main.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/athlete')
+@main.route('/athlete')
 def athlete_dashboard():
     if 'user_id' not in session or session.get('role') != 'athlete':
         return redirect('/')
     return render_template('athlete_home.html')
 
-@app.route('/nutritionist')
+@main.route('/nutritionist')
 def nutritionist_dashboard():
     if 'user_id' not in session or session.get('role') != 'nutritionist':
         return redirect('/')
     return render_template('nutritionist_dashboard.html')
 
-@app.route('/chat')
-@app.route('/chat/<int:other_user_id>')
+@main.route('/chat')
+@main.route('/chat/<int:other_user_id>')
 def chat(other_user_id=None):
     if 'user_id' not in session:
         return redirect('/')
@@ -80,12 +180,12 @@ def chat(other_user_id=None):
                          current_user_id=session['user_id'],
                          current_username=session.get('user_email', 'User'))
 
-@app.route('/forgot_password')
+@main.route('/forgot_password')
 def forgot_password():
     return render_template('forgot_password.html')
 
 # API Routes
-@app.route('/api/register', methods=['POST'])
+@main.route('/api/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
@@ -96,16 +196,21 @@ def register():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
+        if data['role'] not in ('athlete', 'nutritionist'):
+            return jsonify({'error': 'Role must be athlete or nutritionist'}), 400
+        
         # Check if user already exists
-        if data['email'] in users:
+        if get_user_by_email(data['email']):
             return jsonify({'error': 'User already exists'}), 409
         
-        # Create user
-        user_id = generate_id()
+        # Create user (credentials in judo.db, profile kept in memory)
+        password_hash = hash_password(data['password'], client=request.remote_addr)
+        user_id = create_user(data['email'], password_hash, data['role'])
+        if user_id is None:
+            return jsonify({'error': 'User already exists'}), 409
         users[user_id] = {
             'id': user_id,
             'email': data['email'],
-            'password_hash': hash_password(data['password']),
             'role': data['role'],
             'created_at': datetime.utcnow().isoformat(),
             'is_active': True
@@ -135,20 +240,26 @@ def register():
                 'experience_years': data.get('experience_years'),
                 'created_at': datetime.utcnow().isoformat()
             }
+        # Profiles are kept in memory, out of sight of the data_versions triggers
+        data_versions.bump('roster')
         
         # Log in the user
         session['user_id'] = user_id
         session['user_role'] = data['role']
+        session['role'] = data['role']
         
         return jsonify({
             'message': 'Registration successful',
             'user': users[user_id]
         }), 201
         
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/login', methods=['POST'])
+@main.route('/api/login', methods=['POST'])
+@rate_limit.limit('login')
 def login():
     try:
         data = request.get_json()
@@ -157,13 +268,9 @@ def login():
             return jsonify({'error': 'Email and password required'}), 400
         
         # Find user by email
-        user = None
-        for user_id, user_data in users.items():
-            if user_data['email'] == data['email']:
-                user = user_data
-                break
+        user = get_user_by_email(data['email'])
         
-        if not user or not check_password(data['password'], user['password_hash']):
+        if not user or not check_password(user['password_hash'], data['password'], client=request.remote_addr):
             return jsonify({'error': 'Invalid email or password'}), 401
         
         if not user['is_active']:
@@ -171,21 +278,25 @@ def login():
         
         session['user_id'] = user['id']
         session['user_role'] = user['role']
+        session['role'] = user['role']
         
         return jsonify({
             'message': 'Login successful',
-            'user': user
+            'user': users.get(user['id']) or user_to_dict(user)
         })
         
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/logout', methods=['POST'])
+@main.route('/api/logout', methods=['POST'])
 def logout():
     session.clear()
     return jsonify({'message': 'Logout successful'})
 
-@app.route('/api/forgot_password', methods=['POST'])
+@main.route('/api/forgot_password', methods=['POST'])
+@rate_limit.limit('forgot_password')
 def forgot_password_api():
     """
     API endpoint for password reset request
@@ -194,8 +305,8 @@ def forgot_password_api():
     1. Receive email from request
     2. Check if user exists in database
     3. Generate unique reset token (UUID)
-    4. Save token in users.reset_token column
-    5. Simulate email sending with reset link
+    4. Save the token's hash in reset_tokens (expires after 24 hours)
+    5. Queue the reset email in the mail outbox (sent in the background)
     
     Returns:
         - Success: Email sent confirmation with token (for demo)
@@ -214,30 +325,22 @@ def forgot_password_api():
         user = cursor.fetchone()
         
         if not user:
+            conn.close()
             return jsonify({'error': 'User not found'}), 404
         
-        # Generate reset token (in production, use a proper token generator)
-        import secrets
-        reset_token = secrets.token_urlsafe(32)
-        
-        # Update user with reset token
-        cursor.execute('UPDATE users SET reset_token = ? WHERE id = ?', (reset_token, user['id']))
+        # Token and email are committed together; the SMTP round trip happens off the request
+        reset_token = create_reset_token(conn, user['id'])
+        reset_link = f"http://localhost:5000/reset_password?token={reset_token}"
+        enqueue_email(
+            conn,
+            user['email'],
+            'איפוס סיסמה - Judo Nutrition',
+            f"שלום! לחץ/י על הקישור הבא לאיפוס הסיסמה שלך:\n{reset_link}\n\n⚠️  הקישור תקף ל-24 שעות"
+        )
         conn.commit()
         conn.close()
-        
-        # In production, send email with reset link
-        # For demo purposes, simulate email sending
-        reset_link = f"http://localhost:5000/reset_password?token={reset_token}"
-        
-        # Simulate email sending (in production, use proper email service)
-        print(f"📧 EMAIL SIMULATION:")
-        print(f"   To: {user['email']}")
-        print(f"   Subject: איפוס סיסמה - Judo Nutrition")
-        print(f"   Body: שלום! לחץ/י על הקישור הבא לאיפוס הסיסמה שלך:")
-        print(f"   Link: {reset_link}")
-        print(f"   Token: {reset_token}")
-        print(f"   ⚠️  הקישור תקף ל-24 שעות")
-        print(f"📧 END EMAIL SIMULATION")
+        outbox.wake()
+        reset_token_sweeper.start()
         
         return jsonify({
             'message': f'אימייל לאיפוס סיסמה נשלח ל-{user["email"]}',
@@ -249,7 +352,8 @@ def forgot_password_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/send_message', methods=['POST'])
+@main.route('/api/send_message', methods=['POST'])
+@rate_limit.limit('send_message')
 def send_message_api():
     """
     API endpoint for sending messages
@@ -266,43 +370,63 @@ def send_message_api():
         
         data = request.get_json()
         
-        if not data or 'receiver_id' not in data or 'content' not in data:
+        if not data or 'receiver_id' not in data or ('content' not in data and 'upload_id' not in data):
             return jsonify({'error': 'Receiver ID and content are required'}), 400
         
         sender_id = session['user_id']
         receiver_id = data['receiver_id']
-        content = data['content'].strip()
+        content = (data.get('content') or '').strip()
+        upload_id = data.get('upload_id')
         
-        if not content:
+        if not content and not upload_id:
             return jsonify({'error': 'Message content cannot be empty'}), 400
         
         # בדוק שהמשתמש השני קיים
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM users WHERE id = ?', (receiver_id,))
-        receiver = cursor.fetchone()
-        
-        if not receiver:
-            return jsonify({'error': 'Receiver not found'}), 404
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM users WHERE id = ?', (receiver_id,))
+            receiver = cursor.fetchone()
+            
+            if not receiver:
+                return jsonify({'error': 'Receiver not found'}), 404
+            
+            # קובץ מצורף: העלאה שהסתיימה של השולח (attachments.py)
+            message_type, context, attachment = 'text', None, None
+            if upload_id:
+                upload = completed_upload(conn, upload_id, sender_id)
+                message_type = 'image' if upload['content_type'].startswith('image/') else 'file'
+                context = json.dumps({'attachment': upload['sha256'], 'filename': upload['filename'],
+                                      'content_type': upload['content_type'], 'size': upload['size']})
+                attachment = (upload['sha256'], upload['filename'])
+                content = content or upload['filename']
+        finally:
+            conn.close()
         
         # שמור את ההודעה במסד הנתונים
         from database import add_message
-        add_message(sender_id, receiver_id, content, None)  # role will be fetched automatically
-        
-        conn.close()
+        add_message(sender_id, receiver_id, content, None,  # role will be fetched automatically
+                    message_type=message_type, context=context, attachment=attachment)
+        chat_notifier.publish(receiver_id)
+        chat_notifier.publish(sender_id)
         
         return jsonify({
             'success': True,
             'message': 'Message sent successfully'
         })
         
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/get_messages', methods=['GET'])
+@main.route('/api/get_messages', methods=['GET'])
 def get_messages_api():
     """
     API endpoint for getting messages between two users
+    
+    Newest first. Older pages: ?before_timestamp=&before_id= of the oldest
+    message already shown (archived history is read on demand).
     """
     try:
         if 'user_id' not in session:
@@ -314,6 +438,11 @@ def get_messages_api():
         if not user2_id:
             return jsonify({'error': 'User2 ID is required'}), 400
         
+        before_timestamp = request.args.get('before_timestamp')
+        before_id = request.args.get('before_id', type=int)
+        if (before_timestamp is None) != (before_id is None):
+            return jsonify({'error': 'before_timestamp and before_id go together'}), 400
+        
         # בדוק שהמשתמש השני קיים
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -325,22 +454,12 @@ def get_messages_api():
         
         # קבל הודעות
         from database import get_messages
-        messages = get_messages(user1_id, user2_id, limit=50)
+        messages = get_messages(user1_id, user2_id, limit=50,
+                                before=(before_timestamp, before_id) if before_id is not None else None)
         
         # המר לרשימה של dictionaries
-        messages_list = []
-        for msg in messages:
-            messages_list.append({
-                'id': msg['id'],
-                'sender_id': msg['sender_id'],
-                'receiver_id': msg['receiver_id'],
-                'role': msg['role'],
-                'message': msg['message'],
-                'timestamp': msg['timestamp'],
-                'message_type': msg['message_type'],
-                'context': msg['context'],
-                'is_read': bool(msg['is_read'])
-            })
+        messages_list = [message_to_dict(msg) for msg in messages]
+        sampled_debug(logger, 'messages fetched', user1_id=user1_id, user2_id=user2_id, count=len(messages_list))
         
         conn.close()
         
@@ -352,7 +471,270 @@ def get_messages_api():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reset_password', methods=['POST'])
+@main.route('/api/chat/wait', methods=['GET'])
+def chat_wait_api():
+    """
+    Long-poll for new messages between the user and user2_id
+    
+    Returns immediately when there are messages with id > after_id,
+    otherwise waits up to timeout seconds for send_message to publish one
+    (empty list on timeout). The client sends the last id it has as after_id.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        user1_id = session['user_id']
+        user2_id = request.args.get('user2_id', type=int)
+        after_id = request.args.get('after_id', 0, type=int)
+        timeout = min(max(request.args.get('timeout', 25, type=float), 0), CHAT_WAIT_MAX_TIMEOUT)
+        
+        if not user2_id:
+            return jsonify({'error': 'User2 ID is required'}), 400
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            # Read the version first so a message stored after the query still wakes us
+            version = chat_notifier.version(user1_id)
+            messages = get_messages_after(user1_id, user2_id, after_id)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                break
+            chat_notifier.wait(user1_id, version, remaining)
+        
+        messages_list = [message_to_dict(msg) for msg in messages]
+        return jsonify({
+            'success': True,
+            'messages': messages_list,
+            'last_id': messages_list[-1]['id'] if messages_list else after_id
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/chat/search', methods=['GET'])
+def chat_search_api():
+    """
+    Full-text search in the user's own conversations
+    
+    ?q= (words of at least 3 characters, all must match), optional
+    ?user2_id= to search one conversation, ?limit= (max 50) and ?offset=.
+    The most recent matches are ranked by relevance; snippet is HTML with
+    <mark> around matches. Older matches: ?before_id=<next_before_id>.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        query = request.args.get('q', '')
+        user2_id = request.args.get('user2_id', type=int)
+        limit = min(request.args.get('limit', 20, type=int), 50)
+        offset = request.args.get('offset', 0, type=int)
+        before_id = request.args.get('before_id', type=int)
+        
+        conn = get_db_connection()
+        rows, terms, next_before_id = search_messages(conn, session['user_id'], query, user2_id,
+                                                      limit, offset, before_id)
+        conn.close()
+        if not terms:
+            return jsonify({'error': f'Search needs a word of at least {MIN_TERM_LENGTH} characters'}), 400
+        
+        results = []
+        for row in rows:
+            result = message_to_dict(row)
+            result['snippet'] = row['snippet']
+            result['score'] = row['score']
+            results.append(result)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'next_before_id': next_before_id
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/chat/read', methods=['POST'])
+def chat_read_api():
+    """
+    Mark the conversation with user2_id as read, up to last_read_id
+    (default: its newest message). One watermark upsert, see read_watermarks.py.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        data = request.get_json(silent=True) or {}
+        user2_id = data.get('user2_id')
+        last_read_id = data.get('last_read_id')
+        if not isinstance(user2_id, int):
+            return jsonify({'error': 'User2 ID is required'}), 400
+        if last_read_id is not None and not isinstance(last_read_id, int):
+            return jsonify({'error': 'last_read_id must be a message id'}), 400
+        
+        last_read_id = mark_messages_as_read(session['user_id'], user2_id, last_read_id)
+        return jsonify({'success': True, 'last_read_id': last_read_id})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/chat/unread', methods=['GET'])
+def chat_unread_api():
+    """
+    Unread message counts of the caller, in total and per sender
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        by_sender = get_unread_messages_count(session['user_id'], by_sender=True)
+        return jsonify({
+            'success': True,
+            'total': sum(by_sender.values()),
+            'by_sender': {str(sender_id): count for sender_id, count in by_sender.items()}
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/uploads', methods=['POST'])
+def create_upload_api():
+    """
+    Start a chunked upload (meal photo, lab results)
+    
+    JSON {filename, size, content_type}. The answer gives upload_id,
+    chunk_size and the number of chunks to PUT; see attachments.py.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        data = request.get_json(silent=True) or {}
+        conn = get_db_connection()
+        try:
+            status = create_upload(conn, current_app.config['UPLOAD_FOLDER'], session['user_id'],
+                                   data.get('filename'), data.get('size'), data.get('content_type'))
+        finally:
+            conn.close()
+        return jsonify(status), 201
+    
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status_api(upload_id):
+    """
+    Chunks received so far, for resuming an interrupted upload
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        conn = get_db_connection()
+        try:
+            return jsonify(upload_status(conn, current_app.config['UPLOAD_FOLDER'], upload_id, session['user_id']))
+        finally:
+            conn.close()
+    
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk_api(upload_id, index):
+    """
+    Store one chunk (raw request body). The answer to the last missing
+    chunk has complete=true and the attachment hash.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        if request.content_length is None or request.content_length > CHUNK_SIZE:
+            return jsonify({'error': f'Chunks are at most {CHUNK_SIZE} bytes'}), 413
+        
+        conn = get_db_connection()
+        try:
+            status = write_chunk(conn, current_app.config['UPLOAD_FOLDER'], upload_id, session['user_id'],
+                                 index, request.get_data(cache=False))
+        finally:
+            conn.close()
+        return jsonify(status)
+    
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _attachment_response(path, mimetype, sha256, download_name=None, as_attachment=False):
+    # Range requests (206) and If-None-Match come from send_file(conditional=True)
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=sha256, max_age=86400,
+                         download_name=download_name, as_attachment=as_attachment)
+    # Private medical data: browsers may cache it, shared caches must not
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@main.route('/api/attachments/<sha256>', methods=['GET'])
+def download_attachment_api(sha256):
+    """
+    Download an attachment (Range requests supported). Only the uploader
+    and the participants of a message that carries it have access.
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not is_sha256(sha256):
+            return jsonify({'error': 'Attachment not found'}), 404
+        
+        conn = get_db_connection()
+        try:
+            attachment = accessible_attachment(conn, sha256, session['user_id'])
+        finally:
+            conn.close()
+        if attachment is None:
+            return jsonify({'error': 'Attachment not found'}), 404
+        
+        # PDFs and other files are downloaded rather than rendered in the page's origin
+        return _attachment_response(blob_path(current_app.config['UPLOAD_FOLDER'], sha256),
+                                    attachment['content_type'], sha256, attachment['filename'],
+                                    as_attachment=not attachment['content_type'].startswith('image/'))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/attachments/<sha256>/thumbnail', methods=['GET'])
+def attachment_thumbnail_api(sha256):
+    """
+    JPEG thumbnail of an image attachment; 202 while it is being made
+    """
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not is_sha256(sha256):
+            return jsonify({'error': 'Attachment not found'}), 404
+        
+        conn = get_db_connection()
+        try:
+            attachment = accessible_attachment(conn, sha256, session['user_id'])
+        finally:
+            conn.close()
+        if attachment is None or attachment['thumbnail'] in ('none', 'failed'):
+            return jsonify({'error': 'Thumbnail not available'}), 404
+        if attachment['thumbnail'] == 'pending':
+            return jsonify({'status': 'pending'}), 202, {'Retry-After': '1'}
+        
+        return _attachment_response(thumbnail_path(current_app.config['UPLOAD_FOLDER'], sha256),
+                                    'image/jpeg', f'{sha256}-thumbnail')
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/reset_password', methods=['POST'])
 def reset_password_api():
     try:
         data = request.get_json()
@@ -361,27 +743,31 @@ def reset_password_api():
             return jsonify({'error': 'Reset token and new password are required'}), 400
         
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Find user by reset token
-        cursor.execute('SELECT id FROM users WHERE reset_token = ?', (data['reset_token'],))
-        user = cursor.fetchone()
-        
-        if not user:
-            return jsonify({'error': 'Invalid reset token'}), 400
-        
-        # Update password and clear reset token
-        cursor.execute('UPDATE users SET password = ?, reset_token = NULL WHERE id = ?', 
-                      (hash_password(data['new_password']), user['id']))
-        conn.commit()
-        conn.close()
+        try:
+            # Check the token before spending CPU on the new hash
+            if find_reset_token_user(conn, data['reset_token']) is None:
+                return jsonify({'error': 'Invalid or expired reset token'}), 400
+            
+            password_hash = hash_password(data['new_password'], client=request.remote_addr)
+            
+            # Use up the token and update the password in one transaction (other open tokens go too)
+            user_id = consume_reset_token(conn, data['reset_token'])
+            if user_id is None:
+                conn.rollback()
+                return jsonify({'error': 'Invalid or expired reset token'}), 400
+            update_password_hash(user_id, password_hash, conn)
+            conn.commit()
+        finally:
+            conn.close()
         
         return jsonify({'message': 'Password reset successfully'})
         
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/user/profile', methods=['GET'])
+@main.route('/api/user/profile', methods=['GET'])
 def get_user_profile():
     try:
         if 'user_id' not in session:
@@ -391,7 +777,10 @@ def get_user_profile():
         user = users.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            row = get_user_by_id(user_id)
+            if not row:
+                return jsonify({'error': 'User not found'}), 404
+            user = user_to_dict(row)
         
         profile_data = user.copy()
         
@@ -405,7 +794,7 @@ def get_user_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/weight', methods=['POST', 'GET'])
+@main.route('/api/weight', methods=['POST', 'GET'])
 def weight_management():
     try:
         if 'user_id' not in session or session.get('role') != 'athlete':
@@ -416,40 +805,80 @@ def weight_management():
         if request.method == 'POST':
             data = request.get_json()
             
-            if 'weight' not in data:
+            if not data or 'weight' not in data:
                 return jsonify({'error': 'Weight is required'}), 400
             
-            entry_id = generate_id()
-            weight_entries[entry_id] = {
-                'id': entry_id,
-                'athlete_id': user_id,
-                'weight': float(data['weight']),
-                'date': data.get('date', date.today().isoformat()),
+            entry = {
+                'day': data.get('date', date.today().isoformat()),
+                'ts': int(time.time() * 1000),
+                'weight': data['weight'],
                 'timing': data.get('timing'),
-                'notes': data.get('notes'),
-                'created_at': datetime.utcnow().isoformat()
+                'notes': data.get('notes')
             }
+            # The weight_log triggers bump the athlete and roster data versions
+            try:
+                add_weight_entries(user_id, [entry])
+            except InvalidWeightEntry as e:
+                return jsonify({'error': e.problem.capitalize()}), 400
+            entry['weight'] = float(entry['weight'])
+            sampled_debug(logger, 'weight entry stored', athlete_id=user_id, day=entry['day'], timing=entry['timing'])
             
             return jsonify({
                 'message': 'Weight entry added successfully',
-                'entry': weight_entries[entry_id]
+                'entry': weight_entry_to_dict(user_id, entry)
             }), 201
         
         elif request.method == 'GET':
-            # Get weight entries for this athlete
-            athlete_entries = [
-                entry for entry in weight_entries.values() 
-                if entry['athlete_id'] == user_id
-            ]
+            series = get_weight_series(user_id, request.args.get('since'))
+            
+            # Column-oriented payload used by the athlete weight tab
+            if request.args.get('format') == 'series':
+                return jsonify({'series': series})
             
             return jsonify({
-                'entries': athlete_entries
+                'entries': [weight_entry_to_dict(user_id, dict(zip(series, row))) for row in zip(*series.values())]
             })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/assessment', methods=['POST', 'GET'])
+@main.route('/api/weight/sync', methods=['POST'])
+def weight_sync():
+    """
+    Batch upload of weigh-ins queued by the client while offline.
+    
+    Entries are identified by (day, ts), so re-sending a batch is harmless.
+    Returns the merged series so the client can replace its local copy.
+    An invalid entry rejects the whole batch with 400 and its index.
+    """
+    try:
+        if 'user_id' not in session or session.get('role') != 'athlete':
+            return jsonify({'error': 'Athlete access required'}), 403
+        
+        user_id = session['user_id']
+        data = request.get_json()
+        entries = data.get('entries') if data else None
+        
+        if not isinstance(entries, list):
+            return jsonify({'error': 'Entries list is required'}), 400
+        if len(entries) > WEIGHT_SYNC_MAX_BATCH:
+            return jsonify({'error': f'At most {WEIGHT_SYNC_MAX_BATCH} entries per batch'}), 413
+        
+        try:
+            inserted = add_weight_entries(user_id, entries)
+        except InvalidWeightEntry as e:
+            # The index lets the client drop the bad entry instead of resending the batch
+            return jsonify({'error': str(e), 'index': e.index}), 400
+        
+        return jsonify({
+            'inserted': inserted,
+            'series': get_weight_series(user_id)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/assessment', methods=['POST', 'GET'])
 def assessment_management():
     try:
         if 'user_id' not in session or session.get('role') != 'athlete':
@@ -475,6 +904,7 @@ def assessment_management():
                 'answers': data['answers'],
                 'submitted_at': datetime.utcnow().isoformat()
             }
+            data_versions.bump('athlete', user_id)
             
             return jsonify({
                 'message': 'Assessment submitted successfully',
@@ -497,7 +927,7 @@ def assessment_management():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/tasks', methods=['GET', 'POST', 'PUT'])
+@main.route('/api/tasks', methods=['GET', 'POST', 'PUT'])
 def task_management():
     try:
         if 'user_id' not in session or session.get('role') != 'athlete':
@@ -570,7 +1000,7 @@ def task_management():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/athlete/dashboard', methods=['GET'])
+@main.route('/api/athlete/dashboard', methods=['GET'])
 def athlete_dashboard_data():
     try:
         if 'user_id' not in session or session.get('role') != 'athlete':
@@ -580,11 +1010,8 @@ def athlete_dashboard_data():
         
         # Get recent weight entries (last 7 days)
         week_ago = date.today() - timedelta(days=7)
-        recent_weights = [
-            entry for entry in weight_entries.values()
-            if entry['athlete_id'] == user_id and 
-            datetime.fromisoformat(entry['date']).date() >= week_ago
-        ]
+        series = get_weight_series(user_id, week_ago.isoformat())
+        recent_weights = [weight_entry_to_dict(user_id, dict(zip(series, row))) for row in zip(*series.values())]
         
         # Get latest assessment
         athlete_assessments = [
@@ -609,14 +1036,293 @@ def athlete_dashboard_data():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@main.route('/api/nutritionist/athletes', methods=['GET'])
+def nutritionist_athletes():
+    """
+    Paginated, server-side filtered athlete list
+    
+    ?q= prefix of the name or email, ?weight_category=, ?sport_level=,
+    ?competition_within= (days), ?has_unread=1 (unread messages to the
+    caller), ?limit= (default 50, max 100) and ?offset=.
+    """
+    try:
+        if 'user_id' not in session or session.get('role') != 'nutritionist':
+            return jsonify({'error': 'Nutritionist access required'}), 403
+        
+        competition_within = request.args.get('competition_within', type=int)
+        if competition_within is not None and not 0 <= competition_within <= 365:
+            return jsonify({'error': 'competition_within must be between 0 and 365 days'}), 400
+        limit = max(1, min(request.args.get('limit', 50, type=int), 100))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        
+        rows, has_more = search_athletes(
+            session['user_id'],
+            query=request.args.get('q', '').strip() or None,
+            weight_category=request.args.get('weight_category', type=float),
+            sport_level=request.args.get('sport_level') or None,
+            competition_within_days=competition_within,
+            has_unread=request.args.get('has_unread') in ('1', 'true'),
+            limit=limit, offset=offset
+        )
+        
+        return jsonify({
+            'athletes': [dict(row) for row in rows],
+            'has_more': has_more,
+            'next_offset': offset + len(rows) if has_more else None
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/nutritionist/competitions', methods=['GET'])
+def nutritionist_competitions():
+    """
+    Upcoming competitions with each athlete's weight-cut status
+    
+    Reads weight_cut_plans (recomputed nightly by `python weight_cut.py`).
+    Optional ?status=behind|ahead|on_track|no_data, ?limit= and ?offset=.
+    """
+    try:
+        if 'user_id' not in session or session.get('role') != 'nutritionist':
+            return jsonify({'error': 'Nutritionist access required'}), 403
+        
+        status = request.args.get('status')
+        if status and status not in WEIGHT_CUT_STATUSES:
+            return jsonify({'error': f'Status must be one of {", ".join(WEIGHT_CUT_STATUSES)}'}), 400
+        limit = min(request.args.get('limit', 100, type=int), 500)
+        offset = request.args.get('offset', 0, type=int)
+        
+        conn = get_db_connection()
+        rows = conn.execute(f'''
+            SELECT p.*, a.user_id, a.name, a.weight_category, c.name AS competition_name
+            FROM weight_cut_plans p
+            JOIN athletes a ON a.id = p.athlete_id
+            JOIN competitions c ON c.id = p.competition_id
+            {'WHERE p.status = ?' if status else ''}
+            ORDER BY p.competition_date, p.athlete_id
+            LIMIT ? OFFSET ?
+        ''', ((status,) if status else ()) + (limit, offset)).fetchall()
+        conn.close()
+        
+        return jsonify({'competitions': [dict(row) for row in rows]})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/nutritionist/competitions/<int:athlete_id>', methods=['GET'])
+def nutritionist_competition_plan(athlete_id):
+    """Planned daily weights for one athlete's next competition next to their morning weigh-ins"""
+    try:
+        if 'user_id' not in session or session.get('role') != 'nutritionist':
+            return jsonify({'error': 'Nutritionist access required'}), 403
+        
+        conn = get_db_connection()
+        plan = conn.execute('''
+            SELECT p.*, a.user_id, a.name, c.name AS competition_name
+            FROM weight_cut_plans p
+            JOIN athletes a ON a.id = p.athlete_id
+            JOIN competitions c ON c.id = p.competition_id
+            WHERE p.athlete_id = ?
+        ''', (athlete_id,)).fetchone()
+        if not plan:
+            conn.close()
+            return jsonify({'error': 'No upcoming competition plan for this athlete'}), 404
+        
+        from weight_cut import plan_trajectory
+        trajectory = plan_trajectory(plan)
+        weigh_ins = conn.execute('''
+            SELECT day, weight FROM weight_log
+            WHERE athlete_id = ? AND day >= ? AND day <= ?
+            ORDER BY day, ts
+        ''', (plan['user_id'], trajectory[0]['day'], trajectory[-1]['day'])).fetchall()
+        conn.close()
+        
+        # First weigh-in of each day
+        actual = {}
+        for row in weigh_ins:
+            actual.setdefault(row['day'], row['weight'])
+        for point in trajectory:
+            point['actual'] = actual.get(point['day'])
+        
+        return jsonify({'plan': dict(plan), 'trajectory': trajectory})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/nutritionist/alerts', methods=['GET'])
+def nutritionist_alerts():
+    """
+    Open anomaly alerts, largest |z| first
+    
+    Reads athlete_alerts (written by `python anomaly_alerts.py`). Optional
+    ?metric=, ?athlete_id=, ?include_acknowledged=1, ?limit= and ?offset=.
+    """
+    try:
+        if 'user_id' not in session or session.get('role') != 'nutritionist':
+            return jsonify({'error': 'Nutritionist access required'}), 403
+        
+        metric = request.args.get('metric')
+        if metric and metric not in ALERT_METRICS:
+            return jsonify({'error': f'Metric must be one of {", ".join(ALERT_METRICS)}'}), 400
+        athlete_id = request.args.get('athlete_id', type=int)
+        limit = min(request.args.get('limit', 100, type=int), 500)
+        offset = request.args.get('offset', 0, type=int)
+        
+        conditions, params = [], []
+        if request.args.get('include_acknowledged') != '1':
+            conditions.append('al.acknowledged_at IS NULL')
+        if metric:
+            conditions.append('al.metric = ?')
+            params.append(metric)
+        if athlete_id is not None:
+            conditions.append('al.athlete_id = ?')
+            params.append(athlete_id)
+        
+        conn = get_db_connection()
+        rows = conn.execute(f'''
+            SELECT al.*, a.user_id, a.name
+            FROM athlete_alerts al
+            JOIN athletes a ON a.id = al.athlete_id
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY al.day DESC, ABS(al.z_score) DESC, al.id
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset]).fetchall()
+        conn.close()
+        
+        return jsonify({'alerts': [dict(row) for row in rows]})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/nutritionist/alerts/<int:alert_id>/acknowledge', methods=['POST'])
+def acknowledge_alert(alert_id):
+    """Mark an alert as handled; later scans keep it instead of recomputing it"""
+    try:
+        if 'user_id' not in session or session.get('role') != 'nutritionist':
+            return jsonify({'error': 'Nutritionist access required'}), 403
+        
+        conn = get_db_connection()
+        with conn:
+            updated = conn.execute('''
+                UPDATE athlete_alerts SET acknowledged_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND acknowledged_at IS NULL
+            ''', (alert_id,)).rowcount
+        conn.close()
+        if not updated:
+            return jsonify({'error': 'Alert not found or already acknowledged'}), 404
+        
+        return jsonify({'success': True})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/api/nutritionist/cohorts', methods=['GET'])
+def nutritionist_cohorts():
+    """
+    Weekly cohort comparison from the cohort_weekly rollup
+    
+    ?dimension=weight_category|sport_level|gender|all (default weight_category),
+    optional ?cohort= to pick one cohort and ?weeks= (default 12, max 104).
+    """
+    try:
+        if 'user_id' not in session or session.get('role') != 'nutritionist':
+            return jsonify({'error': 'Nutritionist access required'}), 403
+        
+        dimension = request.args.get('dimension', 'weight_category')
+        if dimension not in COHORT_DIMENSIONS:
+            return jsonify({'error': f'Dimension must be one of {", ".join(COHORT_DIMENSIONS)}'}), 400
+        cohort = request.args.get('cohort')
+        weeks = max(1, min(request.args.get('weeks', 12, type=int), 104))
+        today = date.today()
+        since = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+        
+        conn = get_db_connection()
+        rows = conn.execute(f'''
+            SELECT cohort, week_start, athletes, weight_delta_mean, weight_delta_median,
+                   sleep_hours, sleep_quality, appetite, water_intake, updated_at
+            FROM cohort_weekly
+            WHERE dimension = ? AND week_start >= ? {'AND cohort = ?' if cohort else ''}
+            ORDER BY cohort, week_start
+        ''', (dimension, since.isoformat()) + ((cohort,) if cohort else ())).fetchall()
+        conn.close()
+        
+        cohorts = {}
+        for row in rows:
+            cohorts.setdefault(row['cohort'], []).append({key: row[key] for key in row.keys() if key != 'cohort'})
+        
+        return jsonify({'dimension': dimension, 'since': since.isoformat(), 'cohorts': cohorts})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Error handlers
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def internal_error(error):
     return render_template('500.html'), 500
 
+def create_app(config=None):
+    """
+    Application factory
+    
+    Builds a configured app; nothing here runs at import time. Pre-forked
+    workers can call it directly (gunicorn 'app:create_app()'), and the
+    module-level `app` is only created on first access.
+    """
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+    app.config['PRECOMPILE_TEMPLATES'] = True
+    # Compiled templates are cached on disk, so later workers and restarts skip Jinja compilation
+    app.config['TEMPLATE_BYTECODE_CACHE'] = True
+    if config:
+        app.config.update(config)
+    # DATABASE (default judo.db) is the file behind database.get_db_connection and the background senders
+    database.DATABASE = app.config.setdefault('DATABASE', database.DATABASE)
+    outbox.db_path = reset_token_sweeper.db_path = database.DATABASE
+    # Chat attachments (attachments.py); absolute, since send_file resolves relative paths against the app root
+    app.config['UPLOAD_FOLDER'] = os.path.abspath(app.config.get('UPLOAD_FOLDER')
+                                                  or os.environ.get('UPLOAD_FOLDER', 'uploads'))
+    
+    # JSON log records through a background writer, request ids, sampled debug details
+    structured_logging.configure_logging()
+    structured_logging.init_app(app)
+    
+    # Jinja fragment cache + template precompilation
+    fragment_cache.init_app(app, precompile=app.config['PRECOMPILE_TEMPLATES'],
+                            bytecode_cache=app.config['TEMPLATE_BYTECODE_CACHE'])
+    
+    # Per-request SQL timing (Server-Timing header, slow-query log, /api/admin/sql_stats)
+    sql_profiler.init_app(app)
+    
+    # Token buckets for login, password reset and chat sends (RATE_LIMITS, RATE_LIMIT_STORAGE)
+    rate_limit.init_app(app)
+    
+    # Route latency histograms and subsystem gauges at /metrics
+    metrics.init_app(app)
+    metrics.register_gauge('mail_outbox_messages', 'Messages in the mail outbox by status', mail_outbox_depth)
+    metrics.register_gauge('chat_waiters', 'Long-poll requests waiting in /api/chat/wait',
+                           lambda: [({}, chat_notifier.waiting)])
+    metrics.register_gauge('thumbnails_pending', 'Attachment thumbnails queued in the process pool',
+                           lambda: [({}, thumbnailer.pending)])
+    metrics.register_gauge('background_jobs', 'Jobs in the job queue by queue and status', background_job_depth)
+    
+    app.register_blueprint(main)
+    return app
+
+_app_lock = threading.Lock()
+
+def __getattr__(name):
+    # `from app import app` / gunicorn 'app:app' build the default app on first use
+    global app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _app_lock:
+        if 'app' not in globals():
+            app = create_app()
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
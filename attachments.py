@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Chat attachments: resumable chunked uploads, content-addressed storage, thumbnails
+
+Meal photos and lab results are kept on disk, not in the database:
+
+    <UPLOAD_FOLDER>/blobs/ab/<sha256>          file contents, named by their SHA-256
+    <UPLOAD_FOLDER>/thumbs/ab/<sha256>.jpg     THUMBNAIL_SIZE px JPEG of images
+    <UPLOAD_FOLDER>/partial/<upload_id>/<n>    chunks of uploads in progress
+
+Upload protocol (endpoints in app.py):
+
+    POST /api/uploads {filename, size, content_type}  -> upload_id, chunk_size, chunks
+    PUT  /api/uploads/<upload_id>/chunks/<n>          raw bytes of chunk n
+    GET  /api/uploads/<upload_id>                     chunks received so far (to resume)
+
+Every chunk is CHUNK_SIZE bytes except the last. Chunks may arrive in
+any order and sending one again is harmless: each is written to a temp
+file and renamed into place. When the last missing chunk arrives the
+chunks are joined while hashing and the file moves to blobs/ under its
+hash, so the same photo sent twice is stored once. The finished upload
+is then sent with /api/send_message {upload_id}.
+
+Only the uploader and the two participants of a message carrying the
+file may download it. A client cannot skip the upload by naming a hash
+it already knows, since that would hand out any stored file to whoever
+knows its hash.
+
+Thumbnails are made by a process pool (THUMBNAIL_WORKERS) after the
+upload request has returned; attachments.thumbnail goes pending -> ready
+or failed. Run this module to redo missing thumbnails and remove
+uploads abandoned for more than UPLOAD_TTL:
+
+    python attachments.py [db_path] [--upload-folder uploads]
+"""
+
+import argparse
+import hashlib
+import logging
+import math
+import os
+import re
+import secrets
+import shutil
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+THUMBNAIL_SIZE = 320
+# Uploads not finished after this many seconds are removed by the cleanup
+UPLOAD_TTL = 24 * 3600
+# SVG and HTML are not accepted: they would run scripts when opened from our origin
+CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/webp', 'image/gif', 'application/pdf')
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+class UploadError(Exception):
+    """Rejected upload request; status_code is the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def blob_path(root, sha256):
+    return os.path.join(root, 'blobs', sha256[:2], sha256)
+
+
+def thumbnail_path(root, sha256):
+    return os.path.join(root, 'thumbs', sha256[:2], f'{sha256}.jpg')
+
+
+def _partial_dir(root, upload_id):
+    return os.path.join(root, 'partial', upload_id)
+
+
+def is_sha256(value):
+    return bool(_SHA256.fullmatch(value or ''))
+
+
+def chunk_count(size):
+    return math.ceil(size / CHUNK_SIZE)
+
+
+def _upload_status(root, upload):
+    status = {
+        'upload_id': upload['id'],
+        'filename': upload['filename'],
+        'size': upload['size'],
+        'chunk_size': CHUNK_SIZE,
+        'chunks': chunk_count(upload['size']),
+        'complete': upload['sha256'] is not None,
+    }
+    if upload['sha256']:
+        status['attachment'] = upload['sha256']
+    else:
+        status['received'] = received_chunks(root, upload['id'])
+    return status
+
+
+def create_upload(conn, root, user_id, filename, size, content_type):
+    filename = os.path.basename((filename or '').replace('\\', '/')).strip()[:255]
+    if not filename:
+        raise UploadError('filename is required')
+    if content_type not in CONTENT_TYPES:
+        raise UploadError(f"content_type must be one of {', '.join(CONTENT_TYPES)}", 415)
+    if not isinstance(size, int) or not 0 < size <= MAX_UPLOAD_BYTES:
+        raise UploadError(f'size must be between 1 and {MAX_UPLOAD_BYTES} bytes', 413)
+    upload_id = secrets.token_urlsafe(16)
+    with conn:
+        conn.execute('''
+            INSERT INTO uploads (id, user_id, filename, content_type, size) VALUES (?, ?, ?, ?, ?)
+        ''', (upload_id, user_id, filename, content_type, size))
+    os.makedirs(_partial_dir(root, upload_id), exist_ok=True)
+    return _upload_status(root, get_upload(conn, upload_id, user_id))
+
+
+def get_upload(conn, upload_id, user_id):
+    upload = conn.execute('SELECT * FROM uploads WHERE id = ? AND user_id = ?', (upload_id, user_id)).fetchone()
+    if upload is None:
+        raise UploadError('Upload not found', 404)
+    return upload
+
+
+def upload_status(conn, root, upload_id, user_id):
+    return _upload_status(root, get_upload(conn, upload_id, user_id))
+
+
+def received_chunks(root, upload_id):
+    try:
+        names = os.listdir(_partial_dir(root, upload_id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def write_chunk(conn, root, upload_id, user_id, index, data):
+    """Store chunk index of an upload; joins and stores the file once every chunk is there"""
+    upload = get_upload(conn, upload_id, user_id)
+    if upload['sha256']:
+        return _upload_status(root, upload)
+    chunks = chunk_count(upload['size'])
+    if not 0 <= index < chunks:
+        raise UploadError(f'chunk must be between 0 and {chunks - 1}')
+    expected = min(CHUNK_SIZE, upload['size'] - index * CHUNK_SIZE)
+    if len(data) != expected:
+        raise UploadError(f'chunk {index} must be {expected} bytes, got {len(data)}')
+
+    directory = _partial_dir(root, upload_id)
+    os.makedirs(directory, exist_ok=True)
+    temp = os.path.join(directory, f'{index}.{secrets.token_hex(4)}.tmp')
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, os.path.join(directory, str(index)))
+
+    if len(received_chunks(root, upload_id)) == chunks:
+        try:
+            _finish_upload(conn, root, upload)
+        except FileNotFoundError:
+            # A concurrent request finished the upload and removed the chunks first
+            if get_upload(conn, upload_id, user_id)['sha256'] is None:
+                raise
+        upload = get_upload(conn, upload_id, user_id)
+    return _upload_status(root, upload)
+
+
+def _finish_upload(conn, root, upload):
+    """
+    Join the chunks into blobs/ under their hash. Two requests finishing
+    the same upload at once both write identical content, so the last
+    rename wins harmlessly.
+    """
+    directory = _partial_dir(root, upload['id'])
+    digest = hashlib.sha256()
+    joined = os.path.join(directory, f'joined.{secrets.token_hex(4)}.tmp')
+    with open(joined, 'wb') as out:
+        for index in range(chunk_count(upload['size'])):
+            with open(os.path.join(directory, str(index)), 'rb') as f:
+                data = f.read()
+            digest.update(data)
+            out.write(data)
+    sha256 = digest.hexdigest()
+
+    path = blob_path(root, sha256)
+    if os.path.exists(path):
+        os.remove(joined)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(joined, path)
+
+    is_image = upload['content_type'].startswith('image/')
+    with conn:
+        created = conn.execute('''
+            INSERT OR IGNORE INTO attachments (sha256, size, content_type, thumbnail) VALUES (?, ?, ?, ?)
+        ''', (sha256, upload['size'], upload['content_type'], 'pending' if is_image else 'none')).rowcount
+        conn.execute('''
+            UPDATE uploads SET sha256 = ?, completed_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (sha256, upload['id']))
+    shutil.rmtree(directory, ignore_errors=True)
+    if created and is_image:
+        db_path = conn.execute('PRAGMA database_list').fetchone()[2]
+        thumbnailer.submit(db_path, root, sha256)
+    return sha256
+
+
+def completed_upload(conn, upload_id, user_id):
+    """The caller's finished upload with its attachment row, for attaching to a message"""
+    upload = conn.execute('''
+        SELECT u.id, u.filename, u.sha256, a.size, a.content_type
+        FROM uploads u JOIN attachments a ON a.sha256 = u.sha256
+        WHERE u.id = ? AND u.user_id = ?
+    ''', (upload_id, user_id)).fetchone()
+    if upload is None:
+        raise UploadError('Upload not found or not finished', 404)
+    return upload
+
+
+def accessible_attachment(conn, sha256, user_id):
+    """
+    The attachment row plus a filename if user_id uploaded it or takes
+    part in a message that carries it, else None.
+    """
+    found = conn.execute('''
+        SELECT filename FROM message_attachments
+        WHERE sha256 = ? AND (sender_id = ? OR receiver_id = ?)
+        UNION ALL
+        SELECT filename FROM uploads WHERE sha256 = ? AND user_id = ?
+        LIMIT 1
+    ''', (sha256, user_id, user_id, sha256, user_id)).fetchone()
+    if found is None:
+        return None
+    attachment = conn.execute('SELECT * FROM attachments WHERE sha256 = ?', (sha256,)).fetchone()
+    return dict(attachment, filename=found['filename']) if attachment else None
+
+
+def make_thumbnail(source, destination, size=THUMBNAIL_SIZE):
+    """Runs in a pool worker: write a JPEG no larger than size x size"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # Before exif_transpose loads the pixels: lets JPEG decode at a reduced scale
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        temp = f'{destination}.{os.getpid()}.tmp'
+        image.convert('RGB').save(temp, 'JPEG', quality=80, optimize=True)
+    os.replace(temp, destination)
+
+
+class Thumbnailer:
+    """Lazily started process pool for make_thumbnail; results are written back to attachments"""
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.pending = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Not fork: started from request threads, see password_hashing
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('forkserver'))
+            return self._pool
+
+    def submit(self, db_path, root, sha256):
+        from concurrent.futures.process import BrokenProcessPool
+
+        args = (blob_path(root, sha256), thumbnail_path(root, sha256))
+        try:
+            future = self._get_pool().submit(make_thumbnail, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            future = self._get_pool().submit(make_thumbnail, *args)
+        with self._lock:
+            self.pending += 1
+        future.add_done_callback(lambda done: self._done(db_path, sha256, done))
+        return future
+
+    def _done(self, db_path, sha256, future):
+        with self._lock:
+            self.pending -= 1
+        error = future.exception()
+        if error:
+            logger.warning(f"Thumbnail of {sha256} failed: {error}")
+        from database import get_db_connection
+        conn = get_db_connection(db_path)
+        try:
+            with conn:
+                conn.execute('UPDATE attachments SET thumbnail = ? WHERE sha256 = ?',
+                             ('failed' if error else 'ready', sha256))
+        finally:
+            conn.close()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+thumbnailer = Thumbnailer(max_workers=int(os.environ.get('THUMBNAIL_WORKERS', 1)))
+
+
+def cleanup_uploads(conn, root, ttl=UPLOAD_TTL):
+    """Delete uploads that were started more than ttl seconds ago and never finished"""
+    cutoff = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - ttl))
+    stale = [row['id'] for row in conn.execute('''
+        SELECT id FROM uploads WHERE sha256 IS NULL AND created_at < ?
+    ''', (cutoff,))]
+    with conn:
+        conn.executemany('DELETE FROM uploads WHERE id = ?', [(upload_id,) for upload_id in stale])
+    for upload_id in stale:
+        shutil.rmtree(_partial_dir(root, upload_id), ignore_errors=True)
+    return len(stale)
+
+
+def redo_thumbnails(conn, root):
+    """Make the thumbnails left pending (e.g. by a restart) or failed; returns (made, failed)"""
+    made = failed = 0
+    for row in conn.execute("SELECT sha256 FROM attachments WHERE thumbnail IN ('pending', 'failed')").fetchall():
+        try:
+            make_thumbnail(blob_path(root, row['sha256']), thumbnail_path(root, row['sha256']))
+            status, made = 'ready', made + 1
+        except Exception as e:
+            logger.warning(f"Thumbnail of {row['sha256']} failed: {e}")
+            status, failed = 'failed', failed + 1
+        with conn:
+            conn.execute('UPDATE attachments SET thumbnail = ? WHERE sha256 = ?', (status, row['sha256']))
+    return made, failed
+
+
+def main():
+    from database import DATABASE, get_db_connection
+
+    parser = argparse.ArgumentParser(description='Remove abandoned uploads and redo missing thumbnails')
+    parser.add_argument('db_path', nargs='?', default=DATABASE)
+    parser.add_argument('--upload-folder', default=os.environ.get('UPLOAD_FOLDER', 'uploads'))
+    parser.add_argument('--ttl', type=int, default=UPLOAD_TTL, help='Seconds before an unfinished upload is removed')
+    args = parser.parse_args()
+
+    conn = get_db_connection(args.db_path)
+    removed = cleanup_uploads(conn, args.upload_folder, args.ttl)
+    made, failed = redo_thumbnails(conn, args.upload_folder)
+    conn.close()
+    print(f"🗑️ Removed {removed} abandoned uploads")
+    print(f"🖼️ Thumbnails: {made} made, {failed} failed")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the hot API paths (pytest-benchmark)
+
+Seeds a synthetic database with sample_data.py (athletes, weigh-ins,
+chat messages, questionnaires), points
+app.py at it and measures each endpoint through the Flask test client.
+Besides pytest-benchmark's own statistics, p50/p95/p99 latencies and
+throughput are stored in each result's extra_info.
+
+The file is not collected by a plain `pytest` run; call it explicitly:
+
+    pip install pytest-benchmark
+    # record a baseline (saved under .benchmarks/)
+    python -m pytest bench_api.py --benchmark-autosave
+    # compare against the latest baseline, fail on a >20% median regression
+    python -m pytest bench_api.py --benchmark-compare --benchmark-compare-fail=median:20%
+
+Dataset size: BENCH_ATHLETES (default 2000), BENCH_DAYS (default 365,
+two weigh-ins per day) and BENCH_MESSAGES, the base chat volume per
+athlete per BENCH_DAYS (default 1000; chat is twice as busy during a
+cut), i.e. ~1.5M weigh-ins and ~2.5M messages. Seeding takes a few
+minutes (~700 MB); the seeded file is cached in the temp directory
+and reused by later runs with the same parameters. Each session
+benchmarks a fresh copy of it, so the writes of test_weight_post,
+test_send_message and test_login do not accumulate and saved
+baselines stay comparable.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import database
+from migrations import SCHEMA_VERSION
+from sample_data import generate_sample_data
+
+ATHLETES = int(os.environ.get('BENCH_ATHLETES', 2000))
+DAYS = int(os.environ.get('BENCH_DAYS', 365))
+MESSAGES = int(os.environ.get('BENCH_MESSAGES', 1000))
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(benchmark, fn, *args, **kwargs):
+    """Benchmark fn and attach latency percentiles (ms) and throughput to the result"""
+    result = benchmark(fn, *args, **kwargs)
+    data = sorted(benchmark.stats.stats.data)
+    benchmark.extra_info.update({
+        'p50_ms': percentile(data, 50) * 1000,
+        'p95_ms': percentile(data, 95) * 1000,
+        'p99_ms': percentile(data, 99) * 1000,
+        'requests_per_sec': len(data) / sum(data)
+    })
+    return result
+
+
+@pytest.fixture(scope='module')
+def bench_app(tmp_path_factory):
+    seed = os.path.join(
+        tempfile.gettempdir(),
+        f'judo_bench_v{SCHEMA_VERSION}_{ATHLETES}x{DAYS}x{MESSAGES}.db'
+    )
+    if not os.path.exists(seed):
+        print(f"\n🌱 Seeding {seed} ...")
+        started = time.perf_counter()
+        try:
+            generate_sample_data(seed + '.tmp', athletes=ATHLETES, days=DAYS,
+                                 messages_per_day=MESSAGES / DAYS, progress=None)
+        except BaseException:
+            for suffix in ('.tmp', '.tmp-wal', '.tmp-shm'):
+                if os.path.exists(seed + suffix):
+                    os.remove(seed + suffix)
+            raise
+        os.replace(seed + '.tmp', seed)
+        print(f"🌱 Seeded in {time.perf_counter() - started:.1f}s")
+
+    # Benchmarks write (weigh-ins, messages, a user): work on a copy, never the cached seed
+    path = str(tmp_path_factory.mktemp('bench') / 'judo.db')
+    shutil.copyfile(seed, path)
+    from app import create_app
+    previous = database.DATABASE
+    database.DATABASE = path
+    # One account and one client hammer login and send_message: time the endpoints, not 429s
+    yield create_app({'RATE_LIMIT_ENABLED': False})
+    database.DATABASE = previous
+
+
+@pytest.fixture(scope='module')
+def bench_users(bench_app):
+    """(athlete user id, id of the nutritionist they chat with)"""
+    conn = sqlite3.connect(database.DATABASE)
+    athlete_id = conn.execute('SELECT user_id FROM athletes ORDER BY id LIMIT 1').fetchone()[0]
+    nutritionist_id = conn.execute(
+        'SELECT receiver_id FROM messages WHERE sender_id = ? LIMIT 1', (athlete_id,)
+    ).fetchone()[0]
+    conn.close()
+    return athlete_id, nutritionist_id
+
+
+@pytest.fixture(scope='module')
+def athlete_client(bench_app, bench_users):
+    client = bench_app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = bench_users[0]
+        sess['role'] = 'athlete'
+    return client
+
+
+def test_login(benchmark, bench_app):
+    client = bench_app.test_client()
+    credentials = {'email': 'bench-login@bench.local', 'password': 'bench-password'}
+    client.post('/api/register', json=dict(credentials, role='athlete', name='Bench'))
+    response = run(benchmark, client.post, '/api/login', json=credentials)
+    assert response.status_code == 200
+
+
+def test_weight_get(benchmark, athlete_client):
+    response = run(benchmark, athlete_client.get, '/api/weight')
+    assert response.status_code == 200
+    assert len(response.get_json()['entries']) >= DAYS * 2
+
+
+def test_weight_get_series(benchmark, athlete_client):
+    response = run(benchmark, athlete_client.get, '/api/weight?format=series')
+    assert response.status_code == 200
+
+
+def test_weight_post(benchmark, athlete_client):
+    response = run(benchmark, athlete_client.post, '/api/weight',
+                   json={'weight': 72.4, 'timing': 'morning'})
+    assert response.status_code == 201
+
+
+def test_get_messages(benchmark, athlete_client, bench_users):
+    nutritionist_id = bench_users[1]
+    response = run(benchmark, athlete_client.get, f'/api/get_messages?user2_id={nutritionist_id}')
+    assert response.status_code == 200
+    assert response.get_json()['messages']
+
+
+def test_send_message(benchmark, athlete_client, bench_users):
+    response = run(benchmark, athlete_client.post, '/api/send_message',
+                   json={'receiver_id': bench_users[1], 'content': 'שקלתי הבוקר'})
+    assert response.status_code == 200
+
+
+def test_athlete_dashboard(benchmark, athlete_client):
+    response = run(benchmark, athlete_client.get, '/api/athlete/dashboard')
+    assert response.status_code == 200
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Chat search benchmark
+
+Fills a fresh database with synthetic chat history: athletes talking to
+their nutritionist, Hebrew and English, some messages about
+supplements. The messages go through the messages_fts triggers, as
+database.add_message does. The script then measures:
+
+- insert throughput with the index maintained by triggers;
+- size of the FTS index next to the messages table;
+- /api/chat/search-style queries (chat_search.search_messages) for
+  nutritionists (large histories) and athletes, p50/p95/max;
+- the same queries as a LIKE '%term%' scan over the caller's messages,
+  the only option without the index.
+
+Usage:
+    python bench_chat_search.py [--messages 2000000] [--athletes 5000] [--nutritionists 20] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from chat_search import search_messages, search_terms
+from migrations import ensure_schema
+from sample_data import ATHLETE_MESSAGES, NUTRITIONIST_MESSAGES
+
+TOPICS = [
+    'לגבי הקריאטין - 5 גרם ביום עם מים',
+    'הפסקתי את הקריאטין בשבוע השקילה',
+    'אפשר לקחת קפאין לפני התחרות?',
+    'בדיקת דם: ברזל נמוך, נוסיף תוסף',
+    'Creatine loading is not needed, just 5g daily',
+    'Electrolytes after the weigh-in, then carbs',
+    'ויטמין D פעם ביום עם ארוחה',
+    'אחרי השקילה: מים, אלקטרוליטים ופחמימות',
+]
+QUERIES = ['קריאטין', 'מים', 'creatine', 'אלקטרוליטים', 'ברזל תוסף', 'השקילה מחר', 'קפאין']
+
+
+def seed(db_path, messages, athletes, nutritionists, batch, rng):
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    users = [(i, f'bench-chat-{i}@bench.local', 'x', 'nutritionist' if i <= nutritionists else 'athlete')
+             for i in range(1, nutritionists + athletes + 1)]
+    with conn:
+        conn.executemany('INSERT INTO users (id, email, password_hash, role) VALUES (?, ?, ?, ?)', users)
+
+    started = time.perf_counter()
+    written = 0
+    while written < messages:
+        rows = []
+        for _ in range(min(batch, messages - written)):
+            athlete = rng.randint(nutritionists + 1, nutritionists + athletes)
+            nutritionist = 1 + athlete % nutritionists
+            from_athlete = rng.random() < 0.55
+            text = rng.choice(TOPICS) if rng.random() < 0.05 else rng.choice(
+                ATHLETE_MESSAGES if from_athlete else NUTRITIONIST_MESSAGES).format(weight=round(rng.uniform(55, 100), 1))
+            rows.append((athlete, nutritionist, 'athlete', text) if from_athlete
+                        else (nutritionist, athlete, 'nutritionist', text))
+        with conn:
+            conn.executemany('INSERT INTO messages (sender_id, receiver_id, role, message) VALUES (?, ?, ?, ?)', rows)
+        written += len(rows)
+        print(f"\r   {written}/{messages} messages", end='', flush=True)
+    print()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def table_sizes(conn):
+    """Bytes per table group, when SQLite was built with the dbstat table"""
+    try:
+        rows = conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name').fetchall()
+    except sqlite3.OperationalError:
+        return None
+    sizes = {'messages': 0, 'messages_fts': 0}
+    for name, size in rows:
+        if name.startswith('messages_fts'):
+            sizes['messages_fts'] += size
+        elif name == 'messages':
+            sizes['messages'] += size
+    return sizes
+
+
+def like_scan(conn, user_id, text, limit=20):
+    terms = search_terms(text)
+    return conn.execute(f'''
+        SELECT id FROM messages
+        WHERE (sender_id = ? OR receiver_id = ?) AND {' AND '.join('message LIKE ?' for _ in terms)}
+        ORDER BY id DESC LIMIT ?
+    ''', [user_id, user_id] + [f'%{term}%' for term in terms] + [limit]).fetchall()
+
+
+def measure(fn, calls):
+    times = []
+    for args in calls:
+        started = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(0.95 * (len(times) - 1))], times[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FTS5 chat search')
+    parser.add_argument('--messages', type=int, default=2_000_000)
+    parser.add_argument('--athletes', type=int, default=5000)
+    parser.add_argument('--nutritionists', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db_path = os.path.join(tempfile.mkdtemp(prefix='judo-bench-search-'), 'chat.db')
+    print(f"💬 Seeding {args.messages} messages into {db_path}")
+    elapsed = seed(db_path, args.messages, args.athletes, args.nutritionists, args.batch, rng)
+    print(f"   {args.messages / elapsed:,.0f} inserts/s with the FTS triggers ({elapsed:.1f}s)")
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    sizes = table_sizes(conn)
+    if sizes:
+        print(f"   messages {sizes['messages'] / 2**20:.0f} MiB, messages_fts {sizes['messages_fts'] / 2**20:.0f} MiB")
+
+    first_athlete = args.nutritionists + 1
+    callers = {
+        'nutritionist': [rng.randint(1, args.nutritionists) for _ in range(args.queries)],
+        'athlete': [rng.randint(first_athlete, args.nutritionists + args.athletes) for _ in range(args.queries)],
+    }
+    print(f"\n🔍 {args.queries} searches per row (p50 / p95 / max ms)")
+    print(f"   {'caller':<14}{'method':<8}{'p50':>9}{'p95':>9}{'max':>9}")
+    for role, user_ids in callers.items():
+        calls = [(conn, user_id, rng.choice(QUERIES)) for user_id in user_ids]
+        for method, fn in (('fts', search_messages), ('like', like_scan)):
+            # The LIKE scan is slow; a tenth of the queries is enough to see it
+            sample = calls if method == 'fts' else calls[:max(1, len(calls) // 10)]
+            p50, p95, worst = measure(fn, sample)
+            print(f"   {role:<14}{method:<8}{p50:>9.2f}{p95:>9.2f}{worst:>9.2f}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
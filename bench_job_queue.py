@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Job queue throughput
+
+Queues --jobs noop jobs in a scratch database (one enqueue() per job,
+committed in batches of 100, as a request would), then drains them with
+a job_queue.Worker and reports jobs per second for both phases. The
+noop handler does no work, so the numbers are the cost of the queue
+itself: lease, pickling to the pool, and recording the results.
+
+Usage:
+    python bench_job_queue.py [--jobs 20000] [--processes 0 2] [--batch-size 100] [--wal]
+
+--processes 0 runs the jobs in the worker's own process.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import job_queue
+from migrations import ensure_schema
+
+
+def bench(jobs, processes, batch_size, wal):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'jobs.db')
+        ensure_schema(db_path)
+        conn = sqlite3.connect(db_path)
+        if wal:
+            conn.execute('PRAGMA journal_mode = WAL')
+
+        started = time.perf_counter()
+        for start in range(0, jobs, 100):
+            with conn:
+                for i in range(start, min(start + 100, jobs)):
+                    job_queue.enqueue(conn, 'noop', {'i': i})
+        enqueued = time.perf_counter() - started
+
+        worker = job_queue.Worker(db_path, processes=processes, batch_size=batch_size, poll_interval=0.01)
+        thread = threading.Thread(target=worker.run)
+        started = time.perf_counter()
+        thread.start()
+        while worker.processed < jobs:
+            time.sleep(0.01)
+        drained = time.perf_counter() - started
+        worker.stop()
+        thread.join()
+        conn.close()
+    return jobs / enqueued, jobs / drained
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure job queue throughput')
+    parser.add_argument('--jobs', type=int, default=20000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--batch-size', type=int, default=job_queue.BATCH_SIZE)
+    parser.add_argument('--wal', action='store_true', help='Use WAL instead of the rollback journal')
+    args = parser.parse_args()
+
+    print(f"⏱️ {args.jobs} noop jobs, batches of {args.batch_size}, {'WAL' if args.wal else 'rollback journal'}")
+    for processes in args.processes:
+        enqueue_rate, drain_rate = bench(args.jobs, processes, args.batch_size, args.wal)
+        print(f"   processes={processes}: enqueue {enqueue_rate:,.0f} jobs/s, run {drain_rate:,.0f} jobs/s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
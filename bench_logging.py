@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Per-request logging overhead
+
+Serves the same athlete requests (GET /api/weight plus POST /api/weight)
+through the Flask test client under three logging setups and reports the
+mean time per request:
+
+- off:       logging disabled (baseline)
+- sync:      the old setup - logging.basicConfig(level=DEBUG), records
+             formatted and written on the request thread, every debug
+             detail kept
+- queue:     structured_logging - INFO, JSON records written by the
+             background listener, debug details for a sampled share of
+             requests
+
+Records go to a file in the temp directory. --sink-delay-ms adds a sleep
+to every write to model a slow sink (a blocked stderr pipe, a network log
+shipper); only the sync setup pays it on the request path.
+
+Usage:
+    python bench_logging.py [--requests 2000] [--rounds 5] [--sink-delay-ms 0.2] [--sample-rate 0.01]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import database
+import structured_logging
+
+
+class SlowFile:
+    """File wrapper whose writes take at least delay seconds"""
+
+    def __init__(self, path, delay):
+        self._file = open(path, 'a', encoding='utf-8')
+        self.delay = delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._file.write(text)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def make_client(app):
+    user_id = database.create_user(f'bench-logging-{os.getpid()}@bench.local', 'x', 'athlete')
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = 'athlete'
+    return client
+
+
+def measure(client, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        if i % 10 == 0:
+            client.post('/api/weight', json={'weight': 72.5, 'timing': 'morning'})
+        else:
+            client.get('/api/weight?since=2100-01-01')
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def use_sync_logging(sink):
+    structured_logging.stop_logging()
+    root = logging.getLogger()
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    handler.addFilter(structured_logging.RequestContextFilter())
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-request logging overhead')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sink-delay-ms', type=float, default=0.0)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='judo-bench-logging-')
+    database.DATABASE = os.path.join(workdir, 'bench.db')
+    log_path = os.path.join(workdir, 'app.log')
+    sink = SlowFile(log_path, args.sink_delay_ms / 1000)
+
+    import app as judo_app
+    app = judo_app.create_app({'LOG_DEBUG_SAMPLE_RATE': args.sample_rate})
+    client = make_client(app)
+    measure(client, 200)  # warm up
+
+    # Interleave the setups over several rounds and keep each setup's median
+    runs = {'off': [], 'sync': [], 'queue': []}
+    per_round = max(1, args.requests // args.rounds)
+    for _ in range(args.rounds):
+        logging.disable(logging.CRITICAL)
+        runs['off'].append(measure(client, per_round))
+        logging.disable(logging.NOTSET)
+
+        handler = use_sync_logging(sink)
+        runs['sync'].append(measure(client, per_round))
+        logging.getLogger().removeHandler(handler)
+
+        structured_logging.configure_logging(level='INFO', stream=sink)
+        runs['queue'].append(measure(client, per_round))
+        structured_logging.stop_logging()
+    sink.close()
+    results = {name: statistics.median(values) for name, values in runs.items()}
+
+    print(f"📝 {per_round * args.rounds} requests per setup, sink delay {args.sink_delay_ms} ms/write, "
+          f"debug sample rate {args.sample_rate}")
+    print(f"   {'setup':<8}{'µs/request':>12}{'overhead µs':>13}")
+    for name, per_request in results.items():
+        print(f"   {name:<8}{per_request:>12.1f}{per_request - results['off']:>13.1f}")
+    print(f"📄 Log written to {log_path} ({os.path.getsize(log_path) // 1024} KiB)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Login throughput under concurrent load
+
+Registers a user, then fires concurrent /api/login requests from several
+threads while another thread keeps calling a cheap endpoint. Reports
+login throughput and the latency of the cheap requests, once with the
+process-pool hasher and once with hashing inline on the request thread.
+
+Usage:
+    python bench_login.py [--threads 8] [--logins 64]
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from werkzeug.security import check_password_hash
+
+import app as judo_app
+from password_hashing import check_password as pooled_check_password
+
+
+def inline_check_password(password_hash, password, client=None):
+    return check_password_hash(password_hash, password)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(threads, logins, email, password):
+    per_thread = max(1, logins // threads)
+    login_latencies = []
+    probe_latencies = []
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def login_worker(i):
+        client = judo_app.app.test_client()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            response = client.post('/api/login', json={'email': email, 'password': password},
+                                   environ_base={'REMOTE_ADDR': f'10.0.0.{i}'})
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, response.get_json()
+            with lock:
+                login_latencies.append(elapsed)
+
+    def probe_worker():
+        client = judo_app.app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.post('/api/logout')
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    probe = threading.Thread(target=probe_worker)
+    probe.start()
+    workers = [threading.Thread(target=login_worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    probe.join()
+
+    return {
+        'logins_per_sec': len(login_latencies) / elapsed,
+        'login_p50_ms': statistics.median(login_latencies) * 1000,
+        'login_p95_ms': percentile(login_latencies, 95) * 1000,
+        'probe_p50_ms': statistics.median(probe_latencies) * 1000,
+        'probe_p95_ms': percentile(probe_latencies, 95) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=64)
+    args = parser.parse_args()
+
+    # One account logging in over and over: measure hashing, not the login rate limit
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    email, password = 'bench-login@example.com', 'bench-password'
+    client = judo_app.app.test_client()
+    client.post('/api/register', json={'email': email, 'password': password,
+                                       'role': 'athlete', 'name': 'Bench'})
+
+    print(f"🏋️  {args.logins} logins from {args.threads} threads")
+    for label, check in (('inline', inline_check_password), ('process pool', pooled_check_password)):
+        judo_app.check_password = check
+        result = run(args.threads, args.logins, email, password)
+        print(f"\n📊 {label}:")
+        print(f"   logins/sec:        {result['logins_per_sec']:.1f}")
+        print(f"   login p50 / p95:   {result['login_p50_ms']:.0f} / {result['login_p95_ms']:.0f} ms")
+        print(f"   other requests p50 / p95: {result['probe_p50_ms']:.1f} / {result['probe_p95_ms']:.1f} ms")
+    judo_app.check_password = pooled_check_password
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Worker startup time
+
+Starts fresh interpreters that import app.py and call create_app(), the
+work a newly forked or restarted worker does before serving. Each run is
+a separate process under `python -X importtime`. The script reports the
+median import and create_app() times, and the modules with the largest
+cumulative import time in the last run.
+
+Usage:
+    python bench_startup.py [--runs 7] [--top 15] [--budget-ms 400]
+
+--budget-ms makes the script exit with status 1 when the median total is
+above the budget (for CI).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = '''
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(f"STARTUP {(imported - started) * 1000:.3f} {(created - imported) * 1000:.3f}")
+'''
+
+
+def run_once():
+    """(import ms, create_app ms, importtime rows) for one fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    import_ms = create_ms = None
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP '):
+            import_ms, create_ms = (float(v) for v in line.split()[1:])
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+        rows.append((int(cumulative_us), int(self_us), name))
+    return import_ms, create_ms, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import + create_app() time')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, help='Fail if the median total exceeds this')
+    args = parser.parse_args()
+
+    imports, creates, rows = [], [], []
+    for _ in range(args.runs):
+        import_ms, create_ms, rows = run_once()
+        imports.append(import_ms)
+        creates.append(create_ms)
+
+    total = [i + c for i, c in zip(imports, creates)]
+    print(f"🚀 Startup over {args.runs} runs (median / min / max ms)")
+    for label, values in (('import app', imports), ('create_app()', creates), ('total', total)):
+        print(f"   {label:<14}{statistics.median(values):>9.1f}{min(values):>9.1f}{max(values):>9.1f}")
+
+    print(f"\n📦 Top {args.top} imports by cumulative time (last run)")
+    print(f"   {'cumulative ms':>13}{'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"   {cumulative_us / 1000:>13.1f}{self_us / 1000:>9.1f}  {name}")
+
+    if args.budget_ms is not None and statistics.median(total) > args.budget_ms:
+        print(f"\n❌ Median startup {statistics.median(total):.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Chat notifications for long-polling clients
+
+send_message calls notifier.publish(receiver_id) after the message is
+stored; /api/chat/wait blocks in notifier.wait() until the user's version
+changes or the timeout expires, then reads the new rows. Replaces the
+3-second get_messages polling of chat.js with one open request per user.
+Per-process only: with several app processes each keeps its own versions
+and a waiter is woken by the timeout instead.
+
+    version = notifier.version(user_id)
+    ...read messages...
+    notifier.wait(user_id, version, timeout=25)
+"""
+
+import threading
+
+
+class ChatNotifier:
+    """Per-user message versions guarded by one Condition"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = {}
+        self.waiting = 0
+
+    def version(self, user_id):
+        with self._cond:
+            return self._versions.get(user_id, 0)
+
+    def publish(self, user_id):
+        with self._cond:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._cond.notify_all()
+
+    def wait(self, user_id, version, timeout):
+        """True once user_id's version differs from version, False on timeout"""
+        with self._cond:
+            self.waiting += 1
+            try:
+                return self._cond.wait_for(lambda: self._versions.get(user_id, 0) != version, timeout)
+            finally:
+                self.waiting -= 1
+
+
+notifier = ChatNotifier()
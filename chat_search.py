@@ -0,0 +1,128 @@
+"""
+Full-text search over chat history (SQLite FTS5)
+
+messages_fts is an external-content FTS5 index: it stores only the index,
+and reads message text back from the messages_fts_source view (built
+on messages) for snippets. Triggers on messages keep it in sync with every insert
+(database.add_message), edit and delete.
+
+Tokenizer: trigram, case-insensitive. Hebrew attaches prefixes to words
+(ו, ה, ב, ל, מ, ש, כ), so "קריאטין" must also find "והקריאטין"; a
+word tokenizer would not, a trigram index matches any substring of three
+or more characters, in Hebrew and English alike. Niqqud is not removed,
+which is fine for chat text.
+
+Every row also indexes its participants: sender and receiver id, each
+written as three Private Use Area characters (participant_token), i.e.
+exactly one trigram that no other user and no text shares. A search is
+scoped to the caller's conversations inside the index:
+
+    participants : "<token of 12>" AND message : ("creatine")
+
+so its cost follows the caller's own history, not the size of the table.
+
+Ranking: the index hands back the RANK_WINDOW most recent matches (rowid
+order, so it stops early), which are ranked here by how well they match:
+whole words, also behind Hebrew prefix letters, count more than
+substrings, and short messages more than long ones. bm25() is not used:
+it needs every matching row of the whole table for its term statistics,
+hundreds of milliseconds for common words in a few million messages.
+Older matches are reached with before_id (next_before_id of the previous
+page).
+
+    rows, terms, next_before_id = search_messages(conn, user_id, 'קריאטין', other_user_id=34)
+"""
+
+import math
+import re
+
+from markupsafe import escape
+
+from message_archive import MESSAGE_FIELDS_SQL
+
+# Shorter words cannot be matched by a trigram index
+MIN_TERM_LENGTH = 3
+# Most recent matches ranked per search
+RANK_WINDOW = 200
+SNIPPET_CHARS = 80
+# Letters that Hebrew attaches to the front of a word (and, the, in, to, from, that, as)
+HEBREW_PREFIXES = 'והבלמשכ'
+# Participant ids are written in base 6400 with the code points U+E000..U+F8FF
+_TOKEN_BASE, _TOKEN_FIRST = 6400, 0xE000
+
+
+def participant_token(user_id):
+    user_id = int(user_id)
+    return ''.join(chr(_TOKEN_FIRST + user_id // _TOKEN_BASE ** k % _TOKEN_BASE) for k in (2, 1, 0))
+
+
+def search_terms(text):
+    """Words of a free-text query that the trigram index can match"""
+    return [word for word in (text or '').split() if len(word) >= MIN_TERM_LENGTH]
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def fts_query(user_id, terms, other_user_id=None):
+    """MATCH expression: every term, in a conversation of user_id (and other_user_id)"""
+    scope = f'participants : "{participant_token(user_id)}"'
+    if other_user_id is not None:
+        scope += f' AND participants : "{participant_token(other_user_id)}"'
+    return f"{scope} AND message : ({' AND '.join(_quote(term) for term in terms)})"
+
+
+def _word_pattern(term):
+    return re.compile(rf'(?<!\w)[{HEBREW_PREFIXES}]{{0,2}}{re.escape(term)}(?!\w)', re.IGNORECASE)
+
+
+def score(text, terms):
+    """Relevance of one matching message: whole-word hits count double, long messages are damped"""
+    lowered = text.casefold()
+    hits = sum(lowered.count(term.casefold()) + len(_word_pattern(term).findall(text)) for term in terms)
+    return hits / math.sqrt(max(len(text.split()), 1))
+
+
+def snippet(text, terms, width=SNIPPET_CHARS):
+    """HTML-safe excerpt around the first match with every match wrapped in <mark>"""
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, (first.start() if first else 0) - width // 3)
+    end = min(len(text), start + width)
+    excerpt = text[start:end]
+    parts, last = [], 0
+    for match in pattern.finditer(excerpt):
+        parts.append(str(escape(excerpt[last:match.start()])))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(str(escape(excerpt[last:])))
+    return ('…' if start else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+
+def search_messages(conn, user_id, text, other_user_id=None, limit=20, offset=0, before_id=None):
+    """
+    Ranked matches among the RANK_WINDOW most recent ones (before before_id).
+    Returns (rows, terms, next_before_id); each row is a dict of the messages
+    row plus snippet and score. next_before_id is None when no older matches remain.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return [], terms, None
+    matches = conn.execute(f'''
+        SELECT {MESSAGE_FIELDS_SQL} FROM messages_fts
+        JOIN messages m ON m.id = messages_fts.rowid
+        WHERE messages_fts MATCH ? {'AND messages_fts.rowid < ?' if before_id else ''}
+        ORDER BY messages_fts.rowid DESC
+        LIMIT ?
+    ''', (fts_query(user_id, terms, other_user_id),) + ((before_id,) if before_id else ()) + (RANK_WINDOW,)).fetchall()
+    next_before_id = matches[-1]['id'] if len(matches) == RANK_WINDOW else None
+
+    ranked = sorted(matches, key=lambda row: (-score(row['message'], terms), -row['id']))
+    rows = []
+    for row in ranked[offset:offset + limit]:
+        result = dict(row)
+        result['score'] = round(score(row['message'], terms), 3)
+        result['snippet'] = snippet(row['message'], terms)
+        rows.append(result)
+    return rows, terms, next_before_id
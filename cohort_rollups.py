@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Cohort rollups for the nutritionist analysis pages
+
+Cross-athlete comparisons by weight_category, sport_level and gender are
+answered from two rollup tables instead of every athlete's raw entries:
+
+- athlete_weekly_stats: per athlete and week (weeks start on Monday), the
+  mean morning weight, its change from the previous week and the averages
+  of the monitored assessment answers (anomaly_alerts.assessment_values);
+- cohort_weekly: per cohort and week, the athlete count, mean and median
+  weekly weight change and the assessment averages. Cohorts are
+  ('weight_category', '73'), ('sport_level', 'national'),
+  ('gender', 'female') and ('all', 'all').
+
+Triggers on weight_log, weekly_assessments and athletes queue every
+touched (athlete, week) in cohort_dirty_weeks. refresh_rollups() only
+recomputes those athletes' weeks (and the week after, whose change
+depends on them), then the cohort rows of the affected weeks. Run it
+from cron, or after a bulk import with --full:
+
+    python cohort_rollups.py [db_path] [--full]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from anomaly_alerts import assessment_values
+
+DIMENSIONS = ('weight_category', 'sport_level', 'gender', 'all')
+ASSESSMENT_METRICS = ('sleep_hours', 'sleep_quality', 'appetite', 'water_intake')
+
+# Monday of the week of a DATE/TIMESTAMP expression
+_WEEK_SQL = "date({}, 'weekday 0', '-6 days')"
+
+
+def cohort_label(dimension, value):
+    """Cohort key of a profile value; REAL weight categories are shown as '73', not '73.0'"""
+    if dimension == 'all':
+        return 'all'
+    if value is None:
+        return None
+    return f'{value:g}' if isinstance(value, float) else str(value)
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 3) if values else None
+
+
+def athlete_weeks(conn, athlete_id, user_id, weeks):
+    """athlete_weekly_stats rows (without the profile columns) for the given week_start strings"""
+    first = date.fromisoformat(min(weeks)) - timedelta(days=7)
+    end = date.fromisoformat(max(weeks)) + timedelta(days=7)
+    mornings = defaultdict(list)
+    if user_id is not None:
+        for week, weight, _ in conn.execute(f'''
+            SELECT {_WEEK_SQL.format('day')}, weight, MIN(ts) FROM weight_log
+            WHERE athlete_id = ? AND day >= ? AND day < ?
+            GROUP BY day
+        ''', (user_id, first.isoformat(), end.isoformat())):
+            mornings[week].append(weight)
+    answers = defaultdict(lambda: defaultdict(list))
+    counts = defaultdict(int)
+    for week, responses in conn.execute(f'''
+        SELECT {_WEEK_SQL.format('completed_at')}, responses FROM weekly_assessments
+        WHERE athlete_id = ? AND completed_at >= ? AND completed_at < ?
+    ''', (athlete_id, first.isoformat(), end.isoformat())):
+        try:
+            values = assessment_values(json.loads(responses or '{}'))
+        except (ValueError, AttributeError):
+            continue
+        counts[week] += 1
+        for metric, value in values.items():
+            answers[week][metric].append(value)
+
+    rows = {}
+    for week in weeks:
+        if not mornings.get(week) and not counts.get(week):
+            rows[week] = None
+            continue
+        mean_weight = _mean(mornings.get(week, []))
+        previous = (date.fromisoformat(week) - timedelta(days=7)).isoformat()
+        previous_mean = _mean(mornings.get(previous, []))
+        delta = None if mean_weight is None or previous_mean is None else round(mean_weight - previous_mean, 3)
+        rows[week] = (len(mornings.get(week, [])), mean_weight, delta, counts.get(week, 0)) + tuple(
+            _mean(answers[week][metric]) for metric in ASSESSMENT_METRICS)
+    return rows
+
+
+def cohort_rows(stats):
+    """cohort_weekly rows of one week from its athlete_weekly_stats rows"""
+    groups = defaultdict(list)
+    for row in stats:
+        for dimension in DIMENSIONS:
+            label = cohort_label(dimension, row[dimension] if dimension != 'all' else None)
+            if label is not None:
+                groups[(dimension, label)].append(row)
+    result = []
+    for (dimension, label), members in groups.items():
+        deltas = [m['weight_delta'] for m in members if m['weight_delta'] is not None]
+        result.append((
+            dimension, label, len(members),
+            round(statistics.fmean(deltas), 3) if deltas else None,
+            round(statistics.median(deltas), 3) if deltas else None,
+        ) + tuple(_mean([m[metric] for m in members]) for metric in ASSESSMENT_METRICS))
+    return result
+
+
+def refresh_rollups(conn, full=False):
+    """Bring the rollups up to date (conn with sqlite3.Row rows); returns {'athlete_weeks': n, 'weeks': n}"""
+    if full:
+        with conn:
+            conn.execute('DELETE FROM cohort_dirty_weeks')
+            conn.execute('DELETE FROM athlete_weekly_stats')
+            conn.execute('DELETE FROM cohort_weekly')
+        pending = conn.execute(f'''
+            SELECT a.id, {_WEEK_SQL.format('w.day')} FROM athletes a JOIN weight_log w ON w.athlete_id = a.user_id
+            UNION
+            SELECT athlete_id, {_WEEK_SQL.format('completed_at')} FROM weekly_assessments WHERE athlete_id IS NOT NULL
+        ''').fetchall()
+    else:
+        # Weeks claimed by an interrupted refresh are picked up again
+        with conn:
+            conn.execute('''
+                UPDATE OR IGNORE cohort_dirty_weeks SET claimed = 1 WHERE claimed = 0
+            ''')
+            conn.execute('DELETE FROM cohort_dirty_weeks WHERE claimed = 0 AND (athlete_id, week_start) IN '
+                         '(SELECT athlete_id, week_start FROM cohort_dirty_weeks WHERE claimed = 1)')
+        pending = conn.execute('SELECT athlete_id, week_start FROM cohort_dirty_weeks WHERE claimed = 1').fetchall()
+        if not pending:
+            return {'athlete_weeks': 0, 'weeks': 0}
+
+    # A week's weight change depends on the week before it
+    dirty = defaultdict(set)
+    for athlete_id, week in pending:
+        dirty[athlete_id].update((week, (date.fromisoformat(week) + timedelta(days=7)).isoformat()))
+
+    profiles = {row['id']: row for row in conn.execute(
+        'SELECT id, user_id, weight_category, sport_level, gender FROM athletes')}
+    dirty_weeks = set()
+    with conn:
+        for athlete_id, weeks in dirty.items():
+            profile = profiles.get(athlete_id)
+            dirty_weeks.update(weeks)
+            if profile is None:
+                conn.execute('DELETE FROM athlete_weekly_stats WHERE athlete_id = ?', (athlete_id,))
+                continue
+            labels = tuple(cohort_label(d, profile[d]) for d in ('weight_category', 'sport_level', 'gender'))
+            for week, stats in athlete_weeks(conn, athlete_id, profile['user_id'], sorted(weeks)).items():
+                if stats is None:
+                    conn.execute('DELETE FROM athlete_weekly_stats WHERE athlete_id = ? AND week_start = ?',
+                                 (athlete_id, week))
+                else:
+                    conn.execute('''
+                        INSERT OR REPLACE INTO athlete_weekly_stats
+                            (athlete_id, week_start, weight_category, sport_level, gender, weigh_in_days,
+                             mean_weight, weight_delta, assessments, sleep_hours, sleep_quality, appetite,
+                             water_intake)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (athlete_id, week) + labels + stats)
+
+        for week in sorted(dirty_weeks):
+            stats = conn.execute('SELECT * FROM athlete_weekly_stats WHERE week_start = ?', (week,)).fetchall()
+            conn.execute('DELETE FROM cohort_weekly WHERE week_start = ?', (week,))
+            conn.executemany('''
+                INSERT INTO cohort_weekly (dimension, cohort, week_start, athletes, weight_delta_mean,
+                                           weight_delta_median, sleep_hours, sleep_quality, appetite,
+                                           water_intake)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(row[0], row[1], week) + row[2:] for row in cohort_rows(stats)])
+
+        if not full:
+            conn.execute('DELETE FROM cohort_dirty_weeks WHERE claimed = 1')
+    return {'athlete_weeks': sum(len(weeks) for weeks in dirty.values()), 'weeks': len(dirty_weeks)}
+
+
+def main():
+    from database import DATABASE, get_db_connection
+
+    parser = argparse.ArgumentParser(description='Refresh the cohort rollup tables')
+    parser.add_argument('db_path', nargs='?', default=DATABASE)
+    parser.add_argument('--full', action='store_true', help='Rebuild the rollups from scratch')
+    args = parser.parse_args()
+
+    conn = get_db_connection(args.db_path)
+    started = time.perf_counter()
+    summary = refresh_rollups(conn, full=args.full)
+    elapsed = time.perf_counter() - started
+    cohorts = conn.execute('SELECT COUNT(DISTINCT dimension || cohort) FROM cohort_weekly').fetchone()[0]
+    conn.close()
+    print(f"📊 Recomputed {summary['athlete_weeks']} athlete-weeks and {summary['weeks']} cohort weeks "
+          f"in {elapsed:.2f}s ({cohorts} cohorts)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
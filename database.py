@@ -1,52 +1,76 @@
+import logging
+import math
 import sqlite3
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from job_queue import enqueue
+from message_archive import MESSAGE_FIELDS_SQL, conversation_page
+from migrations import ensure_schema
+from read_watermarks import mark_read, unread_counts
+from sql_profiler import ProfiledConnection
 
-# יצירת חיבור למסד הנתונים
-def get_db_connection():
-    conn = sqlite3.connect('judo.db')
+logger = logging.getLogger(__name__)
+
+# מסד הנתונים הראשי - כל הגישה לנתונים עוברת דרך המודול הזה
+DATABASE = 'judo.db'
+
+# יצירת חיבור למסד הנתונים (הסכמה נוצרת/משודרגת בחיבור הראשון לכל קובץ)
+def get_db_connection(db_path=None):
+    db_path = db_path or DATABASE
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path, factory=ProfiledConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
-def init_db():
-    """יצירת הטבלאות במסד הנתונים"""
+def init_db(db_path=None):
+    """יצירת/שדרוג הטבלאות במסד הנתונים (ראו migrations.py) - פעם אחת לכל קובץ בתהליך"""
+    applied = ensure_schema(db_path or DATABASE)
+    if applied:
+        logger.info(f"Database {db_path or DATABASE} migrated to version {applied[-1]}")
+
+def create_user(email, password_hash, role):
+    """יצירת משתמש חדש. מחזיר None אם האימייל כבר קיים"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # טבלת משתמשים
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            reset_token TEXT,
-            role TEXT CHECK (role IN ('athlete', 'nutritionist')) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # טבלת הודעות
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sender_id INTEGER NOT NULL,
-            receiver_id INTEGER,
-            role TEXT NOT NULL,
-            message TEXT NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            message_type TEXT DEFAULT 'text',
-            context TEXT,
-            is_read BOOLEAN DEFAULT 0,
-            FOREIGN KEY (sender_id) REFERENCES users(id),
-            FOREIGN KEY (receiver_id) REFERENCES users(id)
-        )
-    ''')
-    
-    conn.commit()
+    try:
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO users (email, password_hash, role) VALUES (?, ?, ?)',
+                (email, password_hash, role)
+            )
+        return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return None
+    finally:
+        conn.close()
+
+def get_user_by_email(email):
+    """קבלת משתמש לפי אימייל"""
+    conn = get_db_connection()
+    user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
     conn.close()
-    print("✅ מסד הנתונים נוצר בהצלחה!")
+    return user
 
-def add_message(sender_id, receiver_id, message, role, message_type='text', context=None):
-    """הוספת הודעה חדשה"""
+def get_user_by_id(user_id):
+    """קבלת משתמש לפי מזהה"""
+    conn = get_db_connection()
+    user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+    conn.close()
+    return user
+
+def update_password_hash(user_id, password_hash, conn=None):
+    """עדכון סיסמה (וביטול טוקני איפוס פתוחים). עם conn - בתוך הטרנזקציה של הקורא, והקורא עושה commit"""
+    if conn is not None:
+        conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+        conn.execute('DELETE FROM reset_tokens WHERE user_id = ?', (user_id,))
+        return
+    conn = get_db_connection()
+    try:
+        with conn:
+            update_password_hash(user_id, password_hash, conn)
+    finally:
+        conn.close()
+
+def add_message(sender_id, receiver_id, message, role, message_type='text', context=None, attachment=None):
+    """הוספת הודעה חדשה. attachment=(sha256, filename) מצמיד קובץ שהועלה (ראו attachments.py). מחזיר את מזהה ההודעה"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -60,47 +84,56 @@ def add_message(sender_id, receiver_id, message, role, message_type='text', cont
         INSERT INTO messages (sender_id, receiver_id, role, message, message_type, context)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (sender_id, receiver_id, role, message, message_type, context))
+    message_id = cursor.lastrowid
+    if attachment:
+        cursor.execute('''
+            INSERT INTO message_attachments (message_id, sha256, filename, sender_id, receiver_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (message_id, attachment[0], attachment[1], sender_id, receiver_id))
     conn.commit()
     conn.close()
+    return message_id
 
-def get_messages(user1_id, user2_id, limit=50):
-    """קבלת הודעות בין שני משתמשים"""
+def get_messages(user1_id, user2_id, limit=50, before=None):
+    """קבלת הודעות בין שני משתמשים, מהחדשה לישנה. before=(timestamp, id) של ההודעה הישנה ביותר שכבר הוצגה
+    ממשיך לדף הבא - הודעות ישנות נקראות מקובץ הארכיון רק כשמגיעים אליהן (ראו message_archive.py)"""
+    conn = get_db_connection()
+    try:
+        return conversation_page(conn, user1_id, user2_id, limit, before)
+    finally:
+        conn.close()
+
+def get_messages_after(user1_id, user2_id, after_id, limit=50):
+    """הודעות חדשות בין שני משתמשים (id > after_id), מהישנה לחדשה"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM messages 
-        WHERE (sender_id = ? AND receiver_id = ?) 
-           OR (sender_id = ? AND receiver_id = ?)
-        ORDER BY timestamp DESC
+    cursor.execute(f'''
+        SELECT {MESSAGE_FIELDS_SQL} FROM messages m
+        WHERE m.id > ?
+          AND ((m.sender_id = ? AND m.receiver_id = ?)
+            OR (m.sender_id = ? AND m.receiver_id = ?))
+        ORDER BY m.id
         LIMIT ?
-    ''', (user1_id, user2_id, user2_id, user1_id, limit))
+    ''', (after_id, user1_id, user2_id, user2_id, user1_id, limit))
     messages = cursor.fetchall()
     conn.close()
     return messages
 
-def mark_messages_as_read(receiver_id, sender_id):
-    """סימון הודעות כנקראו"""
+def mark_messages_as_read(receiver_id, sender_id, up_to_id=None):
+    """סימון הודעות כנקראו: קידום סימן-המים של הקורא בשיחה עד up_to_id (ברירת מחדל: ההודעה האחרונה).
+    עדכון שורה אחת במקום כל ההודעות (ראו read_watermarks.py). מחזיר את מזהה ההודעה האחרונה שנקראה"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE messages 
-        SET is_read = 1 
-        WHERE receiver_id = ? AND sender_id = ? AND is_read = 0
-    ''', (receiver_id, sender_id))
-    conn.commit()
+    with conn:
+        last_read_id = mark_read(conn, receiver_id, sender_id, up_to_id)
     conn.close()
+    return last_read_id
 
-def get_unread_messages_count(user_id):
-    """קבלת מספר הודעות שלא נקראו למשתמש"""
+def get_unread_messages_count(user_id, by_sender=False):
+    """קבלת מספר הודעות שלא נקראו למשתמש (by_sender=True: מילון {sender_id: מספר})"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT COUNT(*) as count FROM messages 
-        WHERE receiver_id = ? AND is_read = 0
-    ''', (user_id,))
-    result = cursor.fetchone()
+    counts = unread_counts(conn, user_id)
     conn.close()
-    return result['count'] if result else 0
+    return counts if by_sender else sum(counts.values())
 
 def get_messages_by_role(role, limit=50):
     """קבלת הודעות לפי תפקיד"""
@@ -114,4 +147,138 @@ def get_messages_by_role(role, limit=50):
     ''', (role, limit))
     messages = cursor.fetchall()
     conn.close()
-    return messages 
\ No newline at end of file
+    return messages 
+
+class InvalidWeightEntry(ValueError):
+    """שקילה לא תקינה באצווה; index הוא מיקומה ברשימה"""
+
+    def __init__(self, index, problem):
+        super().__init__(f'Entry {index}: {problem}')
+        self.index = index
+        self.problem = problem
+
+def _weight_entry_row(athlete_id, entry, index):
+    """
+    בדיקת שקילה אחת והמרתה לשורת weight_log: ts מספר שלם (מילישניות), weight מספר סופי,
+    day תאריך ISO (ברירת מחדל: היום של ts). InvalidWeightEntry אם משהו לא תקין
+    """
+    if not isinstance(entry, dict):
+        raise InvalidWeightEntry(index, 'expected an object')
+    ts = entry.get('ts')
+    if isinstance(ts, bool) or not isinstance(ts, int):
+        raise InvalidWeightEntry(index, 'ts must be an integer timestamp in milliseconds')
+    weight = entry.get('weight')
+    try:
+        weight = None if isinstance(weight, bool) else float(weight)
+    except (TypeError, ValueError):
+        weight = None
+    if weight is None or not math.isfinite(weight):
+        raise InvalidWeightEntry(index, 'weight must be a finite number')
+    day = entry.get('day')
+    try:
+        day = date.fromisoformat(day).isoformat() if day else datetime.utcfromtimestamp(ts / 1000).date().isoformat()
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise InvalidWeightEntry(index, 'day must be a YYYY-MM-DD date') from None
+    timing, notes = entry.get('timing'), entry.get('notes')
+    if not all(value is None or isinstance(value, str) for value in (timing, notes)):
+        raise InvalidWeightEntry(index, 'timing and notes must be text')
+    return (athlete_id, day, ts, weight, timing, notes)
+
+def add_weight_entries(athlete_id, entries):
+    """
+    הוספת אצוות שקילות. רשומה קיימת (אותו יום וזמן) נשמרת כמו שהיא, כך ששליחה חוזרת בטוחה.
+    רשומה לא תקינה מעלה InvalidWeightEntry ושום דבר מהאצווה לא נשמר
+    """
+    rows = [_weight_entry_row(athlete_id, entry, i) for i, entry in enumerate(entries)]
+
+    conn = get_db_connection()
+    with conn:
+        # rowcount של executemany סופר רק שורות שנוספו ל-weight_log, לא את מה שהטריגרים כתבו.
+        # DO NOTHING רק על כפילות של המפתח; הפרת אילוץ אחרת נכשלת ולא נבלעת בשקט
+        inserted = conn.executemany('''
+            INSERT INTO weight_log (athlete_id, day, ts, weight, timing, notes)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (athlete_id, day, ts) DO NOTHING
+        ''', rows).rowcount
+        if inserted:
+            # עדכון הסיכומים והסריקה ברקע; שקילות רבות בדקה מתאחדות לעבודה אחת
+            enqueue(conn, 'refresh_cohort_rollups', delay=60, dedupe_key='refresh_cohort_rollups')
+            enqueue(conn, 'scan_anomalies', delay=60, dedupe_key='scan_anomalies')
+    conn.close()
+    return inserted
+
+def get_weight_series(athlete_id, since_day=None):
+    """קבלת סדרת המשקלות של ספורטאי במבנה עמודות (חסכוני בגודל התשובה)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT day, ts, weight, timing, notes FROM weight_log
+        WHERE athlete_id = ? AND day >= ?
+        ORDER BY day, ts
+    ''', (athlete_id, since_day or ''))
+    rows = cursor.fetchall()
+    conn.close()
+    
+    series = {'day': [], 'ts': [], 'weight': [], 'timing': [], 'notes': []}
+    for row in rows:
+        for column in series:
+            series[column].append(row[column])
+    return series
+
+# קצה עליון לחיפוש תחילית: כל מחרוזת שמתחילה ב-q קטנה מ-q + התו האחרון ביוניקוד
+_PREFIX_END = '\U0010ffff'
+
+def search_athletes(viewer_id, query=None, weight_category=None, sport_level=None,
+                    competition_within_days=None, has_unread=False, limit=50, offset=0):
+    """
+    חיפוש ספורטאים בצד השרת: תחילית של שם או אימייל (ללא תלות באותיות גדולות),
+    קטגוריית משקל, רמה, תחרות בתוך N ימים והודעות שלא נקראו אצל viewer_id.
+    כל תנאי נשען על אינדקס (ראו migrations._create_athlete_search_indexes).
+    מחזיר (rows, has_more).
+    """
+    today = date.today()
+    conditions, params = [], []
+    if query:
+        conditions.append('''a.id IN (
+            SELECT id FROM athletes WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE
+            UNION
+            SELECT a2.id FROM users u JOIN athletes a2 ON a2.user_id = u.id
+            WHERE u.email >= ? COLLATE NOCASE AND u.email < ? COLLATE NOCASE
+        )''')
+        params += [query, query + _PREFIX_END] * 2
+    if weight_category is not None:
+        conditions.append('a.weight_category = ?')
+        params.append(weight_category)
+    if sport_level:
+        conditions.append('a.sport_level = ?')
+        params.append(sport_level)
+    if competition_within_days is not None:
+        conditions.append('''a.id IN (
+            SELECT athlete_id FROM competitions WHERE competition_date >= ? AND competition_date <= ?
+        )''')
+        params += [today.isoformat(), (today + timedelta(days=competition_within_days)).isoformat()]
+    if has_unread:
+        conditions.append('''EXISTS (
+            SELECT 1 FROM messages m
+            WHERE m.receiver_id = ? AND m.sender_id = a.user_id AND m.id > COALESCE(w.last_read_id, 0)
+        )''')
+        params.append(viewer_id)
+    
+    conn = get_db_connection()
+    rows = conn.execute(f'''
+        SELECT a.id, a.user_id, a.name, u.email, a.age, a.gender, a.weight_category, a.sport_level,
+               a.target_weight,
+               (SELECT MIN(c.competition_date) FROM competitions c
+                WHERE c.athlete_id = a.id AND c.competition_date >= ?) AS next_competition,
+               (SELECT COUNT(*) FROM messages m
+                WHERE m.receiver_id = w.reader_id AND m.sender_id = a.user_id
+                  AND m.id > w.last_read_id) AS unread_count
+        FROM athletes a
+        LEFT JOIN users u ON u.id = a.user_id
+        LEFT JOIN read_watermarks w ON w.reader_id = ? AND w.other_id = a.user_id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY a.name COLLATE NOCASE, a.id
+        LIMIT ? OFFSET ?
+    ''', [today.isoformat(), viewer_id] + params + [limit + 1, offset]).fetchall()
+    conn.close()
+    return rows[:limit], len(rows) > limit
@@ -1,7 +1,9 @@
 import sqlite3
 import json
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timezone
+from password_hashing import hash_password, check_password
+from migrations import ensure_schema
+from sql_profiler import ProfiledConnection
 
 class Database:
     def __init__(self, db_name='judo_nutrition.db'):
@@ -9,101 +11,23 @@ class Database:
         self.init_database()
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_name)
+        conn = sqlite3.connect(self.db_name, factory=ProfiledConnection)
         conn.row_factory = sqlite3.Row  # מאפשר גישה לעמודות בשם
         return conn
     
     def init_database(self):
-        """יצירת הטבלאות במסד הנתונים"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # טבלת משתמשים
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT CHECK (role IN ('athlete', 'nutritionist')) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת ספורטאים
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS athletes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                name TEXT NOT NULL,
-                age INTEGER,
-                gender TEXT CHECK (gender IN ('male', 'female')),
-                weight_category REAL,
-                sport_level TEXT,
-                target_weight REAL,
-                next_competition DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת רישומי משקל
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weight_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                athlete_id INTEGER REFERENCES athletes(id) ON DELETE CASCADE,
-                weight REAL NOT NULL,
-                timing TEXT,
-                notes TEXT,
-                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת הערכות שבועיות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weekly_assessments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                athlete_id INTEGER REFERENCES athletes(id) ON DELETE CASCADE,
-                responses TEXT, -- JSON string
-                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת הודעות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                receiver_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                content TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_read BOOLEAN DEFAULT FALSE
-            )
-        ''')
-        
-        # טבלת תחרויות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS competitions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                athlete_id INTEGER REFERENCES athletes(id) ON DELETE CASCADE,
-                name TEXT NOT NULL,
-                competition_date DATE NOT NULL,
-                weight_category REAL,
-                target_weight REAL,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        print("✅ מסד הנתונים נוצר בהצלחה!")
+        """יצירת/שדרוג הטבלאות במסד הנתונים (הסכמה המשותפת מ-migrations.py), פעם אחת לכל קובץ בתהליך"""
+        applied = ensure_schema(self.db_name)
+        if applied:
+            print("✅ מסד הנתונים נוצר בהצלחה!")
     
-    def create_user(self, email, password, role):
-        """יצירת משתמש חדש"""
+    def create_user(self, email, password, role, client=None):
+        """יצירת משתמש חדש (הגיבוב מחושב ב-process pool, לפני פתיחת החיבור)"""
+        password_hash = hash_password(password, client=client)
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            password_hash = generate_password_hash(password)
             cursor.execute('''
                 INSERT INTO users (email, password_hash, role)
                 VALUES (?, ?, ?)
@@ -117,7 +41,7 @@ class Database:
             conn.close()
             return None  # אימייל כבר קיים
     
-    def verify_user(self, email, password):
+    def verify_user(self, email, password, client=None):
         """אימות משתמש"""
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -126,7 +50,7 @@ class Database:
         user = cursor.fetchone()
         conn.close()
         
-        if user and check_password_hash(user['password_hash'], password):
+        if user and check_password(user['password_hash'], password, client=client):
             return dict(user)
         return None
     
@@ -156,19 +80,21 @@ class Database:
         
         return dict(athlete) if athlete else None
     
-    def add_weight_entry(self, athlete_id, weight, timing=None, notes=None):
-        """הוספת רישום משקל"""
+    def add_weight_entry(self, athlete_id, weight, timing=None, notes=None, recorded_at=None):
+        """הוספת רישום משקל (ביומן השקילות weight_log, לפי ה-user_id של הספורטאי)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        recorded_at = recorded_at or datetime.now(timezone.utc)
         cursor.execute('''
-            INSERT INTO weight_entries (athlete_id, weight, timing, notes)
-            VALUES (?, ?, ?, ?)
-        ''', (athlete_id, weight, timing, notes))
+            INSERT OR IGNORE INTO weight_log (athlete_id, day, ts, weight, timing, notes)
+            SELECT user_id, ?, ?, ?, ?, ? FROM athletes WHERE id = ?
+        ''', (recorded_at.date().isoformat(), int(recorded_at.timestamp() * 1000),
+              weight, timing, notes, athlete_id))
         
         conn.commit()
         conn.close()
-        return cursor.lastrowid
+        return cursor.rowcount
     
     def get_weight_history(self, athlete_id, limit=30):
         """קבלת היסטוריית משקל"""
@@ -176,10 +102,11 @@ class Database:
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT weight, DATE(recorded_at) as date, timing, notes
-            FROM weight_entries 
-            WHERE athlete_id = ?
-            ORDER BY recorded_at DESC
+            SELECT w.weight, w.day as date, w.timing, w.notes
+            FROM weight_log w
+            JOIN athletes a ON a.user_id = w.athlete_id
+            WHERE a.id = ?
+            ORDER BY w.day DESC, w.ts DESC
             LIMIT ?
         ''', (athlete_id, limit))
         
@@ -231,9 +158,9 @@ class Database:
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO messages (sender_id, receiver_id, content)
-            VALUES (?, ?, ?)
-        ''', (sender_id, receiver_id, content))
+            INSERT INTO messages (sender_id, receiver_id, role, message)
+            VALUES (?, ?, COALESCE((SELECT role FROM users WHERE id = ?), 'athlete'), ?)
+        ''', (sender_id, receiver_id, sender_id, content))
         
         conn.commit()
         conn.close()
@@ -245,7 +172,7 @@ class Database:
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT m.*, u.email as sender_email
+            SELECT m.*, m.message as content, u.email as sender_email
             FROM messages m
             JOIN users u ON m.sender_id = u.id
             WHERE (m.sender_id = ? AND m.receiver_id = ?)
@@ -282,14 +209,14 @@ class Database:
         cursor.execute('''
             SELECT a.*, u.email,
                    w.weight as current_weight,
-                   w.recorded_at as last_weigh_in
+                   w.day as last_weigh_in
             FROM athletes a
             JOIN users u ON a.user_id = u.id
             LEFT JOIN (
-                SELECT athlete_id, weight, recorded_at,
-                       ROW_NUMBER() OVER (PARTITION BY athlete_id ORDER BY recorded_at DESC) as rn
-                FROM weight_entries
-            ) w ON a.id = w.athlete_id AND w.rn = 1
+                SELECT athlete_id, weight, day,
+                       ROW_NUMBER() OVER (PARTITION BY athlete_id ORDER BY day DESC, ts DESC) as rn
+                FROM weight_log
+            ) w ON a.user_id = w.athlete_id AND w.rn = 1
             WHERE u.role = 'athlete'
             ORDER BY a.name
         ''')
@@ -298,6 +225,42 @@ class Database:
         conn.close()
         return [dict(row) for row in athletes]
 
+# פרופילים לדוגמה (משמשים גם את sample_data.py לייצור נתונים בהיקף גדול)
+SAMPLE_NUTRITIONIST = {
+    "email": "nutritionist@judo.co.il",
+    "password": "123456"
+}
+
+SAMPLE_ATHLETES = [
+    {
+        "email": "danny@judo.co.il",
+        "password": "123456",
+        "name": "דני כהן",
+        "age": 22,
+        "gender": "male",
+        "weight_category": 73.0,
+        "sport_level": "advanced"
+    },
+    {
+        "email": "sarah@judo.co.il", 
+        "password": "123456",
+        "name": "שרה לוי",
+        "age": 19,
+        "gender": "female",
+        "weight_category": 57.0,
+        "sport_level": "intermediate"
+    },
+    {
+        "email": "michael@judo.co.il",
+        "password": "123456", 
+        "name": "מיכאל אברהם",
+        "age": 25,
+        "gender": "male",
+        "weight_category": 81.0,
+        "sport_level": "professional"
+    }
+]
+
 # פונקציה ליצירת נתונים לדוגמה
 def create_sample_data():
     """יצירת נתונים לדוגמה לבדיקה"""
@@ -307,43 +270,13 @@ def create_sample_data():
     
     # יצירת תזונאית
     nutritionist_id = db.create_user(
-        email="nutritionist@judo.co.il",
-        password="123456",
+        email=SAMPLE_NUTRITIONIST["email"],
+        password=SAMPLE_NUTRITIONIST["password"],
         role="nutritionist"
     )
     
-    # יצירת ספורטאים לדוגמה
-    athletes_data = [
-        {
-            "email": "danny@judo.co.il",
-            "password": "123456",
-            "name": "דני כהן",
-            "age": 22,
-            "gender": "male",
-            "weight_category": 73.0,
-            "sport_level": "advanced"
-        },
-        {
-            "email": "sarah@judo.co.il", 
-            "password": "123456",
-            "name": "שרה לוי",
-            "age": 19,
-            "gender": "female",
-            "weight_category": 57.0,
-            "sport_level": "intermediate"
-        },
-        {
-            "email": "michael@judo.co.il",
-            "password": "123456", 
-            "name": "מיכאל אברהם",
-            "age": 25,
-            "gender": "male",
-            "weight_category": 81.0,
-            "sport_level": "professional"
-        }
-    ]
-    
-    for athlete_data in athletes_data:
+    # יצירת ספורטאים לדוגמה (לנתונים בהיקף גדול: python sample_data.py)
+    for athlete_data in SAMPLE_ATHLETES:
         # יצירת משתמש
         user_id = db.create_user(
             email=athlete_data["email"],
@@ -376,7 +309,8 @@ def create_sample_data():
                 db.add_weight_entry(
                     athlete_id=athlete_id,
                     weight=round(weight, 1),
-                    timing="לפני ארוחת בוקר"
+                    timing="לפני ארוחת בוקר",
+                    recorded_at=datetime.now(timezone.utc) - date_offset
                 )
             
             print(f"✅ נוצר ספורטאי: {athlete_data['name']}")
@@ -0,0 +1,209 @@
+"""
+Fragment caching for Jinja templates
+
+Usage inside a template, around markup that is expensive to produce:
+
+    {% cache 'roster_table', data_version('roster') %}
+        {% for athlete in load_roster() %} ... {% endfor %}
+    {% endcache %}
+
+The rendered fragment is stored under all of the tag arguments, so a
+fragment is re-rendered only when the data version changes. The view
+should pass a loader (load_roster above) rather than the rows, so the
+query behind the fragment only runs on a miss. data_version() reads
+each scope once per request, however many fragments use it.
+The versions live in the data_versions table of the database, one row
+per scope ('roster', 'athlete:<user id>'). Triggers on weight_log,
+athletes, users, weekly_assessments and competitions bump them, so a
+write made by any process (another web worker, the job worker,
+sample_data.py) invalidates the fragments cached by every worker.
+data_versions.bump() is only needed for state kept outside the database.
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from flask import g
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """Thread-safe LRU cache bounded by entry count and total UTF-8 size"""
+
+    def __init__(self, max_entries=512, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class DataVersions:
+    """
+    Version counters per data scope, e.g. ('roster',) or ('athlete', 7), read
+    from the data_versions table of database.DATABASE (one connection per thread)
+    """
+
+    def __init__(self, db_path=None):
+        self._db_path = db_path
+        self._local = threading.local()
+
+    @staticmethod
+    def _key(scope):
+        return ':'.join(str(part) for part in scope)
+
+    def _connection(self):
+        if self._db_path is None:
+            import database  # deferred: database imports the app's feature modules
+            db_path = database.DATABASE
+        else:
+            db_path = self._db_path
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != db_path:
+            from migrations import ensure_schema
+            ensure_schema(db_path)
+            if conn is not None:
+                conn.close()
+            conn = self._local.conn = sqlite3.connect(db_path, timeout=10)
+            self._local.path = db_path
+        return conn
+
+    def get(self, *scope):
+        row = self._connection().execute('SELECT version FROM data_versions WHERE scope = ?',
+                                          (self._key(scope),)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, *scope):
+        """Increment a scope for changes the triggers can't see (state outside the database)"""
+        conn = self._connection()
+        with conn:
+            return conn.execute('''
+                INSERT INTO data_versions (scope, version) VALUES (?, 1)
+                ON CONFLICT (scope) DO UPDATE SET version = version + 1
+                RETURNING version
+            ''', (self._key(scope),)).fetchone()[0]
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache key, ... %}...{% endcache %} tag"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache(), fragment_cache_namespace=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache_support', [nodes.List(args)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, key_parts, caller):
+        key = (self.environment.fragment_cache_namespace,) + tuple(key_parts)
+        cache = self.environment.fragment_cache
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, value)
+        return value
+
+
+data_versions = DataVersions()
+
+
+def init_app(app, max_entries=512, max_bytes=8 * 1024 * 1024, precompile=True, bytecode_cache=False):
+    """
+    Register the cache tag on the app and optionally compile all templates up front
+
+    bytecode_cache=True keeps compiled templates in Jinja's per-user temp
+    directory (or pass a directory path), so a new process loads them
+    instead of compiling again.
+    """
+    if bytecode_cache:
+        directory = bytecode_cache if isinstance(bytecode_cache, str) else None
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = FragmentCache(max_entries, max_bytes)
+    app.jinja_env.fragment_cache_namespace = app.import_name
+
+    def data_version(*scope):
+        # One read per scope and request, not one per fragment
+        versions = g.setdefault('data_versions', {})
+        if scope not in versions:
+            versions[scope] = data_versions.get(*scope)
+        return versions[scope]
+
+    @app.context_processor
+    def inject_data_version():
+        return {'data_version': data_version}
+
+    if precompile:
+        precompile_templates(app)
+
+
+def precompile_templates(app):
+    """Load every template into the Jinja cache so the first request skips compilation"""
+    env = app.jinja_env
+    names = env.list_templates(extensions=['html'])
+    # Make sure the compiled templates are not evicted again right away
+    capacity = getattr(env.cache, 'capacity', None)
+    if capacity is not None and capacity < len(names):
+        env.cache = type(env.cache)(len(names))
+    compiled = 0
+    for name in names:
+        try:
+            env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            app.logger.warning(f"Template {name} failed to compile: {e}")
+    return compiled
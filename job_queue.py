@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Durable background jobs in SQLite
+
+Work that should not run on the request path (cohort rollups, anomaly
+scans, weight-cut plans, message archiving, upload cleanup) is queued in
+the jobs table, in the same transaction as the change that calls for it:
+
+    enqueue(conn, 'refresh_cohort_rollups', delay=60, dedupe_key='cohorts')
+    conn.commit()
+
+A dedupe_key coalesces: while a job with the same key is queued,
+enqueueing it again is a no-op, so a burst of weigh-ins runs the rollup
+refresh once.
+
+Workers lease due jobs in batches, highest priority first, then oldest.
+A lease moves available_at LEASE_SECONDS ahead (a visibility timeout)
+and stamps the batch with a lease token. If the worker dies, the job is
+due again once the lease runs out, and the old worker's late result is
+ignored because its token no longer matches. Failed jobs are retried
+with exponential backoff until max_attempts; after that they stay in
+the table with status 'dead' and their last error. Finished jobs are
+deleted.
+
+The runner leases and records results in the main process (one
+transaction per batch) and runs the handlers in a process pool:
+
+    python job_queue.py worker [db_path] [--processes 2] [--queue default]
+    python job_queue.py enqueue <name> [db_path] [--payload '{"full": true}'] [--priority 5]
+    python job_queue.py stats [db_path]
+
+SIGTERM / SIGINT stop leasing; running jobs get --grace seconds to
+finish, jobs not started yet are handed back to the queue.
+"""
+
+import argparse
+import json
+import logging
+import os
+import secrets
+import signal
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A leased job is handed out again after this many seconds
+LEASE_SECONDS = 300
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+
+# name -> function(db_path, **payload)
+HANDLERS = {}
+
+
+def handler(name):
+    """Register a job handler; it must be importable by the pool workers (module level)"""
+    def register(fn):
+        HANDLERS[name] = fn
+        return fn
+    return register
+
+
+def enqueue(conn, name, payload=None, queue='default', priority=0, delay=0,
+            max_attempts=MAX_ATTEMPTS, dedupe_key=None):
+    """Queue a job; the caller commits. Returns its id, or None when dedupe_key is already queued"""
+    cursor = conn.execute('''
+        INSERT OR IGNORE INTO jobs (queue, name, payload, priority, available_at, max_attempts, dedupe_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (queue, name, json.dumps(payload or {}), priority, time.time() + delay, max_attempts, dedupe_key))
+    return cursor.lastrowid if cursor.rowcount else None
+
+
+def enqueue_many(conn, jobs, queue='default'):
+    """Queue (name, payload, priority) tuples in one statement; the caller commits"""
+    now = time.time()
+    conn.executemany('''
+        INSERT INTO jobs (queue, name, payload, priority, available_at, max_attempts) VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(queue, name, json.dumps(payload or {}), priority, now, MAX_ATTEMPTS) for name, payload, priority in jobs])
+
+
+def lease(conn, queue='default', limit=BATCH_SIZE, lease_seconds=LEASE_SECONDS, now=None):
+    """Claim up to limit due jobs; returns (token, jobs)"""
+    now = time.time() if now is None else now
+    token = secrets.token_hex(8)
+    with conn:
+        rows = conn.execute('''
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, available_at = ?, lease_token = ?
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE queue = ? AND status != 'dead' AND available_at <= ?
+                ORDER BY priority DESC, available_at
+                LIMIT ?
+            )
+            RETURNING id, name, payload, attempts, max_attempts
+        ''', (now + lease_seconds, token, queue, now, limit)).fetchall()
+    jobs = [{'id': row[0], 'name': row[1], 'payload': json.loads(row[2]),
+             'attempts': row[3], 'max_attempts': row[4]} for row in rows]
+    jobs.sort(key=lambda job: job['id'])
+    return token, jobs
+
+
+def _requeue(conn, job_id, token, available_at, error=None, attempts_delta=0):
+    # A newer job with the same dedupe_key may be queued meanwhile; it covers this one
+    requeued = conn.execute('''
+        UPDATE OR IGNORE jobs
+        SET status = 'queued', available_at = ?, lease_token = NULL, last_error = ?,
+            attempts = attempts + ?
+        WHERE id = ? AND lease_token = ?
+    ''', (available_at, error, attempts_delta, job_id, token)).rowcount
+    if not requeued:
+        conn.execute('DELETE FROM jobs WHERE id = ? AND lease_token = ?', (job_id, token))
+
+
+def retry_delay(attempts, base_delay=2.0, max_delay=600.0):
+    return min(base_delay * 2 ** (attempts - 1), max_delay)
+
+
+def record_results(conn, token, results, base_delay=2.0, max_delay=600.0):
+    """results: [(job, None or error string)]. Done jobs are deleted, failed ones retried or marked dead"""
+    now = time.time()
+    with conn:
+        conn.executemany('DELETE FROM jobs WHERE id = ? AND lease_token = ?',
+                         [(job['id'], token) for job, error in results if error is None])
+        for job, error in results:
+            if error is None:
+                continue
+            if job['attempts'] >= job['max_attempts']:
+                conn.execute('''
+                    UPDATE jobs SET status = 'dead', lease_token = NULL, last_error = ?
+                    WHERE id = ? AND lease_token = ?
+                ''', (error, job['id'], token))
+                logger.error(f"Giving up on job {job['id']} ({job['name']}): {error}")
+            else:
+                _requeue(conn, job['id'], token, now + retry_delay(job['attempts'], base_delay, max_delay), error)
+
+
+def release(conn, token, jobs):
+    """Hand leased jobs that were never started back to the queue, without counting an attempt"""
+    now = time.time()
+    with conn:
+        for job in jobs:
+            _requeue(conn, job['id'], token, now, attempts_delta=-1)
+
+
+def run_jobs(db_path, jobs):
+    """Run jobs one after another (in a pool worker); returns an error string or None per job"""
+    errors = []
+    for job in jobs:
+        try:
+            fn = HANDLERS.get(job['name'])
+            if fn is None:
+                raise LookupError(f"no handler for job {job['name']!r}")
+            fn(db_path, **job['payload'])
+            errors.append(None)
+        except Exception as e:
+            errors.append(f'{type(e).__name__}: {e}')
+    return errors
+
+
+def queue_stats(conn):
+    """{(queue, status): (jobs, due now)}"""
+    rows = conn.execute('''
+        SELECT queue, status, COUNT(*), SUM(status != 'dead' AND available_at <= ?) FROM jobs GROUP BY queue, status
+    ''', (time.time(),)).fetchall()
+    return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+
+class Worker:
+    """
+    Lease batches from one queue and run them on a process pool
+    (processes=0 runs them in this process, e.g. in tests)
+    """
+
+    def __init__(self, db_path, queue='default', processes=None, batch_size=BATCH_SIZE,
+                 poll_interval=1.0, lease_seconds=LEASE_SECONDS, grace=30.0,
+                 base_delay=2.0, max_delay=600.0):
+        self.db_path = db_path
+        self.queue = queue
+        self.processes = min(4, os.cpu_count() or 1) if processes is None else processes
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.grace = grace
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.processed = 0
+        self._stop = threading.Event()
+        self._pool = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _run_batch(self, conn, token, jobs):
+        if not self.processes:
+            return list(zip(jobs, run_jobs(self.db_path, jobs)))
+
+        from concurrent.futures import wait
+
+        # One task per worker process: a chunk of jobs per pickle round trip
+        size = -(-len(jobs) // self.processes)
+        chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        futures = {self._pool.submit(run_jobs, self.db_path, chunk): chunk for chunk in chunks}
+        deadline = None
+        pending = set(futures)
+        while pending:
+            if self._stop.is_set() and deadline is None:
+                deadline = time.monotonic() + self.grace
+            timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+        results, unstarted = [], []
+        for future, chunk in futures.items():
+            if future.done() and not future.cancelled():
+                try:
+                    results.extend(zip(chunk, future.result()))
+                except Exception as e:
+                    # The worker process died (BrokenProcessPool): retry the chunk
+                    results.extend((job, f'{type(e).__name__}: {e}') for job in chunk)
+            elif future.cancel():
+                unstarted.extend(chunk)
+            # Still running after the grace period: its lease expires and it runs again
+        if unstarted:
+            release(conn, token, unstarted)
+        return results
+
+    def run_once(self, conn):
+        """Lease, run and record one batch; returns the number of jobs leased"""
+        token, jobs = lease(conn, self.queue, self.batch_size, self.lease_seconds)
+        if not jobs:
+            return 0
+        results = self._run_batch(conn, token, jobs)
+        record_results(conn, token, results, self.base_delay, self.max_delay)
+        self.processed += len(results)
+        return len(jobs)
+
+    def run(self):
+        from migrations import ensure_schema
+        ensure_schema(self.db_path)
+        if self.processes:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Not fork: the worker may share its process with other threads (tests, benchmarks)
+            self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=multiprocessing.get_context('forkserver'))
+        conn = self._connect()
+        try:
+            while not self._stop.is_set():
+                try:
+                    leased = self.run_once(conn)
+                except sqlite3.Error as e:
+                    logger.warning(f"Job queue unavailable: {e}")
+                    leased = 0
+                if leased < self.batch_size:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            conn.close()
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stop(self, *_):
+        self._stop.set()
+
+
+# ---------------------------------------------------------------------------
+# Jobs of the app (functions of the batch scripts, each with its own connection)
+# ---------------------------------------------------------------------------
+
+def _connection(db_path):
+    from database import get_db_connection
+    return get_db_connection(db_path)
+
+
+@handler('refresh_cohort_rollups')
+def refresh_cohort_rollups(db_path, full=False):
+    from cohort_rollups import refresh_rollups
+    conn = _connection(db_path)
+    try:
+        refresh_rollups(conn, full=full)
+    finally:
+        conn.close()
+
+
+@handler('scan_anomalies')
+def scan_anomalies(db_path, full=False):
+    from anomaly_alerts import run_scan
+    conn = _connection(db_path)
+    try:
+        run_scan(conn, full=full)
+    finally:
+        conn.close()
+
+
+@handler('recompute_weight_cut_plans')
+def recompute_weight_cut_plans(db_path):
+    from weight_cut import recompute_plans
+    conn = _connection(db_path)
+    try:
+        recompute_plans(conn)
+    finally:
+        conn.close()
+
+
+@handler('archive_messages')
+def archive_old_messages(db_path, days=None):
+    from message_archive import RETENTION_DAYS, archive_messages, archive_state, default_archive_path
+    conn = _connection(db_path)
+    try:
+        state = archive_state(conn)
+        archive_path = state['archive_path'] if state else default_archive_path(db_path)
+        archive_messages(conn, archive_path, days or RETENTION_DAYS)
+    finally:
+        conn.close()
+
+
+@handler('cleanup_uploads')
+def cleanup_old_uploads(db_path, upload_folder=None):
+    from attachments import cleanup_uploads
+    conn = _connection(db_path)
+    try:
+        cleanup_uploads(conn, upload_folder or os.environ.get('UPLOAD_FOLDER', 'uploads'))
+    finally:
+        conn.close()
+
+
+@handler('noop')
+def noop(db_path, **payload):
+    """Does nothing; for bench_job_queue.py and smoke tests of a deployment"""
+
+
+def main():
+    from database import DATABASE
+
+    parser = argparse.ArgumentParser(description='SQLite job queue')
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help='Run jobs until SIGTERM/SIGINT')
+    worker.add_argument('db_path', nargs='?', default=DATABASE)
+    worker.add_argument('--queue', default='default')
+    worker.add_argument('--processes', type=int, default=None)
+    worker.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    worker.add_argument('--grace', type=float, default=30.0, help='Seconds running jobs get to finish on shutdown')
+    add = sub.add_parser('enqueue', help='Queue one job')
+    add.add_argument('name', choices=sorted(HANDLERS))
+    add.add_argument('db_path', nargs='?', default=DATABASE)
+    add.add_argument('--queue', default='default')
+    add.add_argument('--payload', default='{}')
+    add.add_argument('--priority', type=int, default=0)
+    stats = sub.add_parser('stats', help='Jobs per queue and status')
+    stats.add_argument('db_path', nargs='?', default=DATABASE)
+    args = parser.parse_args()
+
+    from database import get_db_connection
+    if args.command == 'worker':
+        runner = Worker(args.db_path, args.queue, args.processes, args.batch_size, grace=args.grace)
+        signal.signal(signal.SIGTERM, runner.stop)
+        signal.signal(signal.SIGINT, runner.stop)
+        print(f"⚙️ Worker on queue {args.queue!r} with {runner.processes} processes ({args.db_path})")
+        runner.run()
+        print(f"🛑 Stopped after {runner.processed} jobs")
+    elif args.command == 'enqueue':
+        conn = get_db_connection(args.db_path)
+        with conn:
+            job_id = enqueue(conn, args.name, json.loads(args.payload), args.queue, args.priority)
+        conn.close()
+        print(f"📥 Queued job {job_id} ({args.name})")
+    else:
+        conn = get_db_connection(args.db_path)
+        for (queue, status), (count, due) in sorted(queue_stats(conn).items()):
+            print(f"   {queue:<12}{status:<10}{count:>8} jobs, {due or 0} due")
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
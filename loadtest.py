@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Load test with realistic athlete and nutritionist sessions
+
+Starts app.py on a free local port (threaded werkzeug server, fresh
+database in the temp directory) unless --url points at a running server,
+then runs virtual users as threads, each with its own keep-alive
+connection and session cookie:
+
+- athlete: login, dashboard, daily weigh-in, weekly questionnaire (about
+  one session in seven), then chat with their nutritionist for
+  --session-length seconds, either polling /api/get_messages every 3 s
+  like chat.js (--chat-mode poll) or long-polling /api/chat/wait
+  (--chat-mode push), sending a message now and then;
+- nutritionist: login, profile, then browses the conversations of their
+  athletes and replies to some of them.
+
+Reports per-endpoint request count, throughput, p50/p95/p99 and errors,
+plus the delivery latency of nutritionist replies (time from send until
+the athlete's client sees the message), which is what polling vs push
+changes.
+
+Usage:
+    python loadtest.py --athletes 50 --nutritionists 5 --duration 60
+    python loadtest.py --chat-mode push --athletes 50 --duration 60
+    python loadtest.py --url http://127.0.0.1:5000 --athletes 20
+
+The /nutritionist page is not part of the scenario: base.html links to
+an 'index' endpoint that does not exist, so it always returns 500.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+# chat.js: setInterval(loadMessages, 3000)
+POLL_INTERVAL = 3.0
+PUSH_TIMEOUT = 25
+PASSWORD = 'loadtest-password'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Stats:
+    """Latencies per request name; one instance per virtual user, merged at the end"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.delivery = []
+
+    def add(self, name, seconds, ok):
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def merge(self, other):
+        for name, values in other.latencies.items():
+            self.latencies.setdefault(name, []).extend(values)
+        for name, count in other.errors.items():
+            self.errors[name] = self.errors.get(name, 0) + count
+        self.delivery.extend(other.delivery)
+
+
+class Client:
+    """Keep-alive HTTP connection with a cookie jar of one"""
+
+    def __init__(self, base_url, stats):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.stats = stats
+        self.cookies = {}
+        self.conn = None
+        self.retry_after = None
+
+    def request(self, method, path, body=None, name=None, expect=(200, 201)):
+        headers = {'Accept': 'application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=PUSH_TIMEOUT + 10)
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.stats.add(name or path, time.perf_counter() - start, False)
+            self.close()
+            return None, None
+        self.stats.add(name or path, time.perf_counter() - start, response.status in expect)
+        self.retry_after = response.getheader('Retry-After')
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie':
+                key, _, rest = value.partition('=')
+                self.cookies[key] = rest.split(';', 1)[0]
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url, email, role, deadline, args, seed):
+        super().__init__(daemon=True)
+        self.stats = Stats()
+        self.client = Client(base_url, self.stats)
+        self.email = email
+        self.role = role
+        self.deadline = deadline
+        self.args = args
+        self.random = random.Random(seed)
+        self.user_id = None
+        self.partners = []
+
+    def register(self):
+        status, body = self.client.request('POST', '/api/register', {
+            'email': self.email, 'password': PASSWORD, 'role': self.role, 'name': self.email.split('@')[0]
+        }, name='register', expect=(201, 409))
+        if status == 201:
+            self.user_id = body['user']['id']
+        self.client.cookies.clear()
+        return self.user_id
+
+    def login(self, attempts=5):
+        """True once logged in; backs off on 429/503 from the hashing pool"""
+        for _ in range(attempts):
+            status, _ = self.client.request('POST', '/api/login', {'email': self.email, 'password': PASSWORD},
+                                            name='login')
+            if status == 200:
+                return True
+            if status not in (429, 503) or time.monotonic() >= self.deadline:
+                return False
+            self.think(0, float(self.client.retry_after or 1))
+        return False
+
+    def logout(self):
+        self.client.request('POST', '/api/logout', name='logout')
+
+    def think(self, low, high):
+        time.sleep(min(self.random.uniform(low, high), max(0.0, self.deadline - time.monotonic())))
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            if self.login():
+                self.session()
+                self.logout()
+            else:
+                self.think(1, 3)
+        self.client.close()
+
+
+class AthleteUser(VirtualUser):
+    def session(self):
+        self.client.request('GET', '/api/athlete/dashboard', name='dashboard')
+        self.think(0.5, 2)
+        self.client.request('POST', '/api/weight', {
+            'weight': round(self.random.uniform(60, 90), 1), 'timing': 'morning'
+        }, name='weight')
+        if self.random.random() < 1 / 7:
+            self.client.request('POST', '/api/assessment', {
+                'answers': {str(q): self.random.randint(1, 5) for q in range(1, 11)}
+            }, name='assessment')
+        self.chat(min(self.deadline, time.monotonic() + self.args.session_length))
+
+    def chat(self, until):
+        partner = self.partners[0]
+        last_id = 0
+        while time.monotonic() < until:
+            if self.args.chat_mode == 'push':
+                timeout = max(0.1, min(PUSH_TIMEOUT, until - time.monotonic()))
+                status, body = self.client.request(
+                    'GET', f'/api/chat/wait?user2_id={partner}&after_id={last_id}&timeout={timeout:.1f}',
+                    name='chat_wait')
+                messages = body['messages'] if status == 200 else []
+            else:
+                status, body = self.client.request('GET', f'/api/get_messages?user2_id={partner}',
+                                                   name='get_messages')
+                messages = [m for m in body['messages'] if m['id'] > last_id] if status == 200 else []
+            if status != 200:
+                return
+            now = time.time()
+            for message in messages:
+                # Only the first time a message is seen counts; the first fetch is history
+                if last_id and message['sender_id'] == partner and message['message'].startswith('t='):
+                    self.stats.delivery.append(now - float(message['message'][2:].split()[0]))
+                last_id = max(last_id, message['id'])
+            if self.random.random() < 0.05:
+                self.client.request('POST', '/api/send_message', {
+                    'receiver_id': partner, 'content': 'שקלתי הבוקר, מה לאכול לפני האימון?'
+                }, name='send_message')
+            if self.args.chat_mode == 'poll':
+                time.sleep(min(POLL_INTERVAL, max(0.0, until - time.monotonic())))
+
+
+class NutritionistUser(VirtualUser):
+    def session(self):
+        self.client.request('GET', '/api/user/profile', name='profile')
+        until = min(self.deadline, time.monotonic() + self.args.session_length)
+        while time.monotonic() < until and self.partners:
+            athlete_id = self.random.choice(self.partners)
+            self.client.request('GET', f'/api/get_messages?user2_id={athlete_id}', name='roster_messages')
+            if self.random.random() < 0.3:
+                self.client.request('POST', '/api/send_message', {
+                    'receiver_id': athlete_id, 'content': f't={time.time():.6f} לשתות יותר מים'
+                }, name='send_message')
+            self.think(1, 3)
+
+
+def start_local_server(db_path):
+    """Serve app.py on 127.0.0.1:<free port> from a background thread"""
+    from werkzeug.serving import make_server
+
+    # Every virtual user connects from 127.0.0.1, i.e. one hashing "client" and one rate-limited IP
+    os.environ.setdefault('HASH_PER_CLIENT_LIMIT', '64')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    import database
+    database.DATABASE = db_path
+    database.init_db(db_path)
+    import app as judo_app
+
+    server = make_server('127.0.0.1', 0, judo_app.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run_load(base_url, athletes, nutritionists, duration, chat_mode='poll', session_length=60,
+             ramp_up=5, seed=1):
+    """Run the scenario against base_url and return the merged Stats"""
+    args = argparse.Namespace(chat_mode=chat_mode, session_length=session_length)
+    run_id = uuid.uuid4().hex[:8]
+    deadline = time.monotonic() + ramp_up + duration
+
+    staff = [NutritionistUser(base_url, f'nutri{i}-{run_id}@load.test', 'nutritionist', deadline, args, seed + i)
+             for i in range(max(1, nutritionists))]
+    squad = [AthleteUser(base_url, f'athlete{i}-{run_id}@load.test', 'athlete', deadline, args, seed + 1000 + i)
+             for i in range(athletes)]
+    for user in staff + squad:
+        user.register()
+    for i, athlete in enumerate(squad):
+        nutritionist = staff[i % len(staff)]
+        athlete.partners = [nutritionist.user_id]
+        nutritionist.partners.append(athlete.user_id)
+
+    users = staff + squad
+    for user in users:
+        user.start()
+        time.sleep(ramp_up / max(1, len(users)))
+    for user in users:
+        user.join(duration + ramp_up + PUSH_TIMEOUT + 15)
+
+    stats = Stats()
+    for user in users:
+        stats.merge(user.stats)
+    return stats
+
+
+def report(stats, duration):
+    print(f"{'request':<18}{'count':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    total = 0
+    for name in sorted(stats.latencies):
+        values = stats.latencies[name]
+        total += len(values)
+        print(f"{name:<18}{len(values):>8}{len(values) / duration:>9.1f}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}{stats.errors.get(name, 0):>8}")
+    print(f"{'total':<18}{total:>8}{total / duration:>9.1f}")
+    if stats.delivery:
+        print(f"📨 Reply delivery: n={len(stats.delivery)} "
+              f"p50={percentile(stats.delivery, 50) * 1000:.0f} ms "
+              f"p95={percentile(stats.delivery, 95) * 1000:.0f} ms "
+              f"p99={percentile(stats.delivery, 99) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Athlete/nutritionist load test')
+    parser.add_argument('--url', help='Target a running server instead of starting one')
+    parser.add_argument('--db', help='Database for the local server (default: fresh file in the temp dir)')
+    parser.add_argument('--athletes', type=int, default=20)
+    parser.add_argument('--nutritionists', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of load after ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5)
+    parser.add_argument('--session-length', type=float, default=60, help='Seconds of chat per session')
+    parser.add_argument('--chat-mode', choices=['poll', 'push'], default='poll')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    base_url = args.url
+    if not base_url:
+        db_path = args.db or os.path.join(tempfile.gettempdir(), f'judo_loadtest_{os.getpid()}.db')
+        server, base_url = start_local_server(db_path)
+        print(f"🚀 Serving app.py at {base_url} (db: {db_path})")
+
+    print(f"🏋️ {args.athletes} athletes, {args.nutritionists} nutritionists, "
+          f"{args.duration:.0f}s, chat mode: {args.chat_mode}")
+    started = time.monotonic()
+    stats = run_load(base_url, args.athletes, args.nutritionists, args.duration, args.chat_mode,
+                     args.session_length, args.ramp_up, args.seed)
+    report(stats, time.monotonic() - started)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""
+Durable outbox for outgoing e-mail
+
+Request handlers never talk to the mail server. They insert a row into the
+mail_outbox table (in the same transaction as the data the mail is about)
+and wake the background sender:
+
+    enqueue_email(conn, user['email'], subject, body)
+    conn.commit()
+    outbox.wake()
+
+OutboxSender is a daemon thread that claims due rows in batches, sends a
+whole batch over one SMTP connection and records the outcome. Failed rows
+are retried with exponential backoff until max_attempts is reached; so is
+a batch whose transport raised. A row
+that was claimed by a process that died is picked up again once its lease
+expires.
+
+LocalSMTPServer is a small in-process SMTP sink for tests and local
+development; it just keeps every message it receives.
+"""
+
+import logging
+import smtplib
+import socketserver
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from email.parser import BytesParser
+from email.policy import default as default_policy
+
+logger = logging.getLogger(__name__)
+
+# A claimed row is considered abandoned after this many seconds
+CLAIM_LEASE_SECONDS = 300
+
+
+def create_outbox_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mail_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_mail_outbox_due
+        ON mail_outbox (status, next_attempt_at)
+    ''')
+
+
+def enqueue_email(conn, recipient, subject, body):
+    """Queue a message; the caller commits together with its own changes"""
+    cursor = conn.execute('''
+        INSERT INTO mail_outbox (recipient, subject, body, next_attempt_at)
+        VALUES (?, ?, ?, ?)
+    ''', (recipient, subject, body, time.time()))
+    return cursor.lastrowid
+
+
+def build_message(sender, email):
+    msg = EmailMessage()
+    msg['From'] = sender
+    msg['To'] = email['recipient']
+    msg['Subject'] = email['subject']
+    msg.set_content(email['body'])
+    return msg
+
+
+# ---------------------------------------------------------------------------
+# Transports - send_batch(emails) returns {outbox_id: None or error string}
+# ---------------------------------------------------------------------------
+
+class SMTPTransport:
+    """Send a batch over a single SMTP connection"""
+
+    def __init__(self, host, port=25, username=None, password=None,
+                 use_tls=False, sender=None, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.sender = sender or username or 'noreply@localhost'
+        self.timeout = timeout
+
+    def send_batch(self, emails):
+        results = {}
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                for email in emails:
+                    try:
+                        smtp.send_message(build_message(self.sender, email))
+                        results[email['id']] = None
+                    except smtplib.SMTPServerDisconnected:
+                        raise
+                    except (smtplib.SMTPException, ValueError) as e:
+                        results[email['id']] = str(e)
+        except (OSError, smtplib.SMTPException) as e:
+            # Connection-level failure: everything not sent yet is retried
+            for email in emails:
+                results.setdefault(email['id'], str(e) or type(e).__name__)
+        return results
+
+
+class FlaskMailTransport:
+    """Send through a Flask-Mail instance, one connection per batch
+
+    Without a mail instance, flask_mail is imported and Mail(app) created
+    on the first batch, so app startup doesn't pay for it.
+    """
+
+    def __init__(self, app, mail=None):
+        self.app = app
+        self.mail = mail
+
+    def send_batch(self, emails):
+        from flask_mail import Mail, Message
+
+        if self.mail is None:
+            self.mail = Mail(self.app)
+        results = {}
+        with self.app.app_context():
+            try:
+                with self.mail.connect() as connection:
+                    for email in emails:
+                        msg = Message(email['subject'],
+                                      sender=self.app.config.get('MAIL_USERNAME'),
+                                      recipients=[email['recipient']])
+                        msg.body = email['body']
+                        connection.send(msg)
+                        results[email['id']] = None
+            except (OSError, smtplib.SMTPException) as e:
+                for email in emails:
+                    results.setdefault(email['id'], str(e) or type(e).__name__)
+        return results
+
+
+class ConsoleTransport:
+    """Log messages instead of sending them (development default)"""
+
+    def send_batch(self, emails):
+        for email in emails:
+            body = '\n'.join(f"   {line}" for line in email['body'].splitlines())
+            logger.info(f"📧 EMAIL SIMULATION to {email['recipient']}: {email['subject']}\n{body}")
+        return {email['id']: None for email in emails}
+
+
+# ---------------------------------------------------------------------------
+# Background sender
+# ---------------------------------------------------------------------------
+
+class OutboxSender:
+    """Daemon thread that drains mail_outbox in batches"""
+
+    def __init__(self, db_path, transport, batch_size=20, poll_interval=5.0,
+                 max_attempts=5, base_delay=2.0, max_delay=600.0):
+        self.db_path = db_path
+        self.transport = transport
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def retry_delay(self, attempts):
+        return min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+
+    def claim_batch(self, conn, now=None):
+        now = time.time() if now is None else now
+        with conn:
+            rows = conn.execute('''
+                UPDATE mail_outbox
+                SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM mail_outbox
+                    WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING id, recipient, subject, body, attempts
+            ''', (now + CLAIM_LEASE_SECONDS, now, self.batch_size)).fetchall()
+        return [dict(row) for row in rows]
+
+    def process_batch(self):
+        """Send one batch of due messages; returns the number of rows claimed"""
+        conn = self._connect()
+        try:
+            emails = self.claim_batch(conn)
+            if not emails:
+                return 0
+            try:
+                results = self.transport.send_batch(emails)
+            except Exception as e:
+                # An unexpected transport error still counts as a failed attempt for every
+                # claimed row, so they get their backoff instead of sitting in 'sending'
+                logger.exception(f"Mail transport failed on a batch of {len(emails)}")
+                results = {email['id']: f'{type(e).__name__}: {e}' for email in emails}
+            now = time.time()
+            with conn:
+                for email in emails:
+                    error = results.get(email['id'], 'not sent')
+                    if error is None:
+                        conn.execute('''
+                            UPDATE mail_outbox
+                            SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+                            WHERE id = ?
+                        ''', (email['id'],))
+                    elif email['attempts'] >= self.max_attempts:
+                        conn.execute('''
+                            UPDATE mail_outbox SET status = 'failed', last_error = ?
+                            WHERE id = ?
+                        ''', (error, email['id']))
+                        logger.error(f"Giving up on mail {email['id']} to {email['recipient']}: {error}")
+                    else:
+                        conn.execute('''
+                            UPDATE mail_outbox
+                            SET status = 'pending', next_attempt_at = ?, last_error = ?
+                            WHERE id = ?
+                        ''', (now + self.retry_delay(email['attempts']), error, email['id']))
+            return len(emails)
+        finally:
+            conn.close()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.process_batch()
+            except sqlite3.Error as e:
+                logger.warning(f"Mail outbox unavailable: {e}")
+                claimed = 0
+            except Exception:
+                # Keep the thread alive; rows left claimed are retried once their lease expires
+                logger.exception("Mail outbox sender error")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name='mail-outbox', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Start the sender if needed and have it look at the outbox now"""
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def outbox_counts(conn):
+    rows = conn.execute('SELECT status, COUNT(*) FROM mail_outbox GROUP BY status').fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+# ---------------------------------------------------------------------------
+# Local SMTP stand-in
+# ---------------------------------------------------------------------------
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply('220 localhost ESMTP stand-in')
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b'..') else chunk)
+                message = BytesParser(policy=default_policy).parsebytes(b''.join(data))
+                self.server.messages.append({'from': mail_from, 'to': rcpt_to, 'message': message})
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """SMTP sink on localhost; received messages are kept in .messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages = []
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    server = LocalSMTPServer(port=1025)
+    print(f"📬 Local SMTP stand-in listening on 127.0.0.1:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tiered message retention
+
+The messages table keeps the hot history only. archive_messages moves
+messages older than RETENTION_DAYS into a separate SQLite file (by
+default judo_archive.db next to judo.db), BATCH_SIZE rows per
+transaction, so the chat queries, the unread counts and the
+messages_fts index work on a small table.
+
+Unread messages are never archived (the unread counts only look at the
+hot table), so the archive holds read history only: messages at or
+below their receiver's read watermark (read_watermarks.py). The messages_fts delete trigger drops the
+archived rows from the search index: /api/chat/search covers the hot
+history.
+
+message_archive_state (in the main database) records where the archive
+file is and archived_before: every archived message is older than that
+timestamp. conversation_page reads the hot table first and attaches the
+archive only when the page reaches past archived_before, i.e. when
+paging beyond the hot history:
+
+    python message_archive.py [db_path] [--days 180] [--archive path]
+
+Each batch copies its rows into the archive and deletes them from
+messages in one transaction. With WAL, SQLite commits the two files
+separately; the copy is INSERT OR IGNORE and the delete only removes
+rows already in the archive, so a run interrupted between them is
+finished by the next one.
+"""
+
+import argparse
+import heapq
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from read_watermarks import IS_READ_SQL
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = int(os.environ.get('MESSAGE_RETENTION_DAYS', 180))
+BATCH_SIZE = 5000
+# Columns copied to the archive (legacy files may have more in messages)
+MESSAGE_COLUMNS = ('id', 'sender_id', 'receiver_id', 'role', 'message', 'timestamp',
+                   'message_type', 'context', 'is_read')
+_COLUMNS = ', '.join(MESSAGE_COLUMNS)
+# Select list of a messages row aliased m, with is_read taken from the read watermarks
+MESSAGE_FIELDS_SQL = ', '.join(f'm.{column}' for column in MESSAGE_COLUMNS[:-1]) + f', {IS_READ_SQL} AS is_read'
+# Messages that may leave the hot table: read, or without a receiver
+_ARCHIVABLE = f'({IS_READ_SQL} OR m.receiver_id IS NULL)'
+
+
+def default_archive_path(db_path):
+    root, ext = os.path.splitext(os.path.abspath(db_path))
+    return f'{root}_archive{ext or ".db"}'
+
+
+def attach_archive(conn, archive_path):
+    """ATTACH the archive file as schema "archive", creating its table on first use"""
+    conn.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive.messages (
+            id INTEGER PRIMARY KEY,
+            sender_id INTEGER NOT NULL,
+            receiver_id INTEGER,
+            role TEXT NOT NULL,
+            message TEXT NOT NULL,
+            timestamp TIMESTAMP,
+            message_type TEXT DEFAULT 'text',
+            context TEXT,
+            is_read BOOLEAN DEFAULT 1
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS archive.idx_messages_conversation
+        ON messages (sender_id, receiver_id, timestamp)
+    ''')
+    conn.commit()
+
+
+def archive_state(conn):
+    return conn.execute('SELECT * FROM main.message_archive_state WHERE id = 1').fetchone()
+
+
+def archive_messages(conn, archive_path, older_than_days=RETENTION_DAYS, batch_size=BATCH_SIZE,
+                     now=None, progress=None):
+    """
+    Move read messages older than older_than_days to archive_path.
+    Returns the number of messages moved.
+    """
+    now = now or datetime.now(timezone.utc)
+    # Same format as CURRENT_TIMESTAMP (UTC), so it compares with messages.timestamp
+    cutoff = (now - timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+    archive_path = os.path.abspath(archive_path)
+    state = archive_state(conn)
+    if state and state['archive_path'] != archive_path:
+        raise ValueError(f"messages are already archived to {state['archive_path']}")
+
+    attach_archive(conn, archive_path)
+    moved, last_id = 0, 0
+    try:
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            ids = [row[0] for row in conn.execute(f'''
+                SELECT m.id FROM main.messages m
+                WHERE m.id > ? AND m.timestamp < ? AND {_ARCHIVABLE}
+                ORDER BY m.id LIMIT ?
+            ''', (last_id, cutoff, batch_size))]
+            if not ids:
+                conn.rollback()
+                break
+            first, last_id = ids[0], ids[-1]
+            # The boundary moves in the same transaction as the rows leave the hot table
+            conn.execute('''
+                INSERT INTO main.message_archive_state (id, archive_path, archived_before, last_run_at)
+                VALUES (1, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE SET
+                    archived_before = MAX(archived_before, excluded.archived_before),
+                    last_run_at = excluded.last_run_at
+            ''', (archive_path, cutoff))
+            conn.execute(f'''
+                INSERT OR IGNORE INTO archive.messages ({_COLUMNS})
+                SELECT {MESSAGE_FIELDS_SQL} FROM main.messages m
+                WHERE m.id BETWEEN ? AND ? AND m.timestamp < ? AND {_ARCHIVABLE}
+            ''', (first, last_id, cutoff))
+            deleted = conn.execute('''
+                DELETE FROM main.messages
+                WHERE id BETWEEN ? AND ? AND id IN (SELECT id FROM archive.messages WHERE id BETWEEN ? AND ?)
+            ''', (first, last_id, first, last_id)).rowcount
+            conn.execute('UPDATE main.message_archive_state SET archived_count = archived_count + ? WHERE id = 1',
+                         (deleted,))
+            conn.commit()
+            moved += deleted
+            if progress:
+                progress(f"   archived {moved} messages (up to id {last_id})")
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute('DETACH DATABASE archive')
+    return moved
+
+
+def _page(conn, schema, user1_id, user2_id, limit, before):
+    params = [user1_id, user2_id, user2_id, user1_id]
+    keyset = ''
+    if before:
+        keyset = 'AND (m.timestamp < ? OR (m.timestamp = ? AND m.id < ?))'
+        params += [before[0], before[0], before[1]]
+    return conn.execute(f'''
+        SELECT {MESSAGE_FIELDS_SQL} FROM {schema}.messages m
+        WHERE ((m.sender_id = ? AND m.receiver_id = ?) OR (m.sender_id = ? AND m.receiver_id = ?)) {keyset}
+        ORDER BY m.timestamp DESC, m.id DESC
+        LIMIT ?
+    ''', params + [limit]).fetchall()
+
+
+def conversation_page(conn, user1_id, user2_id, limit=50, before=None):
+    """
+    Messages between two users, newest first. before=(timestamp, id) of the
+    oldest message already shown continues the list. The archive is only
+    read when the hot rows do not fill the page with messages newer than
+    archived_before.
+    """
+    rows = _page(conn, 'main', user1_id, user2_id, limit, before)
+    state = archive_state(conn)
+    if state is None or (len(rows) == limit and (rows[-1]['timestamp'] or '') >= state['archived_before']):
+        return rows
+    if not os.path.exists(state['archive_path']):
+        logger.warning(f"Message archive {state['archive_path']} is missing")
+        return rows
+
+    conn.execute('ATTACH DATABASE ? AS archive', (state['archive_path'],))
+    try:
+        archived = _page(conn, 'archive', user1_id, user2_id, limit, before)
+    finally:
+        conn.execute('DETACH DATABASE archive')
+    newest_first = lambda row: (row['timestamp'] or '', row['id'])
+    return list(heapq.merge(rows, archived, key=newest_first, reverse=True))[:limit]
+
+
+def main():
+    from database import DATABASE, get_db_connection
+
+    parser = argparse.ArgumentParser(description='Move old read messages to the archive database')
+    parser.add_argument('db_path', nargs='?', default=DATABASE)
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS, help='Keep this many days in messages')
+    parser.add_argument('--archive', help='Archive file (default: <db>_archive.db)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = get_db_connection(args.db_path)
+    state = archive_state(conn)
+    archive_path = args.archive or (state['archive_path'] if state else default_archive_path(args.db_path))
+    started = time.perf_counter()
+    moved = archive_messages(conn, archive_path, args.days, args.batch_size, progress=print)
+    elapsed = time.perf_counter() - started
+    hot = conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+    conn.close()
+    print(f"📦 Archived {moved} messages older than {args.days} days to {archive_path} ({elapsed:.2f}s)")
+    print(f"   {hot} messages left in {args.db_path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Prometheus-style metrics
+
+Counters and histograms are sharded per thread: each thread only ever
+writes its own dict, so the request path takes no lock. A scrape of
+/metrics sums the shards of all threads and renders the text exposition
+format. When a thread exits (the development server starts one per
+request) its shard is folded into a base total and dropped, so the
+number of shards follows the live threads, not the requests served. Gauges that describe other subsystems (fragment cache, hashing
+pool, mail outbox, SQLite connections) are read at scrape time through
+callbacks registered with register_gauge().
+
+    metrics.inc('weight_sync_entries_total', inserted)
+    metrics.observe('http_request_duration_seconds', 0.012, endpoint='login', method='POST')
+    metrics.register_gauge('fragment_cache_entries', 'Cached fragments', lambda: [({}, n)])
+"""
+
+import bisect
+import itertools
+import threading
+import time
+import weakref
+
+from flask import Response, g, request
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_items, extra=()):
+    items = list(label_items) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def _new_shard():
+    return {'counters': {}, 'gauges': {}, 'histograms': {}}
+
+
+def _fold(into, shard):
+    """Add the values of shard to into"""
+    # Copy first: the owning thread may add keys while we iterate
+    for key, value in list(shard['counters'].items()):
+        into['counters'][key] = into['counters'].get(key, 0) + value
+    for key, value in list(shard['gauges'].items()):
+        into['gauges'][key] = into['gauges'].get(key, 0) + value
+    for key, (bucket_counts, total, count) in list(shard['histograms'].items()):
+        merged = into['histograms'].get(key)
+        if merged is None:
+            merged = into['histograms'][key] = [[0] * len(bucket_counts), 0.0, 0]
+        merged[0] = [a + b for a, b in zip(merged[0], list(bucket_counts))]
+        merged[1] += total
+        merged[2] += count
+
+
+class _ShardOwner:
+    """Held only by a thread's local storage: it is freed when the thread exits"""
+
+
+class MetricsRegistry:
+    """Per-thread counter/histogram shards, merged when scraped"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = {}
+        self._shard_ids = itertools.count()
+        self._retired = _new_shard()
+        self._shards_lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._buckets = {}
+        self._gauges = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _new_shard()
+            owner = self._local.owner = _ShardOwner()
+            shard_id = next(self._shard_ids)
+            with self._shards_lock:
+                self._shards[shard_id] = shard
+            weakref.finalize(owner, self._retire, shard_id)
+        return shard
+
+    def _retire(self, shard_id):
+        with self._shards_lock:
+            _fold(self._retired, self._shards.pop(shard_id))
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self._types[name] = kind
+        self._help[name] = help_text
+        if kind == 'histogram':
+            self._buckets[name] = tuple(buckets or DEFAULT_BUCKETS)
+
+    def inc(self, name, amount=1, **labels):
+        counters = self._shard()['counters']
+        key = (name, _label_key(labels))
+        counters[key] = counters.get(key, 0) + amount
+
+    def gauge_add(self, name, amount, **labels):
+        """Gauge kept as per-thread deltas (e.g. +1 when a request starts, -1 when it ends)"""
+        gauges = self._shard()['gauges']
+        key = (name, _label_key(labels))
+        gauges[key] = gauges.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+        histograms = self._shard()['histograms']
+        key = (name, _label_key(labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(buckets, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def register_gauge(self, name, help_text, collect, kind='gauge'):
+        """collect() returns [(labels dict, value), ...] at scrape time"""
+        self._types[name] = kind
+        self._help[name] = help_text
+        self._gauges[name] = collect
+
+    def _merge(self):
+        merged = _new_shard()
+        with self._shards_lock:
+            _fold(merged, self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            _fold(merged, shard)
+        return merged['counters'], merged['gauges'], merged['histograms']
+
+    def render(self):
+        counters, gauges, histograms = self._merge()
+        families = {}
+        for (name, labels), value in counters.items():
+            families.setdefault(name, []).append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), value in gauges.items():
+            families.setdefault(name, []).append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), (bucket_counts, total, count) in histograms.items():
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets.get(name, DEFAULT_BUCKETS), bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        for name, collect in self._gauges.items():
+            try:
+                samples = collect()
+            except Exception:
+                continue
+            families[name] = [f'{name}{_format_labels(_label_key(labels))} {value}' for labels, value in samples]
+
+        output = []
+        for name in sorted(families):
+            if name in self._help:
+                output.append(f'# HELP {name} {self._help[name]}')
+                output.append(f'# TYPE {name} {self._types[name]}')
+            output.extend(families[name])
+        return '\n'.join(output) + '\n'
+
+
+registry = MetricsRegistry()
+inc = registry.inc
+observe = registry.observe
+gauge_add = registry.gauge_add
+register_gauge = registry.register_gauge
+
+registry.describe('http_requests_total', 'counter', 'Requests by endpoint, method and status')
+registry.describe('http_request_duration_seconds', 'histogram', 'Request latency by endpoint')
+registry.describe('http_requests_in_flight', 'gauge', 'Requests currently being served')
+registry.describe('sqlite_connections_open', 'gauge', 'SQLite connections currently open')
+registry.describe('sqlite_connections_opened_total', 'counter', 'SQLite connections opened')
+registry.describe('http_requests_rate_limited_total', 'counter', 'Requests answered 429 by route and bucket scope')
+
+
+def init_app(app):
+    """Request metrics, /metrics, and gauges for the fragment cache and the hashing pool"""
+    from password_hashing import hasher
+
+    fragment_cache = getattr(app.jinja_env, 'fragment_cache', None)
+    if fragment_cache is not None:
+        register_gauge('fragment_cache_hits_total', 'Fragment cache hits',
+                       lambda: [({}, fragment_cache.stats()['hits'])], kind='counter')
+        register_gauge('fragment_cache_misses_total', 'Fragment cache misses',
+                       lambda: [({}, fragment_cache.stats()['misses'])], kind='counter')
+        register_gauge('fragment_cache_hit_ratio', 'Fragment cache hits / lookups', lambda: [
+            ({}, stats['hits'] / max(1, stats['hits'] + stats['misses'])) for stats in [fragment_cache.stats()]
+        ])
+        register_gauge('fragment_cache_bytes', 'Size of cached fragments',
+                       lambda: [({}, fragment_cache.stats()['bytes'])])
+    register_gauge('password_hash_queue_depth', 'Password hashes queued or running',
+                   lambda: [({}, hasher.stats()['pending'])])
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_endpoint = request.endpoint or 'unknown'
+        gauge_add('http_requests_in_flight', 1)
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            endpoint = g.metrics_endpoint
+            observe('http_request_duration_seconds', time.perf_counter() - start,
+                    endpoint=endpoint, method=request.method)
+            inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        if g.pop('metrics_start', None) is not None:
+            gauge_add('http_requests_in_flight', -1)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,876 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the SQLite databases
+
+The canonical schema is the one used by database.py. Each migration runs
+in its own transaction and bumps PRAGMA user_version, so a database file
+is only ever upgraded once per step. The migrations also rename the column
+variants found in older files (password vs password_hash, message vs
+content, from_user_id/to_user_id, ...), so any of the project's .db files
+can be upgraded in place.
+
+Every migration spells out its own DDL instead of calling into the feature
+modules, so a shipped step stays the same when those modules change.
+
+Applications call ensure_schema(db_path), which runs the migrations at
+most once per database file per process: later calls only stat the file.
+
+Usage:
+    python migrations.py upgrade [db_path]
+    python migrations.py copy <source_db> [dest_db] [--batch-size N]
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from read_watermarks import backfill_watermarks
+from reset_tokens import RESET_TOKEN_TTL, hash_token
+
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def get_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def add_missing_columns(cursor, table, required_columns):
+    """Add every column in required_columns ({name: definition}) that the table lacks"""
+    existing_columns = get_columns(cursor, table)
+    added = []
+    for column_name, column_def in required_columns.items():
+        if column_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column_name} {column_def}")
+            added.append(column_name)
+    return added
+
+
+def rename_columns(cursor, table, renames):
+    """Rename legacy columns ({old: new}) when the new name is not taken yet"""
+    existing_columns = get_columns(cursor, table)
+    for old_name, new_name in renames.items():
+        if old_name in existing_columns and new_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE {table} RENAME COLUMN {old_name} TO {new_name}")
+
+
+# ---------------------------------------------------------------------------
+# Migrations - append only, never edit a migration that has shipped
+# ---------------------------------------------------------------------------
+
+def _create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            reset_token TEXT,
+            role TEXT CHECK (role IN ('athlete', 'nutritionist')) NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            receiver_id INTEGER,
+            role TEXT NOT NULL,
+            message TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            message_type TEXT DEFAULT 'text',
+            context TEXT,
+            is_read BOOLEAN DEFAULT 0,
+            FOREIGN KEY (sender_id) REFERENCES users(id),
+            FOREIGN KEY (receiver_id) REFERENCES users(id)
+        )
+    ''')
+
+
+def _upgrade_users(cursor):
+    rename_columns(cursor, 'users', {'password': 'password_hash'})
+    add_missing_columns(cursor, 'users', {
+        'reset_token': "TEXT",
+        'is_active': "BOOLEAN DEFAULT 1"
+    })
+
+
+def _upgrade_messages(cursor):
+    columns = get_columns(cursor, 'messages')
+    rename_columns(cursor, 'messages', {
+        'from_user_id': 'sender_id',
+        'to_user_id': 'receiver_id',
+        'sent_at': 'timestamp',
+        'content': 'message'
+    })
+    add_missing_columns(cursor, 'messages', {
+        'role': "TEXT",
+        'message_type': "TEXT DEFAULT 'text'",
+        'context': "TEXT",
+        'is_read': "BOOLEAN DEFAULT 0"
+    })
+    if 'read_at' in columns:
+        cursor.execute('UPDATE messages SET is_read = 1 WHERE read_at IS NOT NULL')
+    cursor.execute('''
+        UPDATE messages
+        SET role = COALESCE((SELECT role FROM users WHERE users.id = messages.sender_id), 'athlete')
+        WHERE role IS NULL
+    ''')
+
+
+def _create_weight_log(cursor):
+    # weight_log.athlete_id is the athlete's users.id
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weight_log (
+            athlete_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            timing TEXT,
+            notes TEXT,
+            PRIMARY KEY (athlete_id, day, ts)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation
+        ON messages (sender_id, receiver_id, timestamp)
+    ''')
+
+
+def _create_athlete_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS athletes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT CHECK (gender IN ('male', 'female')),
+            weight_category REAL,
+            sport_level TEXT,
+            height REAL,
+            target_weight REAL,
+            next_competition DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    add_missing_columns(cursor, 'athletes', {
+        'height': "REAL",
+        'target_weight': "REAL",
+        'next_competition': "DATE"
+    })
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_athletes_user ON athletes (user_id)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            athlete_id INTEGER REFERENCES athletes(id) ON DELETE CASCADE,
+            responses TEXT, -- JSON string
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS competitions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            athlete_id INTEGER REFERENCES athletes(id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            competition_date DATE NOT NULL,
+            weight_category REAL,
+            target_weight REAL,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _create_athlete_search_indexes(cursor):
+    """Indexes behind database.search_athletes"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_athletes_name ON athletes (name COLLATE NOCASE)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users (email COLLATE NOCASE)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_athletes_category_level
+        ON athletes (weight_category, sport_level, name COLLATE NOCASE)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_athletes_level ON athletes (sport_level, name COLLATE NOCASE)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_competitions_date ON competitions (competition_date, athlete_id)')
+    # Only unread messages are indexed, so it stays small however long the history gets
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_unread
+        ON messages (receiver_id, sender_id) WHERE is_read = 0
+    ''')
+
+
+def _fold_weight_entries(cursor):
+    """Move rows of the old per-entry weight_entries table into weight_log"""
+    if not table_exists(cursor, 'weight_entries'):
+        return
+    # Old rows only have second resolution; the row id keeps same-second entries apart
+    cursor.execute('''
+        INSERT OR IGNORE INTO weight_log (athlete_id, day, ts, weight, timing, notes)
+        SELECT a.user_id, DATE(w.recorded_at),
+               CAST(strftime('%s', w.recorded_at) AS INTEGER) * 1000 + w.id % 1000,
+               w.weight, w.timing, w.notes
+        FROM weight_entries w
+        JOIN athletes a ON a.id = w.athlete_id
+    ''')
+    cursor.execute('DROP TABLE weight_entries')
+
+
+def _create_mail_outbox(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mail_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_mail_outbox_due
+        ON mail_outbox (status, next_attempt_at)
+    ''')
+
+
+def _move_reset_tokens(cursor):
+    """reset_tokens table; outstanding users.reset_token values get a fresh expiry"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reset_tokens (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_expires ON reset_tokens (expires_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_user ON reset_tokens (user_id)')
+    cursor.execute('SELECT id, reset_token FROM users WHERE reset_token IS NOT NULL')
+    expires_at = time.time() + RESET_TOKEN_TTL
+    cursor.executemany('''
+        INSERT OR IGNORE INTO reset_tokens (token_hash, user_id, expires_at) VALUES (?, ?, ?)
+    ''', [(hash_token(token), user_id, expires_at) for user_id, token in cursor.fetchall()])
+    cursor.execute('UPDATE users SET reset_token = NULL WHERE reset_token IS NOT NULL')
+
+
+def _create_weight_cut_plans(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weight_cut_plans (
+            athlete_id INTEGER PRIMARY KEY REFERENCES athletes(id) ON DELETE CASCADE,
+            competition_id INTEGER NOT NULL REFERENCES competitions(id) ON DELETE CASCADE,
+            competition_date DATE NOT NULL,
+            start_weight REAL,
+            diet_target REAL NOT NULL,
+            target_weight REAL NOT NULL,
+            latest_day TEXT,
+            latest_weight REAL,
+            planned_today REAL,
+            deviation REAL,
+            required_per_day REAL,
+            status TEXT NOT NULL,
+            computed_on DATE NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_weight_cut_plans_status ON weight_cut_plans (status)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_competitions_athlete_date
+        ON competitions (athlete_id, competition_date)
+    ''')
+
+
+def _create_anomaly_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS athlete_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            athlete_id INTEGER NOT NULL REFERENCES athletes(id) ON DELETE CASCADE,
+            metric TEXT NOT NULL,
+            day DATE NOT NULL,
+            value REAL NOT NULL,
+            baseline_mean REAL NOT NULL,
+            baseline_std REAL NOT NULL,
+            z_score REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            acknowledged_at TIMESTAMP,
+            UNIQUE (athlete_id, metric, day)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_athlete_alerts_day ON athlete_alerts (day)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS anomaly_scan_state (
+            athlete_id INTEGER PRIMARY KEY REFERENCES athletes(id) ON DELETE CASCADE,
+            weight_rows INTEGER NOT NULL,
+            weight_max_ts INTEGER,
+            assessment_rows INTEGER NOT NULL,
+            assessment_max_id INTEGER,
+            scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weekly_assessments_athlete
+        ON weekly_assessments (athlete_id, completed_at)
+    ''')
+
+
+def _create_cohort_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS athlete_weekly_stats (
+            athlete_id INTEGER NOT NULL REFERENCES athletes(id) ON DELETE CASCADE,
+            week_start DATE NOT NULL,
+            weight_category TEXT,
+            sport_level TEXT,
+            gender TEXT,
+            weigh_in_days INTEGER NOT NULL,
+            mean_weight REAL,
+            weight_delta REAL,
+            assessments INTEGER NOT NULL,
+            sleep_hours REAL,
+            sleep_quality REAL,
+            appetite REAL,
+            water_intake REAL,
+            PRIMARY KEY (athlete_id, week_start)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_athlete_weekly_stats_week ON athlete_weekly_stats (week_start)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_weekly (
+            dimension TEXT NOT NULL,
+            cohort TEXT NOT NULL,
+            week_start DATE NOT NULL,
+            athletes INTEGER NOT NULL,
+            weight_delta_mean REAL,
+            weight_delta_median REAL,
+            sleep_hours REAL,
+            sleep_quality REAL,
+            appetite REAL,
+            water_intake REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (dimension, cohort, week_start)
+        ) WITHOUT ROWID
+    ''')
+    # A refresh first claims the queued weeks (claimed = 1); a week touched again
+    # while it runs is queued anew (claimed = 0) instead of being lost
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cohort_dirty_weeks (
+            athlete_id INTEGER NOT NULL,
+            week_start DATE NOT NULL,
+            claimed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (athlete_id, week_start, claimed)
+        ) WITHOUT ROWID
+    ''')
+    # Weeks start on Monday: date(x, 'weekday 0', '-6 days')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weight_log_cohort_insert AFTER INSERT ON weight_log
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT id, date(NEW.day, 'weekday 0', '-6 days') FROM athletes WHERE user_id = NEW.athlete_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weekly_assessments_cohort_insert AFTER INSERT ON weekly_assessments
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT NEW.athlete_id, date(NEW.completed_at, 'weekday 0', '-6 days') WHERE NEW.athlete_id IS NOT NULL;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weight_log_cohort_delete AFTER DELETE ON weight_log
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT id, date(OLD.day, 'weekday 0', '-6 days') FROM athletes WHERE user_id = OLD.athlete_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weekly_assessments_cohort_delete AFTER DELETE ON weekly_assessments
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT OLD.athlete_id, date(OLD.completed_at, 'weekday 0', '-6 days') WHERE OLD.athlete_id IS NOT NULL;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weight_log_cohort_update AFTER UPDATE ON weight_log
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT id, date(OLD.day, 'weekday 0', '-6 days') FROM athletes WHERE user_id = OLD.athlete_id;
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT id, date(NEW.day, 'weekday 0', '-6 days') FROM athletes WHERE user_id = NEW.athlete_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weekly_assessments_cohort_update AFTER UPDATE ON weekly_assessments
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT OLD.athlete_id, date(OLD.completed_at, 'weekday 0', '-6 days') WHERE OLD.athlete_id IS NOT NULL;
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT NEW.athlete_id, date(NEW.completed_at, 'weekday 0', '-6 days') WHERE NEW.athlete_id IS NOT NULL;
+        END
+    ''')
+    # A changed profile moves all of the athlete's weeks to other cohorts
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS athletes_cohort_update
+        AFTER UPDATE OF weight_category, sport_level, gender ON athletes
+        BEGIN
+            INSERT OR IGNORE INTO cohort_dirty_weeks (athlete_id, week_start)
+            SELECT athlete_id, week_start FROM athlete_weekly_stats WHERE athlete_id = NEW.id;
+        END
+    ''')
+
+
+def _fts_participants(row):
+    """Participants column of messages_fts: chat_search.participant_token of sender and receiver"""
+    def token(column):
+        return ' || '.join(f'char(57344 + {column} / {6400 ** k} % 6400)' for k in (2, 1, 0))
+    receiver = f'{row}.receiver_id'
+    return f"{token(f'{row}.sender_id')} || ' ' || CASE WHEN {receiver} IS NULL THEN '' ELSE {token(receiver)} END"
+
+
+def _create_chat_search_index(cursor):
+    cursor.execute(f'''
+        CREATE VIEW IF NOT EXISTS messages_fts_source AS
+        SELECT id, message, {_fts_participants('messages')} AS participants
+        FROM messages
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            message, participants,
+            content='messages_fts_source', content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+    new = f"new.id, new.message, {_fts_participants('new')}"
+    old = f"old.id, old.message, {_fts_participants('old')}"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts (rowid, message, participants) VALUES ({new});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, message, participants) VALUES ('delete', {old});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF message, sender_id, receiver_id ON messages
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, message, participants) VALUES ('delete', {old});
+            INSERT INTO messages_fts (rowid, message, participants) VALUES ({new});
+        END
+    ''')
+    cursor.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+
+def _create_archive_state(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_archive_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            archive_path TEXT NOT NULL,
+            archived_before TIMESTAMP NOT NULL,
+            archived_count INTEGER NOT NULL DEFAULT 0,
+            last_run_at TIMESTAMP
+        )
+    ''')
+
+
+def _create_attachment_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attachments (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            content_type TEXT NOT NULL,
+            thumbnail TEXT NOT NULL DEFAULT 'none',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS uploads (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            filename TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT REFERENCES attachments(sha256),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_sha256 ON uploads (sha256, user_id)')
+    # Sender and receiver are copied here: the message itself may move to the archive database
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_attachments (
+            message_id INTEGER PRIMARY KEY,
+            sha256 TEXT NOT NULL REFERENCES attachments(sha256),
+            filename TEXT NOT NULL,
+            sender_id INTEGER NOT NULL,
+            receiver_id INTEGER
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_message_attachments_sha256 ON message_attachments (sha256)')
+
+
+def _create_read_watermarks(cursor):
+    """read_watermarks seeded from the is_read flags; the unread index gives way to the inbox index"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS read_watermarks (
+            reader_id INTEGER NOT NULL,
+            other_id INTEGER NOT NULL,
+            last_read_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (reader_id, other_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS read_watermarks_new_conversation
+        AFTER INSERT ON messages WHEN new.receiver_id IS NOT NULL BEGIN
+            INSERT OR IGNORE INTO read_watermarks (reader_id, other_id) VALUES (new.receiver_id, new.sender_id);
+        END
+    ''')
+    # The rowid is the last column of every index entry, so "id > watermark" is a range of it
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_inbox ON messages (receiver_id, sender_id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_messages_unread')
+    cursor.execute('''
+        INSERT INTO read_watermarks (reader_id, other_id, last_read_id, updated_at)
+        SELECT receiver_id, sender_id, COALESCE(MIN(CASE WHEN is_read = 0 THEN id END) - 1, MAX(id)),
+               CURRENT_TIMESTAMP
+        FROM messages
+        WHERE receiver_id IS NOT NULL
+        GROUP BY receiver_id, sender_id
+        ON CONFLICT (reader_id, other_id) DO UPDATE SET
+            last_read_id = excluded.last_read_id,
+            updated_at = excluded.updated_at
+        WHERE excluded.last_read_id > last_read_id
+    ''')
+
+
+def _create_jobs_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            queue TEXT NOT NULL DEFAULT 'default',
+            name TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            available_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            lease_token TEXT,
+            dedupe_key TEXT,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Dead jobs are left out, so the index only holds work still to do
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_jobs_due
+        ON jobs (queue, priority DESC, available_at) WHERE status != 'dead'
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe
+        ON jobs (queue, dedupe_key) WHERE status = 'queued'
+    ''')
+
+
+def _create_data_versions(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    # Every change bumps 'roster' and the 'athlete:<user id>' scope of each row it touches;
+    # weight_log.athlete_id is a user id, weekly_assessments and competitions point at athletes.id
+    athlete_scope = {
+        'weight_log': "VALUES ('athlete:' || {row}.athlete_id, 1)",
+        'athletes': "VALUES ('athlete:' || {row}.user_id, 1)",
+        'weekly_assessments': "SELECT 'athlete:' || user_id, 1 FROM athletes WHERE id = {row}.athlete_id",
+        'competitions': "SELECT 'athlete:' || user_id, 1 FROM athletes WHERE id = {row}.athlete_id",
+        'users': None,
+    }
+    for table, scope in athlete_scope.items():
+        for event, rows in (('INSERT', ('NEW',)), ('DELETE', ('OLD',)), ('UPDATE', ('OLD', 'NEW'))):
+            selects = ["VALUES ('roster', 1)"] + ([scope.format(row=row) for row in rows] if scope else [])
+            body = ''.join(f'''
+                INSERT INTO data_versions (scope, version) {select}
+                ON CONFLICT (scope) DO UPDATE SET version = version + 1;''' for select in selects)
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_data_version_{event.lower()} AFTER {event} ON {table}
+                BEGIN{body}
+                END
+            ''')
+
+
+MIGRATIONS = [
+    (1, 'create users and messages tables', _create_base_tables),
+    (2, 'users: password -> password_hash, reset_token, is_active', _upgrade_users),
+    (3, 'messages: unify column names, add role/message_type/context/is_read', _upgrade_messages),
+    (4, 'weight_log table and conversation index', _create_weight_log),
+    (5, 'athletes, weekly_assessments and competitions tables', _create_athlete_tables),
+    (6, 'fold weight_entries into weight_log', _fold_weight_entries),
+    (7, 'mail_outbox table', _create_mail_outbox),
+    (8, 'reset_tokens table keyed by token hash', _move_reset_tokens),
+    (9, 'weight_cut_plans table and competitions (athlete_id, competition_date) index',
+     _create_weight_cut_plans),
+    (10, 'athlete_alerts and anomaly_scan_state tables, weekly_assessments athlete index',
+     _create_anomaly_tables),
+    (11, 'cohort rollup tables and the triggers that queue changed athlete weeks', _create_cohort_tables),
+    (12, 'messages_fts full-text index kept in sync by triggers', _create_chat_search_index),
+    (13, 'athlete search indexes and partial index on unread messages', _create_athlete_search_indexes),
+    (14, 'message_archive_state: archive file and boundary of archived messages', _create_archive_state),
+    (15, 'attachments, uploads and message_attachments tables', _create_attachment_tables),
+    (16, 'read_watermarks replace per-message is_read updates; inbox index', _create_read_watermarks),
+    (17, 'jobs table for the background job queue', _create_jobs_table),
+    (18, 'data_versions counters bumped by triggers, for fragment cache keys', _create_data_versions),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, verbose=False):
+    """Apply all pending migrations to an open connection; returns the versions applied"""
+    applied = []
+    current = get_schema_version(conn)
+    for version, description, upgrade in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            upgrade(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        if verbose:
+            print(f"✅ Migration {version}: {description}")
+    return applied
+
+
+# Files already at SCHEMA_VERSION in this process, keyed by (path, device, inode)
+# so a file that is deleted and recreated is migrated again
+_ready_files = set()
+_ready_lock = threading.Lock()
+
+
+def _file_key(db_path):
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    return (os.path.realpath(db_path), st.st_dev, st.st_ino)
+
+
+def ensure_schema(db_path, verbose=False):
+    """Bring db_path up to SCHEMA_VERSION once per process; returns the versions applied"""
+    if db_path == ':memory:' or db_path.startswith('file:'):
+        raise ValueError('ensure_schema() needs a database file path; call migrate(conn) instead')
+    key = _file_key(db_path)
+    if key in _ready_files:
+        return []
+    with _ready_lock:
+        key = _file_key(db_path)
+        if key in _ready_files:
+            return []
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            # Reading user_version takes no write lock; only outdated files run DDL
+            applied = [] if get_schema_version(conn) >= SCHEMA_VERSION else migrate(conn, verbose)
+        finally:
+            conn.close()
+        _ready_files.add(_file_key(db_path))
+    return applied
+
+
+# ---------------------------------------------------------------------------
+# Bulk copy of an existing database file into the canonical database
+# ---------------------------------------------------------------------------
+
+def _pick(columns, *candidates, default='NULL'):
+    for candidate in candidates:
+        if candidate in columns:
+            return candidate
+    return default
+
+
+def _copy_rows(src, dest, label, select_sql, insert_sql, transform, batch_size, progress):
+    total = src.execute(f'SELECT COUNT(*) FROM ({select_sql})').fetchone()[0]
+    cursor = src.execute(select_sql)
+    copied = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        batch = [transform(row) for row in rows]
+        batch = [row for row in batch if row is not None]
+        with dest:
+            dest.executemany(insert_sql, batch)
+        copied += len(rows)
+        progress(f"   {label}: {copied}/{total}")
+    return total
+
+
+def copy_database(source_path, dest_path, batch_size=1000, progress=print):
+    """
+    Copy users, messages, athletes and weigh-ins from any of the legacy database
+    files into a canonical database, in batched transactions.
+
+    Users are matched on email and athletes/weigh-ins on their owner, so running
+    the copy twice does not duplicate them (messages and assessments are appended).
+    Returns a dict with per-table row counts.
+    """
+    src = sqlite3.connect(f'file:{source_path}?mode=ro', uri=True)
+    dest = sqlite3.connect(dest_path)
+    migrate(dest)
+    src_cursor = src.cursor()
+    counts = {}
+    progress(f"🔄 Copying {source_path} -> {dest_path}")
+
+    # users - ids are remapped through the email
+    user_ids = {}
+    if table_exists(src_cursor, 'users'):
+        columns = get_columns(src_cursor, 'users')
+        password = _pick(columns, 'password_hash', 'password', default="''")
+        role = _pick(columns, 'role', default="'athlete'")
+        created_at = _pick(columns, 'created_at', default='CURRENT_TIMESTAMP')
+        # Outstanding reset links are not carried over; users can request a new one
+        counts['users'] = _copy_rows(
+            src, dest, 'users',
+            f'SELECT id, email, {password}, {role}, {created_at} FROM users',
+            'INSERT OR IGNORE INTO users (email, password_hash, role, created_at) VALUES (?, ?, ?, ?)',
+            lambda row: row[1:], batch_size, progress)
+        emails = dict(src.execute('SELECT id, email FROM users').fetchall())
+        dest_ids = dict(dest.execute('SELECT email, id FROM users').fetchall())
+        user_ids = {src_id: dest_ids[email] for src_id, email in emails.items() if email in dest_ids}
+
+    if table_exists(src_cursor, 'messages'):
+        columns = get_columns(src_cursor, 'messages')
+        sender = _pick(columns, 'sender_id', 'from_user_id')
+        receiver = _pick(columns, 'receiver_id', 'to_user_id')
+        body = _pick(columns, 'message', 'content')
+        timestamp = _pick(columns, 'timestamp', 'sent_at', default='CURRENT_TIMESTAMP')
+        is_read = _pick(columns, 'is_read', default='(read_at IS NOT NULL)' if 'read_at' in columns else '0')
+        message_type = _pick(columns, 'message_type', default="'text'")
+        context = _pick(columns, 'context')
+        role = _pick(columns, 'role')
+        roles = dict(dest.execute('SELECT id, role FROM users').fetchall())
+
+        def transform_message(row):
+            sender_id = user_ids.get(row[0])
+            if sender_id is None:
+                return None
+            return (sender_id, user_ids.get(row[1]), row[2] or roles.get(sender_id, 'athlete'),
+                    row[3], row[4], row[5], row[6], row[7])
+
+        counts['messages'] = _copy_rows(
+            src, dest, 'messages',
+            f'SELECT {sender}, {receiver}, {role}, {body}, {timestamp}, {message_type}, {context}, {is_read} FROM messages ORDER BY id',
+            '''INSERT INTO messages (sender_id, receiver_id, role, message, timestamp, message_type, context, is_read)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+            transform_message, batch_size, progress)
+        # Read state lives in read_watermarks; the copied is_read flags only seed it
+        with dest:
+            backfill_watermarks(dest)
+
+    athlete_ids = {}
+    if table_exists(src_cursor, 'athletes'):
+        columns = get_columns(src_cursor, 'athletes')
+        optional = ['age', 'gender', 'weight_category', 'sport_level', 'height', 'target_weight', 'next_competition']
+        select = ', '.join(_pick(columns, name) for name in optional)
+        known = {row[0] for row in dest.execute('SELECT user_id FROM athletes')}
+
+        def transform_athlete(row):
+            user_id = user_ids.get(row[1])
+            if user_id is None or user_id in known:
+                return None
+            return (user_id,) + tuple(row[2:])
+
+        counts['athletes'] = _copy_rows(
+            src, dest, 'athletes',
+            f'SELECT id, user_id, name, {select} FROM athletes',
+            f'INSERT INTO athletes (user_id, name, {", ".join(optional)}) VALUES (?, ?{", ?" * len(optional)})',
+            transform_athlete, batch_size, progress)
+        dest_athletes = dict(dest.execute('SELECT user_id, id FROM athletes').fetchall())
+        for src_id, src_user_id in src.execute('SELECT id, user_id FROM athletes'):
+            if user_ids.get(src_user_id) in dest_athletes:
+                athlete_ids[src_id] = (user_ids[src_user_id], dest_athletes[user_ids[src_user_id]])
+
+    if table_exists(src_cursor, 'weight_log'):
+        counts['weight_log'] = _copy_rows(
+            src, dest, 'weight_log',
+            'SELECT athlete_id, day, ts, weight, timing, notes FROM weight_log',
+            'INSERT OR IGNORE INTO weight_log (athlete_id, day, ts, weight, timing, notes) VALUES (?, ?, ?, ?, ?, ?)',
+            lambda row: (user_ids[row[0]],) + tuple(row[1:]) if row[0] in user_ids else None,
+            batch_size, progress)
+
+    if table_exists(src_cursor, 'weight_entries') and 'recorded_at' in get_columns(src_cursor, 'weight_entries'):
+        counts['weight_entries'] = _copy_rows(
+            src, dest, 'weight_entries',
+            '''SELECT athlete_id, DATE(recorded_at),
+                      CAST(strftime('%s', recorded_at) AS INTEGER) * 1000 + id % 1000,
+                      weight, timing, notes FROM weight_entries''',
+            'INSERT OR IGNORE INTO weight_log (athlete_id, day, ts, weight, timing, notes) VALUES (?, ?, ?, ?, ?, ?)',
+            lambda row: (athlete_ids[row[0]][0],) + tuple(row[1:]) if row[0] in athlete_ids else None,
+            batch_size, progress)
+
+    for table, columns in (('weekly_assessments', 'responses, completed_at'),
+                           ('competitions', 'name, competition_date, weight_category, target_weight, notes, created_at')):
+        if table_exists(src_cursor, table):
+            placeholders = ', '.join('?' * (columns.count(',') + 2))
+            counts[table] = _copy_rows(
+                src, dest, table,
+                f'SELECT athlete_id, {columns} FROM {table}',
+                f'INSERT INTO {table} (athlete_id, {columns}) VALUES ({placeholders})',
+                lambda row: (athlete_ids[row[0]][1],) + tuple(row[1:]) if row[0] in athlete_ids else None,
+                batch_size, progress)
+
+    legacy_passwords = dest.execute(
+        "SELECT COUNT(*) FROM users WHERE password_hash NOT LIKE '%$%'"
+    ).fetchone()[0]
+    if legacy_passwords:
+        progress(f"⚠️  {legacy_passwords} users have a non-hashed legacy password and need a password reset")
+
+    src.close()
+    dest.close()
+    progress("🎉 Copy completed")
+    return counts
+
+
+def main(argv):
+    from database import DATABASE
+
+    if len(argv) >= 1 and argv[0] == 'upgrade':
+        db_path = argv[1] if len(argv) > 1 else DATABASE
+        conn = sqlite3.connect(db_path)
+        applied = migrate(conn, verbose=True)
+        print(f"✅ {db_path} is at schema version {get_schema_version(conn)}"
+              + ("" if applied else " (nothing to do)"))
+        conn.close()
+        return 0
+
+    if len(argv) >= 2 and argv[0] == 'copy':
+        batch_size = 1000
+        if '--batch-size' in argv:
+            index = argv.index('--batch-size')
+            batch_size = int(argv[index + 1])
+            argv = argv[:index] + argv[index + 2:]
+        dest_path = argv[2] if len(argv) > 2 else DATABASE
+        copy_database(argv[1], dest_path, batch_size=batch_size)
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
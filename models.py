@@ -1,6 +1,6 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_hashing import hash_password, check_password
 import json
 
 class User(db.Model):
@@ -17,11 +17,11 @@ class User(db.Model):
     athlete = db.relationship('Athlete', backref='user', uselist=False, cascade='all, delete-orphan')
     nutritionist = db.relationship('Nutritionist', backref='user', uselist=False, cascade='all, delete-orphan')
     
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, client=None):
+        self.password_hash = hash_password(password, client=client)
     
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    def check_password(self, password, client=None):
+        return check_password(self.password_hash, password, client=client)
     
     def to_dict(self):
         return {
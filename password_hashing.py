@@ -0,0 +1,148 @@
+"""
+Password hashing off the request thread
+
+Hashing a password with a proper work factor (werkzeug's scrypt default)
+costs ~100 ms of CPU. Doing it on the request thread stalls every other
+request served by the same worker, so the hashing is sent to a small
+process pool instead:
+
+    password_hash = hash_password(password, client=request.remote_addr)
+    ok = check_password(password_hash, password, client=request.remote_addr)
+
+    # from async code
+    ok = await hasher.acheck(password_hash, password)
+
+The pool is bounded. When more than max_pending hashes are queued, or one
+client already has per_client_limit hashes in flight, HashingBusy is
+raised and the caller answers 503/429 instead of piling up work.
+"""
+
+import os
+import threading
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue or the client's concurrency cap is full"""
+
+    def __init__(self, message, status_code=503, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Bounded process pool for generate_password_hash/check_password_hash"""
+
+    def __init__(self, max_workers=None, max_pending=64, per_client_limit=4, timeout=10):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.per_client_limit = per_client_limit
+        self.timeout = timeout
+        self._pool = None
+        self._pending = 0
+        self._per_client = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Imported here: most processes that import this module never hash
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Not fork: the app is multithreaded and a forked child can inherit held locks
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('forkserver'))
+            return self._pool
+
+    def _acquire(self, client):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingBusy('Server is busy, please try again')
+            if client is not None and self._per_client.get(client, 0) >= self.per_client_limit:
+                raise HashingBusy('Too many concurrent requests', status_code=429)
+            self._pending += 1
+            if client is not None:
+                self._per_client[client] = self._per_client.get(client, 0) + 1
+
+    def _release(self, client):
+        with self._lock:
+            self._pending -= 1
+            if client is not None:
+                remaining = self._per_client.get(client, 1) - 1
+                if remaining:
+                    self._per_client[client] = remaining
+                else:
+                    self._per_client.pop(client, None)
+
+    def submit(self, fn, *args, client=None):
+        """Queue fn(*args) on the pool; returns a concurrent.futures.Future"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        self._acquire(client)
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); start a fresh pool once
+            with self._lock:
+                self._pool = None
+            try:
+                future = self._get_pool().submit(fn, *args)
+            except Exception:
+                self._release(client)
+                raise
+        except Exception:
+            self._release(client)
+            raise
+        future.add_done_callback(lambda _: self._release(client))
+        return future
+
+    def hash(self, password, client=None):
+        return self.submit(generate_password_hash, password, client=client).result(self.timeout)
+
+    def check(self, password_hash, password, client=None):
+        if not password_hash:
+            return False
+        return self.submit(check_password_hash, password_hash, password, client=client).result(self.timeout)
+
+    async def ahash(self, password, client=None):
+        import asyncio
+        return await asyncio.wrap_future(self.submit(generate_password_hash, password, client=client))
+
+    async def acheck(self, password_hash, password, client=None):
+        if not password_hash:
+            return False
+        import asyncio
+        return await asyncio.wrap_future(
+            self.submit(check_password_hash, password_hash, password, client=client)
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': self._pending,
+                'clients': len(self._per_client)
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+hasher = PasswordHasher(
+    max_workers=int(os.environ.get('HASH_WORKERS', 0)) or None,
+    max_pending=int(os.environ.get('HASH_MAX_PENDING', 64)),
+    per_client_limit=int(os.environ.get('HASH_PER_CLIENT_LIMIT', 4))
+)
+
+
+def hash_password(password, client=None):
+    return hasher.hash(password, client=client)
+
+
+def check_password(password_hash, password, client=None):
+    return hasher.check(password_hash, password, client=client)
@@ -0,0 +1,218 @@
+"""
+Token-bucket rate limiting for the auth and chat endpoints
+
+Each rule gives a route a bucket per client IP, per logged-in user
+('user') or per email address in the request body ('account', for the
+login and reset forms). A bucket holds up to N tokens and refills at
+N per period; a request takes one token and is answered 429 with
+Retry-After when a bucket of its route is empty:
+
+    @main.route('/api/login', methods=['POST'])
+    @rate_limit.limit('login')
+    def login(): ...
+
+Rules come from DEFAULT_LIMITS, overridden per route by the RATE_LIMITS
+config key, e.g. {'login': {'ip': '20/minute', 'account': '5/minute'}}.
+Buckets are checked in that order (IP first) and a denied request
+spends no tokens from the buckets after the one that denied it.
+
+The buckets live in process memory: a fixed number of shards, each an
+LRU dict with its own lock, so a check is one dict operation and
+threads rarely wait on each other. Under several worker processes every
+process has its own buckets (the effective limit is multiplied by the
+worker count); RATE_LIMIT_STORAGE=/path/rate_limits.db shares them
+through a small SQLite file instead, one UPSERT per check. That file is
+separate from judo.db so throttling never takes the application's write
+lock. RATE_LIMIT_ENABLED=0 turns limiting off (load tests).
+"""
+
+import functools
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request, session
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    'login': {'ip': '20/minute', 'account': '5/minute'},
+    'forgot_password': {'ip': '10/minute', 'account': '5/hour'},
+    'send_message': {'ip': '300/minute', 'user': '60/minute'},
+}
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(spec):
+    """'5/minute' -> (capacity 5, refill 5/60 tokens per second)"""
+    count, _, unit = spec.partition('/')
+    if unit not in _PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f'invalid rate limit {spec!r} (expected e.g. "5/minute")')
+    return float(count), int(count) / _PERIODS[unit]
+
+
+def _json_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower()[:254] or None
+
+
+# What a bucket is keyed by; None skips the bucket (e.g. not logged in)
+SCOPES = {
+    'ip': lambda: request.remote_addr,
+    'user': lambda: session.get('user_id'),
+    'account': _json_email,
+}
+
+
+class MemoryBuckets:
+    """Sharded in-process buckets, each shard an LRU of key -> (tokens, last refill)"""
+
+    def __init__(self, shards=16, max_keys=100_000):
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+        self.max_keys_per_shard = max(1, max_keys // shards)
+
+    def take(self, key, capacity, rate, cost=1.0, now=None):
+        """Take cost tokens; returns 0 when allowed, else seconds until they are available"""
+        now = time.monotonic() if now is None else now
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            state = buckets.pop(key, None)
+            tokens = capacity if state is None else min(capacity, state[0] + (now - state[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            buckets[key] = (tokens, now)
+            # The least recently used key is dropped; it comes back as a full bucket
+            if len(buckets) > self.max_keys_per_shard:
+                buckets.popitem(last=False)
+        return 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class SQLiteBuckets:
+    """Buckets shared by worker processes through one SQLite file"""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, path, idle_seconds=86400):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            # Losing a few refills on a crash is harmless; reads go through the page map
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute('PRAGMA mmap_size = 16777216')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    allowed INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            self._local.conn = conn
+            self._local.calls = 0
+        return conn
+
+    def take(self, key, capacity, rate, cost=1.0, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        # All SET expressions see the old row, so refilled is computed the same way in each
+        refilled = 'MIN(:capacity, tokens + MAX(0, :now - updated) * :rate)'
+        tokens, allowed = conn.execute(f'''
+            INSERT INTO rate_buckets (key, tokens, updated, allowed)
+            VALUES (:key, :capacity - :cost, :now, 1)
+            ON CONFLICT (key) DO UPDATE SET
+                tokens = {refilled} - (CASE WHEN {refilled} >= :cost THEN :cost ELSE 0 END),
+                allowed = {refilled} >= :cost,
+                updated = MAX(updated, :now)
+            RETURNING tokens, allowed
+        ''', {'key': key, 'capacity': capacity, 'rate': rate, 'cost': cost, 'now': now}).fetchone()
+        self._local.calls += 1
+        if self._local.calls % self.SWEEP_EVERY == 0:
+            conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - self.idle_seconds,))
+        return 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+
+
+class RateLimiter:
+    """Rules per route and the bucket storage they are checked against"""
+
+    def __init__(self, limits=None, storage=None):
+        self.rules = {
+            route: [(scope, *parse_rate(spec)) for scope, spec in scopes.items()]
+            for route, scopes in (limits or DEFAULT_LIMITS).items()
+        }
+        for route, rules in self.rules.items():
+            for scope, _, _ in rules:
+                if scope not in SCOPES:
+                    raise ValueError(f'unknown rate limit scope {scope!r} for {route}')
+        self.storage = MemoryBuckets() if storage is None else storage
+
+    def check(self, route):
+        """
+        Take a token from each bucket of the route in rule order; returns 0
+        or the Retry-After seconds. Stops at the first empty bucket, so a
+        flood from one IP does not also drain the buckets of the accounts
+        it targets.
+        """
+        for scope, capacity, rate in self.rules.get(route, ()):
+            value = SCOPES[scope]()
+            if value is None:
+                continue
+            try:
+                wait = self.storage.take(f'{route}:{scope}:{value}', capacity, rate)
+            except sqlite3.Error as e:
+                # Shared storage unavailable: let the request through rather than fail logins
+                logger.warning(f"Rate limit storage unavailable: {e}")
+                continue
+            if wait:
+                metrics.inc('http_requests_rate_limited_total', route=route, scope=scope)
+                return wait
+        return 0.0
+
+
+def limit(route):
+    """Answer 429 when a bucket of the route's rules is empty (see RateLimiter)"""
+    def decorate(view):
+        @functools.wraps(view)
+        def limited(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            retry_after = limiter.check(route) if limiter is not None else 0
+            if retry_after:
+                return jsonify({'error': 'Too many requests, please try again later'}), 429, \
+                    {'Retry-After': str(math.ceil(retry_after))}
+            return view(*args, **kwargs)
+        return limited
+    return decorate
+
+
+def init_app(app):
+    """Build the app's limiter from RATE_LIMITS, RATE_LIMIT_STORAGE and RATE_LIMIT_ENABLED"""
+    app.config.setdefault('RATE_LIMIT_ENABLED', os.environ.get('RATE_LIMIT_ENABLED', '1') != '0')
+    app.config.setdefault('RATE_LIMIT_STORAGE', os.environ.get('RATE_LIMIT_STORAGE', 'memory'))
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+    limits = {**DEFAULT_LIMITS, **app.config.get('RATE_LIMITS', {})}
+    storage = app.config['RATE_LIMIT_STORAGE']
+    storage = MemoryBuckets() if storage == 'memory' else SQLiteBuckets(storage)
+    app.extensions['rate_limiter'] = RateLimiter(limits, storage)
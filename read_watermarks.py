@@ -0,0 +1,85 @@
+"""
+Read state of chat messages as per-conversation watermarks
+
+Instead of an is_read flag on every message, read_watermarks keeps one
+row per (reader, other user): the id of the last message from other_id
+that reader_id has read. A message is read when its id is at or below
+its receiver's watermark for the sender:
+
+- marking a conversation read is one upsert, whatever its length;
+- unread messages are the rows of idx_messages_inbox (receiver_id,
+  sender_id, and implicitly id) above the watermark: a range count;
+- sending a message never touches old rows.
+
+A trigger on messages opens a watermark row (at 0, nothing read) for
+every new (receiver, sender) pair, so unread_counts only has to walk the
+reader's watermark rows. The is_read column of messages is no longer
+written; backfill_watermarks turns its values into watermarks for
+imported or generated data:
+
+    mark_read(conn, reader_id=12, other_id=34)            # everything so far
+    mark_read(conn, reader_id=12, other_id=34, up_to_id=981)
+    unread_counts(conn, reader_id=12)                     # {34: 2, 57: 1}
+"""
+
+# Larger than any message id: "up to the newest message"
+_NEWEST = 2 ** 62
+
+# SQL truth value of "message m has been read by its receiver" (m aliases main or archive messages)
+IS_READ_SQL = '''(m.id <= COALESCE((SELECT w.last_read_id FROM main.read_watermarks w
+                  WHERE w.reader_id = m.receiver_id AND w.other_id = m.sender_id), 0))'''
+
+
+def backfill_watermarks(cursor):
+    """
+    Watermarks from the legacy is_read flags: just below the first unread
+    message of each conversation (or its last message when all are read),
+    so no unread message turns read. Watermarks only move forward.
+    """
+    cursor.execute('''
+        INSERT INTO read_watermarks (reader_id, other_id, last_read_id, updated_at)
+        SELECT receiver_id, sender_id, COALESCE(MIN(CASE WHEN is_read = 0 THEN id END) - 1, MAX(id)),
+               CURRENT_TIMESTAMP
+        FROM messages
+        WHERE receiver_id IS NOT NULL
+        GROUP BY receiver_id, sender_id
+        ON CONFLICT (reader_id, other_id) DO UPDATE SET
+            last_read_id = excluded.last_read_id,
+            updated_at = excluded.updated_at
+        WHERE excluded.last_read_id > last_read_id
+    ''')
+
+
+def mark_read(conn, reader_id, other_id, up_to_id=None):
+    """
+    Move reader_id's watermark for other_id to up_to_id (default: their
+    newest message). Never past the newest message and never backwards.
+    Returns the watermark.
+    """
+    conn.execute('''
+        INSERT INTO read_watermarks (reader_id, other_id, last_read_id, updated_at)
+        VALUES (?, ?, MIN(?, COALESCE((SELECT MAX(id) FROM messages WHERE receiver_id = ? AND sender_id = ?), 0)),
+                CURRENT_TIMESTAMP)
+        ON CONFLICT (reader_id, other_id) DO UPDATE SET
+            last_read_id = excluded.last_read_id,
+            updated_at = excluded.updated_at
+        WHERE excluded.last_read_id > last_read_id
+    ''', (reader_id, other_id, up_to_id or _NEWEST, reader_id, other_id))
+    return conn.execute('''
+        SELECT last_read_id FROM read_watermarks WHERE reader_id = ? AND other_id = ?
+    ''', (reader_id, other_id)).fetchone()[0]
+
+
+def unread_counts(conn, reader_id):
+    """{sender_id: unread messages} for every conversation of reader_id with unread messages"""
+    return dict(conn.execute('''
+        SELECT other_id, unread FROM (
+            SELECT w.other_id,
+                   (SELECT COUNT(*) FROM messages m
+                    WHERE m.receiver_id = w.reader_id AND m.sender_id = w.other_id
+                      AND m.id > w.last_read_id) AS unread
+            FROM read_watermarks w
+            WHERE w.reader_id = ?
+        )
+        WHERE unread > 0
+    ''', (reader_id,)).fetchall())
@@ -0,0 +1,129 @@
+"""
+Expiring password-reset tokens
+
+Only a SHA-256 digest of each token is stored. The table is keyed by that
+digest, so a lookup is a primary-key search and the submitted token is
+never compared character by character. Tokens are single use and expire
+after RESET_TOKEN_TTL seconds. ResetTokenSweeper deletes expired rows in
+small batches in the background.
+
+    token = create_reset_token(conn, user_id)      # goes into the email link
+    user_id = consume_reset_token(conn, token)     # None if unknown/expired
+"""
+
+import hashlib
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Matches the "valid for 24 hours" text in the reset email
+RESET_TOKEN_TTL = 24 * 60 * 60
+
+
+def create_reset_tokens_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reset_tokens (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_expires ON reset_tokens (expires_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reset_tokens_user ON reset_tokens (user_id)')
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def create_reset_token(conn, user_id, ttl=RESET_TOKEN_TTL):
+    """Issue a new token for the user, replacing any earlier one; the caller commits"""
+    token = secrets.token_urlsafe(32)
+    conn.execute('DELETE FROM reset_tokens WHERE user_id = ?', (user_id,))
+    conn.execute('''
+        INSERT INTO reset_tokens (token_hash, user_id, expires_at)
+        VALUES (?, ?, ?)
+    ''', (hash_token(token), user_id, time.time() + ttl))
+    return token
+
+
+def find_reset_token_user(conn, token):
+    """User id for a valid token without using it up, or None"""
+    if not token:
+        return None
+    row = conn.execute('''
+        SELECT user_id FROM reset_tokens WHERE token_hash = ? AND expires_at > ?
+    ''', (hash_token(token), time.time())).fetchone()
+    return row[0] if row else None
+
+
+def consume_reset_token(conn, token):
+    """Delete a valid token and return its user id, or None; the caller commits"""
+    if not token:
+        return None
+    row = conn.execute('''
+        DELETE FROM reset_tokens WHERE token_hash = ? AND expires_at > ?
+        RETURNING user_id
+    ''', (hash_token(token), time.time())).fetchone()
+    return row[0] if row else None
+
+
+def sweep_expired_tokens(conn, batch_size=500, now=None):
+    """Delete expired tokens in batches of batch_size; returns the number deleted"""
+    now = time.time() if now is None else now
+    deleted = 0
+    while True:
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM reset_tokens WHERE token_hash IN (
+                    SELECT token_hash FROM reset_tokens WHERE expires_at <= ? LIMIT ?
+                )
+            ''', (now, batch_size))
+        deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return deleted
+
+
+class ResetTokenSweeper:
+    """Daemon thread that runs sweep_expired_tokens every interval seconds"""
+
+    def __init__(self, db_path, interval=3600, batch_size=500):
+        self.db_path = db_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def sweep(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            return sweep_expired_tokens(conn, self.batch_size)
+        finally:
+            conn.close()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                deleted = self.sweep()
+                if deleted:
+                    logger.info(f"Removed {deleted} expired reset tokens")
+            except sqlite3.Error as e:
+                logger.warning(f"Reset token sweep failed: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name='reset-token-sweeper', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -1,10 +1,16 @@
 from flask import render_template, request, jsonify, session, redirect, url_for, flash
-from app import app, db
+from app import app, db, hashing_busy_response
 from models import User, Athlete, Nutritionist, WeightEntry, WeeklyAssessment, Task, ChatMessage
+from fragment_cache import data_versions
+import sql_profiler
+from password_hashing import HashingBusy
 from datetime import datetime, date, timedelta
 import json
 from functools import wraps
 
+with app.app_context():
+    sql_profiler.instrument_sqlalchemy(db.engine)
+
 # Authentication decorator
 def login_required(f):
     @wraps(f)
@@ -72,7 +78,7 @@ def register():
             email=data['email'],
             role=data['role']
         )
-        user.set_password(data['password'])
+        user.set_password(data['password'], client=request.remote_addr)
         
         db.session.add(user)
         db.session.flush()  # Get the user ID
@@ -101,6 +107,7 @@ def register():
             db.session.add(nutritionist)
         
         db.session.commit()
+        data_versions.bump('roster')
         
         # Log in the user
         session['user_id'] = user.id
@@ -111,6 +118,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusy as e:
+        db.session.rollback()
+        return hashing_busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -125,7 +135,7 @@ def login():
         
         user = User.query.filter_by(email=data['email']).first()
         
-        if not user or not user.check_password(data['password']):
+        if not user or not user.check_password(data['password'], client=request.remote_addr):
             return jsonify({'error': 'Invalid email or password'}), 401
         
         if not user.is_active:
@@ -139,6 +149,8 @@ def login():
             'user': user.to_dict()
         })
         
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -191,6 +203,8 @@ def weight_management():
             
             db.session.add(weight_entry)
             db.session.commit()
+            data_versions.bump('athlete', user.id)
+            data_versions.bump('roster')
             
             return jsonify({
                 'message': 'Weight entry added successfully',
@@ -258,6 +272,7 @@ def assessment_management():
                 db.session.add(assessment)
             
             db.session.commit()
+            data_versions.bump('athlete', user.id)
             
             return jsonify({
                 'message': 'Assessment submitted successfully',
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for production-scale databases
+
+Scales database1.create_sample_data up to any size. It builds nutritionists
+and athletes from the same profile templates, then adds twice-daily
+weigh-ins, chat messages, weekly questionnaires and competitions.
+Each athlete's weight follows a realistic cut before every competition:
+a slow descent over the last weeks, a water cut in the final two days,
+then a rebound. Rows are written with executemany, and every batch of
+athletes is committed as one large transaction. A few million rows take
+seconds; multi-GB files take minutes.
+
+Usage:
+    python sample_data.py judo_big.db --athletes 5000 --days 730
+    python sample_data.py judo_big.db --athletes 20000 --days 730 --messages-per-day 1.5
+
+All generated users share the sample-data password (123456).
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from database1 import SAMPLE_ATHLETES, SAMPLE_NUTRITIONIST
+from migrations import migrate
+from read_watermarks import backfill_watermarks
+
+WEIGHT_CATEGORIES = {
+    'male': [60.0, 66.0, 73.0, 81.0, 90.0, 100.0, 110.0],
+    'female': [48.0, 52.0, 57.0, 63.0, 70.0, 78.0, 88.0],
+}
+SPORT_LEVELS = ['beginner', 'intermediate', 'advanced', 'professional']
+FIRST_NAMES = {
+    'male': ['דני', 'מיכאל', 'יונתן', 'אורי', 'נועם', 'איתי', 'עומר', 'אריאל'],
+    'female': ['שרה', 'נועה', 'מאיה', 'תמר', 'יעל', 'שירה', 'רוני', 'גלי'],
+}
+LAST_NAMES = ['כהן', 'לוי', 'אברהם', 'פרץ', 'ביטון', 'מזרחי', 'דהן', 'אזולאי', 'פרידמן', 'שפירא']
+COMPETITION_NAMES = ['אליפות ישראל', 'גביע אירופה', 'גרנד פרי', 'טורניר ארצי', 'אליפות אזורית']
+ATHLETE_MESSAGES = [
+    'שקלתי הבוקר {weight} ק"ג',
+    'מה מומלץ לאכול לפני האימון?',
+    'היה לי קשה לישון אתמול',
+    'כמה מים לשתות ביום השקילה?',
+    'סיימתי את האימון, מרגיש טוב',
+]
+NUTRITIONIST_MESSAGES = [
+    'מעולה, ממשיכים לפי התוכנית',
+    'תקפיד על 3 ליטר מים היום',
+    'אל תוריד פחמימות לפני אימון כוח',
+    'נבדוק את השקילה מחר בבוקר',
+    'זכור לשלוח את השאלון השבועי',
+]
+
+# Days before a competition that the cut starts, and days of rebound after it
+CUT_DAYS = 21
+WATER_CUT_DAYS = 2
+REBOUND_DAYS = 5
+
+
+def competition_days(rng, days, per_year):
+    """Day offsets (0..days-1) of an athlete's competitions, roughly per_year apart"""
+    if per_year <= 0:
+        return []
+    spacing = 365.0 / per_year
+    offsets = []
+    day = rng.uniform(CUT_DAYS, CUT_DAYS + spacing)
+    while day < days:
+        offsets.append(int(day))
+        day += spacing * rng.uniform(0.7, 1.3)
+    return offsets
+
+
+def weight_curve(rng, days, category, walk_around, competitions):
+    """Morning (fasting) weight for each day, following cut/rebound cycles"""
+    weights = []
+    upcoming = iter(competitions + [math.inf])
+    next_comp = next(upcoming)
+    last_comp = -math.inf
+    drift = 0.0
+    for day in range(days):
+        if day > next_comp:
+            last_comp, next_comp = next_comp, next(upcoming)
+        days_to = next_comp - day
+        days_since = day - last_comp
+        target = category * 0.985
+        if days_to <= WATER_CUT_DAYS:
+            # Water cut: the last ~2-3% in the final days, on the scale the morning of
+            weight = target
+        elif days_to <= CUT_DAYS:
+            progress = 1 - (days_to - WATER_CUT_DAYS) / (CUT_DAYS - WATER_CUT_DAYS)
+            weight = walk_around - (walk_around - category * 1.02) * progress ** 1.5
+        elif days_since <= REBOUND_DAYS:
+            weight = target + (walk_around - target) * math.sqrt(days_since / REBOUND_DAYS)
+        else:
+            weight = walk_around
+        drift = 0.9 * drift + rng.gauss(0, 0.15)
+        weights.append(round(weight + drift, 1))
+    return weights
+
+
+def day_timestamp(day, hour, minute):
+    return int(datetime(day.year, day.month, day.day, hour, minute).timestamp() * 1000)
+
+
+def generate_sample_data(db_path, athletes=1000, days=365, nutritionists=None,
+                         messages_per_day=0.3, assessment_every_days=7,
+                         competitions_per_year=4, batch_size=200, seed=42, progress=print):
+    """Fill db_path with a synthetic dataset; returns row counts per table.
+
+    Athlete k (0-based) is coached by nutritionist k % nutritionists, and
+    all of their chat messages are with that nutritionist.
+    """
+    rng = random.Random(seed)
+    nutritionists = nutritionists or max(1, athletes // 50)
+    end_day = date.today()
+    start_day = end_day - timedelta(days=days - 1)
+    password_hash = generate_password_hash(SAMPLE_NUTRITIONIST['password'])
+    counts = {'users': 0, 'athletes': 0, 'weight_log': 0, 'messages': 0,
+              'weekly_assessments': 0, 'competitions': 0}
+    started = time.perf_counter()
+
+    created = not os.path.exists(db_path)
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    version_triggers = []
+    if created:
+        # Nothing can have cached fragments of a new file: skip the per-row version bumps
+        version_triggers = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_data_version_%'"
+        ).fetchall()
+        for name, _ in version_triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+    if created:
+        # Bulk load: a new file is only useful once generation completes anyway
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+    elif conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+        # Appending to an existing database: keep it crash-safe, WAL stays on
+        conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA cache_size = -200000')
+
+    next_user_id = (conn.execute('SELECT MAX(id) FROM users').fetchone()[0] or 0) + 1
+    next_athlete_id = (conn.execute('SELECT MAX(id) FROM athletes').fetchone()[0] or 0) + 1
+    run_tag = f'{seed}-{next_user_id}'
+
+    nutritionist_ids = list(range(next_user_id, next_user_id + nutritionists))
+    with conn:
+        conn.executemany(
+            'INSERT INTO users (id, email, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)',
+            [(user_id, f'nutritionist{i}.{run_tag}@judo.co.il', password_hash, 'nutritionist', f'{start_day} 08:00:00')
+             for i, user_id in enumerate(nutritionist_ids)]
+        )
+    counts['users'] += nutritionists
+    next_user_id += nutritionists
+
+    for batch_start in range(0, athletes, batch_size):
+        users, profiles, weights, messages, assessments, competitions = [], [], [], [], [], []
+        for k in range(batch_start, min(batch_start + batch_size, athletes)):
+            user_id = next_user_id + k
+            athlete_id = next_athlete_id + k
+            nutritionist_id = nutritionist_ids[k % nutritionists]
+            template = SAMPLE_ATHLETES[k % len(SAMPLE_ATHLETES)]
+            gender = template['gender'] if k < len(SAMPLE_ATHLETES) else rng.choice(['male', 'female'])
+            category = template['weight_category'] if k < len(SAMPLE_ATHLETES) else rng.choice(WEIGHT_CATEGORIES[gender])
+            name = template['name'] if k < len(SAMPLE_ATHLETES) else \
+                f"{rng.choice(FIRST_NAMES[gender])} {rng.choice(LAST_NAMES)}"
+            walk_around = category * rng.uniform(1.03, 1.08)
+            # Competitions run up to two months past today, so some athletes are mid-cut
+            comp_days = competition_days(rng, days + 60, competitions_per_year)
+            upcoming = [d for d in comp_days if d >= days]
+            next_competition = (start_day + timedelta(days=upcoming[0])).isoformat() if upcoming else None
+
+            users.append((user_id, f'athlete{k}.{run_tag}@judo.co.il', password_hash, 'athlete', f'{start_day} 08:00:00'))
+            profiles.append((athlete_id, user_id, name, rng.randint(16, 32), gender, category,
+                             rng.choice(SPORT_LEVELS), round(rng.uniform(150, 195), 1),
+                             category, next_competition))
+            for offset in comp_days:
+                competitions.append((athlete_id, rng.choice(COMPETITION_NAMES),
+                                     (start_day + timedelta(days=offset)).isoformat(), category, category))
+
+            curve = weight_curve(rng, days, category, walk_around, comp_days)
+            for offset, morning in enumerate(curve):
+                day = start_day + timedelta(days=offset)
+                iso = day.isoformat()
+                weights.append((user_id, iso, day_timestamp(day, 7, rng.randrange(60)), morning, 'בוקר', None))
+                weights.append((user_id, iso, day_timestamp(day, 20, rng.randrange(60)),
+                                round(morning + rng.uniform(0.6, 1.4), 1), 'ערב', None))
+
+                if assessment_every_days and offset % assessment_every_days == assessment_every_days - 1:
+                    answers = {key: rng.randint(1, 5) for key in
+                               ('sleepQuality', 'appetite', 'mood', 'energy', 'recovery')}
+                    answers['sleepHours'] = rng.choice([5, 6, 7, 8, 9])
+                    assessments.append((athlete_id, json.dumps(answers), f'{iso} 21:00:00'))
+
+                # Poisson-ish chat volume, busier during a cut
+                rate = messages_per_day * (2 if any(0 <= d - offset <= CUT_DAYS for d in comp_days) else 1)
+                count = int(rate) + (rng.random() < rate - int(rate))
+                for _ in range(count):
+                    from_athlete = rng.random() < 0.55
+                    text = rng.choice(ATHLETE_MESSAGES if from_athlete else NUTRITIONIST_MESSAGES)
+                    messages.append((
+                        user_id if from_athlete else nutritionist_id,
+                        nutritionist_id if from_athlete else user_id,
+                        'athlete' if from_athlete else 'nutritionist',
+                        text.format(weight=morning),
+                        f'{iso} {rng.randrange(7, 23):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}',
+                        'text',
+                        int(days - offset > 3)
+                    ))
+
+        with conn:
+            conn.executemany(
+                'INSERT INTO users (id, email, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)', users)
+            conn.executemany('''
+                INSERT INTO athletes (id, user_id, name, age, gender, weight_category, sport_level,
+                                      height, target_weight, next_competition)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', profiles)
+            conn.executemany(
+                'INSERT OR IGNORE INTO weight_log (athlete_id, day, ts, weight, timing, notes) VALUES (?, ?, ?, ?, ?, ?)',
+                weights)
+            conn.executemany('''
+                INSERT INTO messages (sender_id, receiver_id, role, message, timestamp, message_type, is_read)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', messages)
+            conn.executemany(
+                'INSERT INTO weekly_assessments (athlete_id, responses, completed_at) VALUES (?, ?, ?)', assessments)
+            conn.executemany('''
+                INSERT INTO competitions (athlete_id, name, competition_date, weight_category, target_weight)
+                VALUES (?, ?, ?, ?, ?)
+            ''', competitions)
+
+        counts['users'] += len(users)
+        counts['athletes'] += len(profiles)
+        counts['weight_log'] += len(weights)
+        counts['messages'] += len(messages)
+        counts['weekly_assessments'] += len(assessments)
+        counts['competitions'] += len(competitions)
+        if progress:
+            done = min(batch_start + batch_size, athletes)
+            progress(f"   athletes: {done}/{athletes} ({time.perf_counter() - started:.1f}s)")
+
+    # Messages older than 3 days were generated as read: seed the read watermarks from is_read,
+    # then put back the data version triggers dropped for the bulk load
+    with conn:
+        backfill_watermarks(conn)
+        for _, sql in version_triggers:
+            conn.execute(sql)
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Judo Nutrition database')
+    parser.add_argument('db_path')
+    parser.add_argument('--athletes', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--nutritionists', type=int, default=None)
+    parser.add_argument('--messages-per-day', type=float, default=0.3)
+    parser.add_argument('--assessment-every-days', type=int, default=7)
+    parser.add_argument('--competitions-per-year', type=float, default=4)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🔄 Generating {args.athletes} athletes x {args.days} days into {args.db_path}")
+    started = time.perf_counter()
+    counts = generate_sample_data(
+        args.db_path, athletes=args.athletes, days=args.days, nutritionists=args.nutritionists,
+        messages_per_day=args.messages_per_day, assessment_every_days=args.assessment_every_days,
+        competitions_per_year=args.competitions_per_year, batch_size=args.batch_size, seed=args.seed
+    )
+    for table, count in counts.items():
+        print(f"   {table}: {count:,}")
+    print(f"🎉 Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,9 @@ import sqlite3
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session
 from datetime import datetime
 import json
-from flask_mail import Mail, Message
-import secrets
+from mail_outbox import OutboxSender, FlaskMailTransport, create_outbox_table, enqueue_email
+from reset_tokens import (ResetTokenSweeper, create_reset_tokens_table, create_reset_token,
+                          find_reset_token_user, consume_reset_token)
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-in-production'
@@ -15,11 +16,14 @@ app.config['MAIL_PORT'] = 587
 app.config['MAIL_USE_TLS'] = True
 app.config['MAIL_USERNAME'] = 'your.email@gmail.com'  # שנה למייל שלך
 app.config['MAIL_PASSWORD'] = 'your-app-password'     # שנה לסיסמת אפליקציה
-mail = Mail(app)
 
 # Database setup
 DATABASE = 'simple_app.db'
 
+# מיילים נשמרים בטבלת mail_outbox ונשלחים ברקע
+outbox = OutboxSender(DATABASE, FlaskMailTransport(app))  # Flask-Mail נטען רק בשליחה הראשונה
+reset_token_sweeper = ResetTokenSweeper(DATABASE)
+
 def init_db():
     """Initialize the database with tables"""
     conn = sqlite3.connect(DATABASE)
@@ -59,6 +63,9 @@ def init_db():
             FOREIGN KEY (receiver_id) REFERENCES users (id)
         )
     ''')
+    # Outgoing mail queue and expiring reset tokens
+    create_outbox_table(cursor)
+    create_reset_tokens_table(cursor)
     conn.commit()
     conn.close()
 
@@ -175,13 +182,11 @@ def api_posts():
 
 # שליחת מייל איפוס סיסמה
 
-def send_reset_email(email, token):
+def send_reset_email(conn, email, token):
+    """Queue the reset email; it is committed together with the token and sent in the background"""
     reset_url = url_for('reset_password', token=token, _external=True)
-    msg = Message('איפוס סיסמה - Simple Flask App',
-                  sender=app.config['MAIL_USERNAME'],
-                  recipients=[email])
-    msg.body = f"שלום,\n\nלחץ על הקישור הבא כדי לאפס את הסיסמה שלך:\n{reset_url}\n\nאם לא ביקשת איפוס, התעלם מהודעה זו."
-    mail.send(msg)
+    body = f"שלום,\n\nלחץ על הקישור הבא כדי לאפס את הסיסמה שלך:\n{reset_url}\n\nאם לא ביקשת איפוס, התעלם מהודעה זו."
+    enqueue_email(conn, email, 'איפוס סיסמה - Simple Flask App', body)
 
 @app.route('/forgot-password', methods=['GET', 'POST'])
 def forgot_password():
@@ -190,11 +195,12 @@ def forgot_password():
         conn = get_db()
         user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
         if user:
-            token = secrets.token_urlsafe(32)
-            conn.execute('UPDATE users SET reset_token = ? WHERE id = ?', (token, user['id']))
+            token = create_reset_token(conn, user['id'])
+            send_reset_email(conn, email, token)
             conn.commit()
-            send_reset_email(email, token)
             conn.close()
+            outbox.wake()
+            reset_token_sweeper.start()
             return render_template('forgot_password.html', message='קישור לאיפוס סיסמה נשלח למייל שלך!')
         else:
             conn.close()
@@ -204,13 +210,16 @@ def forgot_password():
 @app.route('/reset-password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
     conn = get_db()
-    user = conn.execute('SELECT * FROM users WHERE reset_token = ?', (token,)).fetchone()
-    if not user:
+    if find_reset_token_user(conn, token) is None:
         conn.close()
         return 'קישור לא תקין או שפג תוקפו', 400
     if request.method == 'POST':
         password = request.form['password']
-        conn.execute('UPDATE users SET password = ?, reset_token = NULL WHERE id = ?', (password, user['id']))
+        user_id = consume_reset_token(conn, token)
+        if user_id is None:
+            conn.close()
+            return 'קישור לא תקין או שפג תוקפו', 400
+        conn.execute('UPDATE users SET password = ? WHERE id = ?', (password, user_id))
         conn.commit()
         conn.close()
         return redirect(url_for('login'))
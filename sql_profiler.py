@@ -0,0 +1,261 @@
+"""
+Per-request SQL profiling
+
+Every statement executed during a request is recorded with its text,
+duration and row count:
+
+- sqlite3: connections opened with factory=ProfiledConnection (see
+  database.get_db_connection) time execute()/executemany() and the
+  fetches that follow them;
+- SQLAlchemy: instrument_sqlalchemy(engine) hooks the cursor events.
+
+init_app(app) then
+- adds a Server-Timing header (db;dur=<ms>;desc="<n> queries"),
+- logs statements slower than SQL_SLOW_QUERY_MS together with their
+  EXPLAIN QUERY PLAN,
+- aggregates per-statement stats, served at /api/admin/sql_stats
+  (debug mode, or X-Admin-Token matching ADMIN_TOKEN).
+"""
+
+import contextvars
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('sql_profiler_queries', default=None)
+_whitespace = re.compile(r'\s+')
+
+
+class QueryStats:
+    """Aggregated statement stats across requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+            self._endpoints = {}
+
+    def add_request(self, endpoint, queries):
+        with self._lock:
+            per_endpoint = self._endpoints.setdefault(endpoint, {'requests': 0, 'queries': 0, 'total_ms': 0.0})
+            per_endpoint['requests'] += 1
+            per_endpoint['queries'] += len(queries)
+            for query in queries:
+                per_endpoint['total_ms'] += query['ms']
+                stats = self._statements.get(query['sql'])
+                if stats is None:
+                    stats = self._statements[query['sql']] = {
+                        'sql': query['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0
+                    }
+                stats['count'] += 1
+                stats['total_ms'] += query['ms']
+                stats['max_ms'] = max(stats['max_ms'], query['ms'])
+                stats['rows'] += max(query['rows'], 0)
+
+    def snapshot(self, limit=50):
+        with self._lock:
+            statements = sorted(self._statements.values(), key=lambda s: s['total_ms'], reverse=True)[:limit]
+            statements = [dict(s, avg_ms=s['total_ms'] / s['count']) for s in statements]
+            endpoints = {
+                name: dict(e, avg_queries=e['queries'] / e['requests'], avg_ms=e['total_ms'] / e['requests'])
+                for name, e in self._endpoints.items()
+            }
+        return {'statements': statements, 'endpoints': endpoints}
+
+
+query_stats = QueryStats()
+
+# Statements slower than this are logged with their query plan
+slow_query_ms = float(os.environ.get('SQL_SLOW_QUERY_MS', 50))
+
+
+def normalize_sql(sql):
+    return _whitespace.sub(' ', sql).strip()
+
+
+def record_query(sql, ms, rows=-1, explain=None):
+    """Add a statement to the current request; returns the record (or None outside a request)"""
+    queries = _current.get()
+    if queries is None:
+        return None
+    entry = {'sql': normalize_sql(sql), 'ms': ms, 'rows': rows, 'slow_logged': False}
+    queries.append(entry)
+    check_slow(entry, explain)
+    return entry
+
+
+def check_slow(entry, explain=None):
+    if entry['slow_logged'] or entry['ms'] < slow_query_ms:
+        return
+    entry['slow_logged'] = True
+    plan = ''
+    if explain is not None:
+        try:
+            plan = '\n'.join('   ' + ' '.join(str(c) for c in row) for row in explain())
+        except Exception as e:
+            plan = f'   (no plan: {e})'
+    logger.warning(f"Slow query ({entry['ms']:.1f} ms, {entry['rows']} rows): {entry['sql']}\n{plan}")
+
+
+# ---------------------------------------------------------------------------
+# sqlite3
+# ---------------------------------------------------------------------------
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that times statements and the fetches that follow them"""
+
+    _entry = None
+    _explain_plan = None
+
+    def _explain(self, sql, parameters):
+        conn = self.connection
+        return lambda: sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+
+    def execute(self, sql, parameters=()):
+        if _current.get() is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            rows = self.rowcount if self.rowcount >= 0 else 0
+            self._explain_plan = self._explain(sql, parameters)
+            self._entry = record_query(sql, ms, rows, self._explain_plan)
+
+    def executemany(self, sql, seq_of_parameters):
+        if _current.get() is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._explain_plan = None
+            self._entry = record_query(sql, (time.perf_counter() - start) * 1000, self.rowcount)
+
+    def _timed_fetch(self, fetch, *args):
+        entry = self._entry
+        if entry is None:
+            return fetch(*args)
+        start = time.perf_counter()
+        result = fetch(*args)
+        entry['ms'] += (time.perf_counter() - start) * 1000
+        if isinstance(result, list):
+            entry['rows'] += len(result)
+        elif result is not None:
+            entry['rows'] += 1
+        check_slow(entry, self._explain_plan)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=ProfiledConnection); also feeds the connection gauges"""
+
+    _counted = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        metrics.inc('sqlite_connections_opened_total')
+        metrics.gauge_add('sqlite_connections_open', 1)
+        self._counted = True
+
+    def close(self):
+        if self._counted:
+            self._counted = False
+            metrics.gauge_add('sqlite_connections_open', -1)
+        super().close()
+
+    def __del__(self):
+        if self._counted:
+            self._counted = False
+            metrics.gauge_add('sqlite_connections_open', -1)
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# ---------------------------------------------------------------------------
+# SQLAlchemy
+# ---------------------------------------------------------------------------
+
+def instrument_sqlalchemy(engine):
+    """Record SQLAlchemy statements executed on engine (e.g. db.engine of routes.py)"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._profiler_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        ms = (time.perf_counter() - context._profiler_start) * 1000
+        explain = None
+        if not executemany and engine.dialect.name == 'sqlite':
+            explain = lambda: conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        record_query(statement, ms, cursor.rowcount, explain)
+
+
+# ---------------------------------------------------------------------------
+# Flask integration
+# ---------------------------------------------------------------------------
+
+def init_app(app):
+    @app.before_request
+    def start_sql_profile():
+        g.sql_queries = []
+        _current.set(g.sql_queries)
+
+    @app.after_request
+    def finish_sql_profile(response):
+        queries = g.pop('sql_queries', None)
+        _current.set(None)
+        if queries:
+            total_ms = sum(q['ms'] for q in queries)
+            timing = f'db;dur={total_ms:.2f};desc="{len(queries)} queries"'
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+            query_stats.add_request(request.endpoint or 'unknown', queries)
+        return response
+
+    @app.teardown_request
+    def clear_sql_profile(exc):
+        _current.set(None)
+
+    @app.route('/api/admin/sql_stats', methods=['GET'])
+    def sql_stats():
+        token = current_app.config.get('ADMIN_TOKEN') or os.environ.get('ADMIN_TOKEN')
+        if not current_app.debug and (not token or request.headers.get('X-Admin-Token') != token):
+            return jsonify({'error': 'Admin access required'}), 403
+        snapshot = query_stats.snapshot(limit=request.args.get('limit', 50, type=int))
+        if request.args.get('reset'):
+            query_stats.reset()
+        return jsonify(snapshot)
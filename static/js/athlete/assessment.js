@@ -0,0 +1,1086 @@
+// Athlete weekly assessment tab - loaded on demand by athlete.js
+
+// ===== QUESTIONNAIRE FUNCTIONS =====
+
+/**
+ * Setup questionnaire event handlers
+ */
+function setupQuestionnaireHandlers() {
+    console.log('Setting up questionnaire handlers');
+    
+    // Set today's date automatically
+    const assessmentDate = document.getElementById('assessmentDate');
+    if (assessmentDate && !assessmentDate.value) {
+        const today = new Date().toISOString().split('T')[0];
+        assessmentDate.value = today;
+    }
+    
+    // Check if menstrual question should show (monthly)
+    checkMenstrualQuestionVisibility();
+    
+    // Load saved progress
+    loadQuestionnaireProgress();
+    
+    // Track progress on input changes
+    setupProgressTracking();
+    
+    // Handle conditional questions
+    setupConditionalQuestions();
+    
+    // Handle form submission
+    setupQuestionnaireFormHandlers();
+    
+    // Auto-save functionality
+    setupAutoSave();
+}
+
+/**
+ * Setup progress tracking for all form elements
+ */
+function setupProgressTracking() {
+    const form = document.getElementById('weeklyAssessmentForm');
+    if (!form) return;
+    
+    const inputs = form.querySelectorAll('input, select, textarea');
+    inputs.forEach(input => {
+        input.addEventListener('change', updateQuestionnaireProgress);
+        input.addEventListener('input', updateQuestionnaireProgress);
+    });
+    
+    // Initial progress check
+    updateQuestionnaireProgress();
+}
+
+/**
+ * Update questionnaire progress bar
+ */
+function updateQuestionnaireProgress() {
+    const totalQuestions = 14;
+    let completedQuestions = 0;
+    
+    // Check each question (0 is the date field)
+    for (let i = 0; i <= totalQuestions-1; i++) {
+        const questionCard = document.querySelector(`[data-question="${i}"]`);
+        if (!questionCard) continue;
+        
+        const isRequired = questionCard.querySelector('.required-indicator');
+        let isCompleted = false;
+        
+        switch (i) {
+            case 0: // Assessment Date
+                isCompleted = document.getElementById('assessmentDate')?.value !== '';
+                break;
+            case 1: // Daily Weight
+                isCompleted = document.getElementById('dailyWeight')?.value !== '';
+                break;
+            case 2: // Sleep Hours
+                isCompleted = document.querySelector('input[name="sleepHours"]:checked') !== null;
+                break;
+            case 3: // Sleep Quality
+                isCompleted = document.querySelector('input[name="sleepQuality"]:checked') !== null;
+                break;
+            case 4: // Sleep Times
+                isCompleted = document.getElementById('sleepTime')?.value !== '' && 
+                             document.getElementById('wakeTime')?.value !== '';
+                break;
+            case 5: // Appetite
+                isCompleted = document.querySelector('input[name="appetite"]:checked') !== null;
+                break;
+            case 6: // Water Intake
+                isCompleted = document.getElementById('waterIntake')?.value !== '';
+                break;
+            case 7: // Supplements (not required)
+                isCompleted = true;
+                break;
+            case 8: // Menstrual Cycle (conditional)
+                const applicableToMe = document.getElementById('applicableToMe');
+                if (applicableToMe?.checked) {
+                    isCompleted = document.querySelector('input[name="menstrualCycle"]:checked') !== null;
+                } else {
+                    isCompleted = true;
+                }
+                break;
+            case 9: // Health Issues (not required)
+                isCompleted = true;
+                break;
+            case 10: // Mood
+                isCompleted = document.querySelector('input[name="mood"]:checked') !== null;
+                break;
+            case 11: // Energy
+                isCompleted = document.querySelector('input[name="energy"]:checked') !== null;
+                break;
+            case 12: // Recovery
+                isCompleted = document.querySelector('input[name="recovery"]:checked') !== null;
+                break;
+            case 13: // Additional Notes (not required)
+                isCompleted = true;
+                break;
+        }
+        
+        if (isCompleted || !isRequired) {
+            completedQuestions++;
+            questionCard.classList.add('completed');
+        } else {
+            questionCard.classList.remove('completed');
+        }
+    }
+    
+    const progressPercentage = (completedQuestions / totalQuestions) * 100;
+    const progressBar = document.getElementById('questionnaireProgress');
+    const progressText = document.getElementById('progressText');
+    
+    if (progressBar) progressBar.style.width = `${progressPercentage}%`;
+    if (progressText) progressText.textContent = `${completedQuestions}/${totalQuestions}`;
+    
+    // Update submit button state
+    const submitBtn = document.getElementById('submitQuestionnaireBtn');
+    if (submitBtn) {
+        submitBtn.disabled = progressPercentage < 85; // Allow submit when most questions are complete
+    }
+}
+
+/**
+ * Setup conditional questions logic
+ */
+function setupConditionalQuestions() {
+    // Handle supplements "other" checkbox
+    const otherSupplCheckbox = document.getElementById('suppl8');
+    const otherSupplDiv = document.getElementById('otherSupplementDiv');
+    if (otherSupplCheckbox && otherSupplDiv) {
+        otherSupplCheckbox.addEventListener('change', function() {
+            otherSupplDiv.style.display = this.checked ? 'block' : 'none';
+        });
+    }
+    
+    // Handle menstrual cycle applicable checkbox
+    const applicableCheckbox = document.getElementById('applicableToMe');
+    const menstrualOptions = document.getElementById('menstrualOptions');
+    if (applicableCheckbox && menstrualOptions) {
+        applicableCheckbox.addEventListener('change', function() {
+            menstrualOptions.style.display = this.checked ? 'block' : 'none';
+            updateQuestionnaireProgress();
+        });
+    }
+    
+    // Handle health issues checkboxes - injury and other need detail
+    const injuryCheckbox = document.getElementById('health1');
+    const injuryDetail = document.getElementById('injuryDetail');
+    if (injuryCheckbox && injuryDetail) {
+        injuryCheckbox.addEventListener('change', function() {
+            injuryDetail.style.display = this.checked ? 'block' : 'none';
+        });
+    }
+    
+    // Handle "other" health condition checkbox
+    const otherHealthCheckbox = document.getElementById('health7');
+    const otherHealthDetail = document.getElementById('otherHealthDetail');
+    if (otherHealthCheckbox && otherHealthDetail) {
+        otherHealthCheckbox.addEventListener('change', function() {
+            otherHealthDetail.style.display = this.checked ? 'block' : 'none';
+        });
+    }
+}
+
+/**
+ * Setup form submission and save handlers
+ */
+function setupQuestionnaireFormHandlers() {
+    const form = document.getElementById('weeklyAssessmentForm');
+    const saveDraftBtn = document.getElementById('saveDraftBtn');
+    const submitBtn = document.getElementById('submitQuestionnaireBtn');
+    const sendToNutritionistBtn = document.getElementById('sendToNutritionistBtn');
+    
+    if (form) {
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            submitQuestionnaire();
+        });
+    }
+    
+    if (saveDraftBtn) {
+        saveDraftBtn.addEventListener('click', function() {
+            saveQuestionnaireDraft();
+        });
+    }
+    
+    if (sendToNutritionistBtn) {
+        sendToNutritionistBtn.addEventListener('click', function() {
+            sendToNutritionist();
+        });
+    }
+}
+
+/**
+ * Setup auto-save functionality
+ */
+function setupAutoSave() {
+    let autoSaveTimer;
+    const form = document.getElementById('weeklyAssessmentForm');
+    
+    if (form) {
+        form.addEventListener('input', function() {
+            clearTimeout(autoSaveTimer);
+            autoSaveTimer = setTimeout(() => {
+                saveQuestionnaireDraft(true); // Silent save
+            }, 30000); // Auto-save every 30 seconds
+        });
+    }
+}
+
+/**
+ * Collect all questionnaire data
+ */
+function collectQuestionnaireData() {
+    const data = {
+        timestamp: new Date().toISOString(),
+        week: getCurrentWeekDates(),
+        answers: {}
+    };
+    
+    // Question 1: Daily Weight
+    data.answers.dailyWeight = document.getElementById('dailyWeight')?.value;
+    
+    // Question 2: Sleep Hours
+    data.answers.sleepHours = document.querySelector('input[name="sleepHours"]:checked')?.value;
+    
+    // Question 3: Sleep Quality
+    data.answers.sleepQuality = document.querySelector('input[name="sleepQuality"]:checked')?.value;
+    
+    // Question 4: Sleep Times
+    data.answers.sleepTime = document.getElementById('sleepTime')?.value;
+    data.answers.wakeTime = document.getElementById('wakeTime')?.value;
+    
+    // Question 5: Appetite
+    data.answers.appetite = document.querySelector('input[name="appetite"]:checked')?.value;
+    
+    // Question 6: Water Intake
+    data.answers.waterIntake = document.getElementById('waterIntake')?.value;
+    data.answers.waterUnit = document.getElementById('waterUnit')?.value;
+    
+    // Question 7: Supplements
+    const supplements = [];
+    document.querySelectorAll('input[type="checkbox"][id^="suppl"]:checked').forEach(cb => {
+        if (cb.value === 'other') {
+            const otherValue = document.getElementById('otherSupplement')?.value;
+            if (otherValue) supplements.push(`other: ${otherValue}`);
+        } else {
+            supplements.push(cb.value);
+        }
+    });
+    data.answers.supplements = supplements;
+    
+    // Question 8: Menstrual Cycle (with last period date)
+    const applicableToMe = document.getElementById('applicableToMe')?.checked;
+    data.answers.menstrualApplicable = applicableToMe;
+    if (applicableToMe) {
+        data.answers.menstrualCycle = document.querySelector('input[name="menstrualCycle"]:checked')?.value;
+        data.answers.lastPeriodDate = document.getElementById('lastPeriodDate')?.value;
+    }
+    
+    // Question 9: Health Issues (new structure)
+    const healthIssues = [];
+    const healthCheckboxes = ['health1', 'health2', 'health3', 'health4', 'health5', 'health6'];
+    const healthValues = ['injury', 'stomach-pain', 'muscle-pain', 'constipation', 'diarrhea', 'headaches'];
+    
+    healthCheckboxes.forEach((checkboxId, index) => {
+        const checkbox = document.getElementById(checkboxId);
+        if (checkbox?.checked) {
+            const healthIssue = { type: healthValues[index] };
+            
+            // Only injury has detail field
+            if (healthValues[index] === 'injury') {
+                const detail = document.querySelector('#injuryDetail textarea')?.value;
+                if (detail) healthIssue.detail = detail;
+            }
+            
+            healthIssues.push(healthIssue);
+        }
+    });
+    data.answers.healthIssues = healthIssues;
+    
+    // Question 10: Mood
+    data.answers.mood = document.querySelector('input[name="mood"]:checked')?.value;
+    
+    // Question 11: Energy
+    data.answers.energy = document.querySelector('input[name="energy"]:checked')?.value;
+    
+    // Question 12: Recovery
+    data.answers.recovery = document.querySelector('input[name="recovery"]:checked')?.value;
+    
+    // Question 13: Additional Notes
+    data.answers.additionalNotes = document.getElementById('additionalNotes')?.value;
+    
+    return data;
+}
+
+/**
+ * Save questionnaire as draft
+ */
+function saveQuestionnaireDraft(silent = false) {
+    const data = collectQuestionnaireData();
+    const weekKey = `questionnaire_draft_${getCurrentWeekString()}`;
+    
+    localStorage.setItem(weekKey, JSON.stringify(data));
+    
+    if (!silent) {
+        showQuestionnaireAlert('success', 'הטיוטה נשמרה בהצלחה!');
+    }
+}
+
+/**
+ * Load saved questionnaire progress
+ */
+function loadQuestionnaireProgress() {
+    const weekKey = `questionnaire_draft_${getCurrentWeekString()}`;
+    const savedData = localStorage.getItem(weekKey);
+    
+    if (!savedData) return;
+    
+    try {
+        const data = JSON.parse(savedData);
+        populateFormFromData(data);
+        updateQuestionnaireProgress();
+    } catch (error) {
+        console.error('Error loading questionnaire draft:', error);
+    }
+}
+
+/**
+ * Populate form from saved data
+ */
+function populateFormFromData(data) {
+    const answers = data.answers;
+    
+    // Populate all saved answers
+    if (answers.dailyWeight) document.getElementById('dailyWeight').value = answers.dailyWeight;
+    if (answers.sleepHours) document.querySelector(`input[name="sleepHours"][value="${answers.sleepHours}"]`).checked = true;
+    if (answers.sleepQuality) document.querySelector(`input[name="sleepQuality"][value="${answers.sleepQuality}"]`).checked = true;
+    if (answers.sleepTime) document.getElementById('sleepTime').value = answers.sleepTime;
+    if (answers.wakeTime) document.getElementById('wakeTime').value = answers.wakeTime;
+    if (answers.appetite) document.querySelector(`input[name="appetite"][value="${answers.appetite}"]`).checked = true;
+    if (answers.waterIntake) document.getElementById('waterIntake').value = answers.waterIntake;
+    if (answers.waterUnit) document.getElementById('waterUnit').value = answers.waterUnit;
+    
+    // Populate supplements
+    if (answers.supplements) {
+        answers.supplements.forEach(supplement => {
+            if (supplement.startsWith('other:')) {
+                document.getElementById('suppl5').checked = true;
+                document.getElementById('otherSupplement').value = supplement.replace('other: ', '');
+                document.getElementById('otherSupplementDiv').style.display = 'block';
+            } else {
+                const checkbox = document.querySelector(`input[value="${supplement}"]`);
+                if (checkbox) checkbox.checked = true;
+            }
+        });
+    }
+    
+    // Populate menstrual cycle
+    if (answers.menstrualApplicable) {
+        document.getElementById('applicableToMe').checked = true;
+        document.getElementById('menstrualOptions').style.display = 'block';
+        if (answers.menstrualCycle) {
+            document.querySelector(`input[name="menstrualCycle"][value="${answers.menstrualCycle}"]`).checked = true;
+        }
+    }
+    
+    // Populate health issues
+    if (answers.healthIssues) {
+        Object.keys(answers.healthIssues).forEach(issue => {
+            const checkboxMap = { pain: 'health1', injury: 'health2', fatigue: 'health3' };
+            const detailMap = { pain: 'painDetail', injury: 'injuryDetail', fatigue: 'fatigueDetail' };
+            
+            const checkbox = document.getElementById(checkboxMap[issue]);
+            if (checkbox) {
+                checkbox.checked = true;
+                const detailDiv = document.getElementById(detailMap[issue]);
+                if (detailDiv) {
+                    detailDiv.style.display = 'block';
+                    const textarea = detailDiv.querySelector('textarea');
+                    if (textarea && typeof answers.healthIssues[issue] === 'string') {
+                        textarea.value = answers.healthIssues[issue];
+                    }
+                }
+            }
+        });
+    }
+    
+    if (answers.mood) document.querySelector(`input[name="mood"][value="${answers.mood}"]`).checked = true;
+    if (answers.energy) document.querySelector(`input[name="energy"][value="${answers.energy}"]`).checked = true;
+    if (answers.recovery) document.querySelector(`input[name="recovery"][value="${answers.recovery}"]`).checked = true;
+    if (answers.additionalNotes) document.getElementById('additionalNotes').value = answers.additionalNotes;
+}
+
+/**
+ * Submit questionnaire
+ */
+function submitQuestionnaire() {
+    const data = collectQuestionnaireData();
+    const weekKey = `questionnaire_completed_${getCurrentWeekString()}`;
+    
+    // Validate required fields
+    const requiredFields = ['dailyWeight', 'sleepHours', 'sleepQuality', 'sleepTime', 'wakeTime', 
+                           'appetite', 'waterIntake', 'mood', 'energy', 'recovery'];
+    
+    const missingFields = requiredFields.filter(field => {
+        if (field === 'sleepTime' || field === 'wakeTime') {
+            return !data.answers[field];
+        }
+        return !data.answers[field];
+    });
+    
+    if (missingFields.length > 0) {
+        showQuestionnaireAlert('warning', 'אנא השלם את כל השדות הנדרשים לפני שליחת השאלון');
+        return;
+    }
+    
+    // Save completed questionnaire
+    data.status = 'completed';
+    data.submittedAt = new Date().toISOString();
+    
+    localStorage.setItem(weekKey, JSON.stringify(data));
+    
+    // Update weight in weight screen
+    if (data.answers.dailyWeight) {
+        updateWeightFromQuestionnaire(data.answers.dailyWeight);
+    }
+    
+    // Clear draft
+    const draftKey = `questionnaire_draft_${getCurrentWeekString()}`;
+    localStorage.removeItem(draftKey);
+    
+    // Show success message and disable form
+    showQuestionnaireAlert('success', 'השאלון נשלח בהצלחה! המשקל עודכן במסך המשקל. תודה על השתתפותך.');
+    
+    // Disable form
+    const form = document.getElementById('weeklyAssessmentForm');
+    if (form) {
+        const inputs = form.querySelectorAll('input, select, textarea, button');
+        inputs.forEach(input => input.disabled = true);
+    }
+}
+
+/**
+ * Show questionnaire alert
+ */
+function showQuestionnaireAlert(type, message) {
+    const alertDiv = document.createElement('div');
+    alertDiv.className = `alert alert-${type} alert-dismissible fade show position-fixed`;
+    alertDiv.style.cssText = 'top: 20px; right: 20px; z-index: 1050; min-width: 300px;';
+    
+    const iconMap = {
+        success: 'fa-check-circle',
+        warning: 'fa-exclamation-triangle',
+        danger: 'fa-times-circle'
+    };
+    
+    alertDiv.innerHTML = `
+        <i class="fas ${iconMap[type]} me-2"></i>
+        ${message}
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    `;
+    
+    document.body.appendChild(alertDiv);
+    
+    setTimeout(() => {
+        if (alertDiv.parentNode) {
+            alertDiv.remove();
+        }
+    }, 5000);
+}
+
+/**
+ * Get current week dates string
+ */
+function getCurrentWeekDates() {
+    const today = new Date();
+    const startOfWeek = new Date(today);
+    startOfWeek.setDate(today.getDate() - today.getDay()); // Sunday
+    
+    const endOfWeek = new Date(startOfWeek);
+    endOfWeek.setDate(startOfWeek.getDate() + 6); // Saturday
+    
+    const formatDate = (date) => {
+        return date.toLocaleDateString('he-IL', { day: 'numeric', month: 'short' });
+    };
+    
+    return `${formatDate(startOfWeek)} - ${formatDate(endOfWeek)}`;
+}
+
+/**
+ * Get current week string for storage key
+ */
+function getCurrentWeekString() {
+    const today = new Date();
+    const year = today.getFullYear();
+    const weekNumber = getWeekNumber(today);
+    return `${year}_week_${weekNumber}`;
+}
+
+/**
+ * Get week number of the year
+ */
+function getWeekNumber(date) {
+    const firstDayOfYear = new Date(date.getFullYear(), 0, 1);
+    const pastDaysOfYear = (date - firstDayOfYear) / 86400000;
+    return Math.ceil((pastDaysOfYear + firstDayOfYear.getDay() + 1) / 7);
+}
+
+/**
+ * Check if menstrual question should be visible (once per month)
+ */
+function checkMenstrualQuestionVisibility() {
+    const menstrualQuestion = document.getElementById('menstrualQuestion');
+    if (!menstrualQuestion) return;
+    
+    const today = new Date();
+    const currentMonth = today.getMonth();
+    const currentYear = today.getFullYear();
+    const monthKey = `menstrual_shown_${currentYear}_${currentMonth}`;
+    
+    // Check if question was already shown this month
+    const shownThisMonth = localStorage.getItem(monthKey);
+    
+    if (!shownThisMonth) {
+        menstrualQuestion.style.display = 'block';
+        localStorage.setItem(monthKey, 'true');
+    }
+}
+
+/**
+ * Send questionnaire to nutritionist
+ */
+function sendToNutritionist() {
+    const data = collectQuestionnaireData();
+    
+    if (!data.answers.dailyWeight) {
+        showQuestionnaireAlert('warning', 'יש להזין לפחות את המשקל לפני שליחה לתזונאית');
+        return;
+    }
+    
+    // Save to nutritionist queue
+    const nutritionistKey = `to_nutritionist_${new Date().getTime()}`;
+    data.sentToNutritionist = true;
+    data.sentAt = new Date().toISOString();
+    
+    localStorage.setItem(nutritionistKey, JSON.stringify(data));
+    
+    showQuestionnaireAlert('success', 'השאלון נשלח בהצלחה לתזונאית! היא תקבל את המידע ותוכל לפנות אליך.');
+}
+
+/**
+ * Get weight data from localStorage
+ */
+function getWeightData() {
+    const defaultData = {
+        entries: {},
+        latestWeight: null,
+        targetWeight: 66.0,
+        lastUpdated: null
+    };
+    
+    try {
+        const saved = localStorage.getItem('athleteWeightData');
+        return saved ? JSON.parse(saved) : defaultData;
+    } catch (error) {
+        console.error('Error loading weight data:', error);
+        return defaultData;
+    }
+}
+
+/**
+ * Update weight in weight screen when questionnaire is submitted
+ */
+function updateWeightFromQuestionnaire(weight) {
+    if (!weight) return;
+    
+    const weightData = getWeightData();
+    const today = new Date();
+    const dateKey = today.toISOString().split('T')[0];
+    
+    // Add new weight entry
+    weightData.entries[dateKey] = {
+        weight: parseFloat(weight),
+        date: dateKey,
+        source: 'questionnaire'
+    };
+    
+    // Update latest weight
+    weightData.latestWeight = parseFloat(weight);
+    weightData.lastUpdated = today.toISOString();
+    
+    // Save updated weight data
+    localStorage.setItem('athleteWeightData', JSON.stringify(weightData));
+    
+    console.log('Weight updated from questionnaire:', weight);
+}
+
+/**
+ * Get assessment tab content
+ */
+function getAssessmentContent() {
+    return `
+        <div class="assessment-section">
+            <div class="row">
+                <div class="col-12">
+                    <div class="card shadow">
+                        <div class="card-header d-flex justify-content-between align-items-center">
+                            <div>
+                                <h5 class="mb-0">
+                                    <i class="fas fa-clipboard-list me-2"></i>
+                                    שאלון הערכה שבועי
+                                </h5>
+                                <small class="text-muted">השבוע של ${getCurrentWeekDates()}</small>
+                            </div>
+                            <div class="progress-container">
+                                <div class="progress" style="width: 150px; height: 8px;">
+                                    <div class="progress-bar bg-primary" id="questionnaireProgress" style="width: 0%"></div>
+                                </div>
+                                <small class="text-muted mt-1"><span id="progressText">0/14</span> שאלות</small>
+                            </div>
+                        </div>
+                        <div class="card-body">
+                            <form id="weeklyAssessmentForm">
+                                <div id="questionsContainer">
+                                    <!-- Date Field -->
+                                    <div class="question-card mb-4" data-question="0">
+                                        <div class="question-header">
+                                            <span class="question-number">📅</span>
+                                            <h6 class="question-title">תאריך הערכה</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <input type="date" class="form-control" id="assessmentDate" required>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 1: Daily Weight -->
+                                    <div class="question-card mb-4" data-question="1">
+                                        <div class="question-header">
+                                            <span class="question-number">1</span>
+                                            <h6 class="question-title">משקל יומי</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="input-group">
+                                                <input type="number" class="form-control" id="dailyWeight" 
+                                                       step="0.1" min="40" max="150" 
+                                                       placeholder="הזן משקל בק״ג" required>
+                                                <span class="input-group-text">ק״ג</span>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 2: Sleep Hours -->
+                                    <div class="question-card mb-4" data-question="2">
+                                        <div class="question-header">
+                                            <span class="question-number">2</span>
+                                            <h6 class="question-title">שעות שינה</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="radio-group">
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="radio" name="sleepHours" id="sleep1" value="less-than-6">
+                                                    <label class="form-check-label" for="sleep1">פחות מ-6 שעות</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="radio" name="sleepHours" id="sleep2" value="6-7">
+                                                    <label class="form-check-label" for="sleep2">6-7 שעות</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="radio" name="sleepHours" id="sleep3" value="7-8">
+                                                    <label class="form-check-label" for="sleep3">7-8 שעות</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="radio" name="sleepHours" id="sleep4" value="more-than-8">
+                                                    <label class="form-check-label" for="sleep4">יותר מ-8 שעות</label>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 3: Sleep Quality -->
+                                    <div class="question-card mb-4" data-question="3">
+                                        <div class="question-header">
+                                            <span class="question-number">3</span>
+                                            <h6 class="question-title">איכות שינה</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="rating-scale">
+                                                <div class="scale-labels">
+                                                    <span>גרועה מאוד</span>
+                                                    <span>מצוינת</span>
+                                                </div>
+                                                <div class="scale-buttons">
+                                                    <input type="radio" name="sleepQuality" id="quality1" value="1" class="btn-check">
+                                                    <label class="btn btn-outline-danger" for="quality1">1</label>
+                                                    
+                                                    <input type="radio" name="sleepQuality" id="quality2" value="2" class="btn-check">
+                                                    <label class="btn btn-outline-warning" for="quality2">2</label>
+                                                    
+                                                    <input type="radio" name="sleepQuality" id="quality3" value="3" class="btn-check">
+                                                    <label class="btn btn-outline-secondary" for="quality3">3</label>
+                                                    
+                                                    <input type="radio" name="sleepQuality" id="quality4" value="4" class="btn-check">
+                                                    <label class="btn btn-outline-info" for="quality4">4</label>
+                                                    
+                                                    <input type="radio" name="sleepQuality" id="quality5" value="5" class="btn-check">
+                                                    <label class="btn btn-outline-success" for="quality5">5</label>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 4: Sleep Times -->
+                                    <div class="question-card mb-4" data-question="4">
+                                        <div class="question-header">
+                                            <span class="question-number">4</span>
+                                            <h6 class="question-title">זמני שינה</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="row">
+                                                <div class="col-md-6">
+                                                    <label class="form-label">שעת שינה (שעון 24 שעות)</label>
+                                                    <div class="input-group">
+                                                        <input type="time" class="form-control" id="sleepTime" required>
+                                                        <span class="input-group-text">
+                                                            <i class="fas fa-moon"></i>
+                                                        </span>
+                                                    </div>
+                                                    <small class="form-text text-muted">דוגמה: 23:30 (שעון 24 שעות)</small>
+                                                </div>
+                                                <div class="col-md-6">
+                                                    <label class="form-label">שעת קימה (שעון 24 שעות)</label>
+                                                    <div class="input-group">
+                                                        <input type="time" class="form-control" id="wakeTime" required>
+                                                        <span class="input-group-text">
+                                                            <i class="fas fa-sun"></i>
+                                                        </span>
+                                                    </div>
+                                                    <small class="form-text text-muted">דוגמה: 07:00 (שעון 24 שעות)</small>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 5: Appetite -->
+                                    <div class="question-card mb-4" data-question="5">
+                                        <div class="question-header">
+                                            <span class="question-number">5</span>
+                                            <h6 class="question-title">תיאבון</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="rating-scale">
+                                                <div class="scale-labels">
+                                                    <span>אין תיאבון</span>
+                                                    <span>תיאבון מעולה</span>
+                                                </div>
+                                                <div class="scale-buttons">
+                                                    <input type="radio" name="appetite" id="appetite1" value="1" class="btn-check">
+                                                    <label class="btn btn-outline-danger" for="appetite1">1</label>
+                                                    
+                                                    <input type="radio" name="appetite" id="appetite2" value="2" class="btn-check">
+                                                    <label class="btn btn-outline-warning" for="appetite2">2</label>
+                                                    
+                                                    <input type="radio" name="appetite" id="appetite3" value="3" class="btn-check">
+                                                    <label class="btn btn-outline-secondary" for="appetite3">3</label>
+                                                    
+                                                    <input type="radio" name="appetite" id="appetite4" value="4" class="btn-check">
+                                                    <label class="btn btn-outline-info" for="appetite4">4</label>
+                                                    
+                                                    <input type="radio" name="appetite" id="appetite5" value="5" class="btn-check">
+                                                    <label class="btn btn-outline-success" for="appetite5">5</label>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 6: Water Intake -->
+                                    <div class="question-card mb-4" data-question="6">
+                                        <div class="question-header">
+                                            <span class="question-number">6</span>
+                                            <h6 class="question-title">צריכת מים</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="input-group">
+                                                <input type="number" class="form-control" id="waterIntake" 
+                                                       step="0.1" min="0" max="10" 
+                                                       placeholder="כמות" required>
+                                                <select class="form-select" id="waterUnit" style="max-width: 120px;">
+                                                    <option value="liters">ליטרים</option>
+                                                    <option value="cups">כוסות</option>
+                                                    <option value="bottles">בקבוקים</option>
+                                                </select>
+                                            </div>
+                                            <small class="form-text text-muted">המלצה: 2.5-3 ליטרים ליום</small>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 7: Supplements -->
+                                    <div class="question-card mb-4" data-question="7">
+                                        <div class="question-header">
+                                            <span class="question-number">7</span>
+                                            <h6 class="question-title">תוספי תזונה</h6>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="checkbox-group">
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl1" value="magnesium">
+                                                    <label class="form-check-label" for="suppl1">מגנזיום</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl2" value="iron">
+                                                    <label class="form-check-label" for="suppl2">ברזל</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl3" value="omega3">
+                                                    <label class="form-check-label" for="suppl3">אומגה 3</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl4" value="creatine">
+                                                    <label class="form-check-label" for="suppl4">קריאטין</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl5" value="beta-alanine">
+                                                    <label class="form-check-label" for="suppl5">בטא אלאנין</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl6" value="folic-acid">
+                                                    <label class="form-check-label" for="suppl6">חומצה פולית</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl7" value="gainer">
+                                                    <label class="form-check-label" for="suppl7">גיינר</label>
+                                                </div>
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="suppl8" value="other">
+                                                    <label class="form-check-label" for="suppl8">אחר</label>
+                                                </div>
+                                                <div class="other-supplement" id="otherSupplementDiv" style="display: none;">
+                                                    <input type="text" class="form-control mt-2" id="otherSupplement" placeholder="פרט איזה תוסף תזונה">
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 8: Menstrual Cycle (Women only - Monthly) -->
+                                    <div class="question-card mb-4" data-question="8" id="menstrualQuestion" style="display: none;">
+                                        <div class="question-header">
+                                            <span class="question-number">8</span>
+                                            <h6 class="question-title">מחזור חודשי</h6>
+                                            <small class="text-muted">(לנשים בלבד - פעם בחודש)</small>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="form-check mb-3">
+                                                <input class="form-check-input" type="checkbox" id="applicableToMe">
+                                                <label class="form-check-label" for="applicableToMe">רלוונטי עבורי</label>
+                                            </div>
+                                            <div class="menstrual-options" id="menstrualOptions" style="display: none;">
+                                                <div class="mb-3">
+                                                    <label class="form-label fw-bold">סטטוס המחזור</label>
+                                                    <div class="radio-group">
+                                                        <div class="form-check">
+                                                            <input class="form-check-input" type="radio" name="menstrualCycle" id="cycle1" value="regular">
+                                                            <label class="form-check-label" for="cycle1">סדיר</label>
+                                                        </div>
+                                                        <div class="form-check">
+                                                            <input class="form-check-input" type="radio" name="menstrualCycle" id="cycle2" value="irregular">
+                                                            <label class="form-check-label" for="cycle2">לא סדיר</label>
+                                                        </div>
+                                                    </div>
+                                                </div>
+                                                <div class="mb-3">
+                                                    <label class="form-label">תאריך וסת אחרון <small class="text-muted">(אופציונלי)</small></label>
+                                                    <input type="date" class="form-control" id="lastPeriodDate">
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 9: Health Issues -->
+                                    <div class="question-card mb-4" data-question="9">
+                                        <div class="question-header">
+                                            <span class="question-number">9</span>
+                                            <h6 class="question-title">האם נוצלת ממצבים הבאים?</h6>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="checkbox-group">
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health1" value="injury">
+                                                    <label class="form-check-label" for="health1">פציעות</label>
+                                                </div>
+                                                <div class="health-detail" id="injuryDetail" style="display: none;">
+                                                    <textarea class="form-control mt-2" rows="2" placeholder="פרט על הפציעה, מיקום וחומרה"></textarea>
+                                                </div>
+                                                
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health2" value="stomach-pain">
+                                                    <label class="form-check-label" for="health2">כאבי בטן</label>
+                                                </div>
+                                                
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health3" value="muscle-pain">
+                                                    <label class="form-check-label" for="health3">כאבי שרירים</label>
+                                                </div>
+                                                
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health4" value="constipation">
+                                                    <label class="form-check-label" for="health4">עצירות</label>
+                                                </div>
+                                                
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health5" value="diarrhea">
+                                                    <label class="form-check-label" for="health5">שלשול</label>
+                                                </div>
+                                                
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health6" value="headaches">
+                                                    <label class="form-check-label" for="health6">כאבי ראש</label>
+                                                </div>
+                                                
+                                                <div class="form-check">
+                                                    <input class="form-check-input" type="checkbox" id="health7" value="other">
+                                                    <label class="form-check-label" for="health7">אחר</label>
+                                                </div>
+                                                <div class="health-detail" id="otherHealthDetail" style="display: none;">
+                                                    <textarea class="form-control mt-2" rows="2" placeholder="פרט על המצב הרפואי"></textarea>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 10: Mood -->
+                                    <div class="question-card mb-4" data-question="10">
+                                        <div class="question-header">
+                                            <span class="question-number">10</span>
+                                            <h6 class="question-title">מצב רוח</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="rating-scale">
+                                                <div class="scale-labels">
+                                                    <span>מדוכא</span>
+                                                    <span>מצוין</span>
+                                                </div>
+                                                <div class="scale-buttons">
+                                                    <input type="radio" name="mood" id="mood1" value="1" class="btn-check">
+                                                    <label class="btn btn-outline-danger" for="mood1">1</label>
+                                                    
+                                                    <input type="radio" name="mood" id="mood2" value="2" class="btn-check">
+                                                    <label class="btn btn-outline-warning" for="mood2">2</label>
+                                                    
+                                                    <input type="radio" name="mood" id="mood3" value="3" class="btn-check">
+                                                    <label class="btn btn-outline-secondary" for="mood3">3</label>
+                                                    
+                                                    <input type="radio" name="mood" id="mood4" value="4" class="btn-check">
+                                                    <label class="btn btn-outline-info" for="mood4">4</label>
+                                                    
+                                                    <input type="radio" name="mood" id="mood5" value="5" class="btn-check">
+                                                    <label class="btn btn-outline-success" for="mood5">5</label>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 11: Energy Level -->
+                                    <div class="question-card mb-4" data-question="11">
+                                        <div class="question-header">
+                                            <span class="question-number">11</span>
+                                            <h6 class="question-title">רמת אנרגיה</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="rating-scale">
+                                                <div class="scale-labels">
+                                                    <span>אין אנרגיה</span>
+                                                    <span>מלא אנרגיה</span>
+                                                </div>
+                                                <div class="scale-buttons">
+                                                    <input type="radio" name="energy" id="energy1" value="1" class="btn-check">
+                                                    <label class="btn btn-outline-danger" for="energy1">1</label>
+                                                    
+                                                    <input type="radio" name="energy" id="energy2" value="2" class="btn-check">
+                                                    <label class="btn btn-outline-warning" for="energy2">2</label>
+                                                    
+                                                    <input type="radio" name="energy" id="energy3" value="3" class="btn-check">
+                                                    <label class="btn btn-outline-secondary" for="energy3">3</label>
+                                                    
+                                                    <input type="radio" name="energy" id="energy4" value="4" class="btn-check">
+                                                    <label class="btn btn-outline-info" for="energy4">4</label>
+                                                    
+                                                    <input type="radio" name="energy" id="energy5" value="5" class="btn-check">
+                                                    <label class="btn btn-outline-success" for="energy5">5</label>
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 12: Recovery After Training -->
+                                    <div class="question-card mb-4" data-question="12">
+                                        <div class="question-header">
+                                            <span class="question-number">12</span>
+                                            <h6 class="question-title">התאוששות אחרי אימונים</h6>
+                                            <span class="required-indicator">*</span>
+                                        </div>
+                                        <div class="question-content">
+                                            <div class="rating-scale recovery-scale">
+                                                <div class="scale-labels">
+                                                    <span>התאוששות גרועה</span>
+                                                    <span>התאוששות מושלמת</span>
+                                                </div>
+                                                <div class="scale-buttons wide-scale">
+                                                    ${Array.from({length: 10}, (_, i) => `
+                                                        <input type="radio" name="recovery" id="recovery${i+1}" value="${i+1}" class="btn-check">
+                                                        <label class="btn btn-outline-primary btn-sm" for="recovery${i+1}">${i+1}</label>
+                                                    `).join('')}
+                                                </div>
+                                            </div>
+                                        </div>
+                                    </div>
+
+                                    <!-- Question 13: Additional Notes -->
+                                    <div class="question-card mb-4" data-question="13">
+                                        <div class="question-header">
+                                            <span class="question-number">13</span>
+                                            <h6 class="question-title">הערות נוספות</h6>
+                                            <small class="text-muted">(אופציונלי)</small>
+                                        </div>
+                                        <div class="question-content">
+                                            <textarea class="form-control" id="additionalNotes" rows="4" 
+                                                      placeholder="כל מידע נוסף שתרצה לשתף עם התזונאית - תחושות, שינויים, שאלות..."></textarea>
+                                            <small class="form-text text-muted">עד 500 תווים</small>
+                                        </div>
+                                    </div>
+                                </div>
+
+                                <div class="form-actions mt-4">
+                                    <div class="row">
+                                        <div class="col-md-4">
+                                            <button type="button" class="btn btn-outline-secondary w-100" id="saveDraftBtn">
+                                                <i class="fas fa-save me-2"></i>
+                                                שמור טיוטה
+                                            </button>
+                                        </div>
+                                        <div class="col-md-8">
+                                            <button type="button" class="btn btn-success w-100" id="sendToNutritionistBtn">
+                                                <i class="fas fa-user-md me-2"></i>
+                                                שלח לתזונאי/ת
+                                            </button>
+                                        </div>
+                                    </div>
+                                </div>
+                            </form>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+export { getAssessmentContent, setupQuestionnaireHandlers };
@@ -0,0 +1,598 @@
+// Athlete chat tab - loaded on demand by athlete.js
+
+/**
+ * Get chat tab content
+ */
+function getChatContent() {
+    return `
+        <div class="chat-interface">
+            <div class="chat-header">
+                <div class="nutritionist-info">
+                    <div class="nutritionist-avatar">
+                        <i class="fas fa-user-md"></i>
+                        <span class="status-indicator" id="statusIndicator"></span>
+                    </div>
+                    <div class="nutritionist-details">
+                        <h5 class="mb-1">צ'אט עם ד"ר שרה כהן (תזונאית)</h5>
+                        <p class="status-text mb-0" id="statusText">
+                            <i class="fas fa-circle status-dot" id="statusDot"></i>
+                            <span id="statusMessage">זמינה</span>
+                            <small class="working-hours">• א-ה 8:00-18:00</small>
+                        </p>
+                    </div>
+                </div>
+                <div class="chat-actions">
+                    <button class="btn btn-outline-light btn-sm me-2" onclick="showQuickMessages()">
+                        <i class="fas fa-bolt me-1"></i>
+                        הודעות מהירות
+                    </button>
+                    <button class="btn btn-outline-light btn-sm" onclick="athleteInterface.clearChat()">
+                        <i class="fas fa-trash me-1"></i>
+                        נקה
+                    </button>
+                </div>
+            </div>
+            
+            <div class="chat-messages" id="chatMessages">
+                <!-- Messages will be loaded here -->
+            </div>
+            
+            <div class="typing-indicator" id="typingIndicator" style="display: none;">
+                <div class="typing-dots">
+                    <span></span>
+                    <span></span>
+                    <span></span>
+                </div>
+                <span class="typing-text">התזונאית מקלידה...</span>
+            </div>
+            
+            <!-- Quick Messages Panel -->
+            <div class="quick-messages-panel" id="quickMessagesPanel" style="display: none;">
+                <div class="quick-messages-header">
+                    <h6>הודעות מהירות</h6>
+                    <button class="btn-close" onclick="hideQuickMessages()"></button>
+                </div>
+                <div class="quick-messages-grid" id="quickMessagesGrid">
+                    <!-- Will be populated dynamically -->
+                </div>
+            </div>
+
+            <div class="chat-input-area">
+                <div class="input-group">
+                    <button class="btn btn-outline-secondary" type="button" onclick="showImageUpload()">
+                        <i class="fas fa-camera"></i>
+                    </button>
+                    <input type="text" id="chatInput" class="form-control" placeholder="הקלד הודעה לתזונאית..." aria-label="הודעה">
+                    <button class="btn btn-primary" type="button" id="sendButton">
+                        <i class="fas fa-paper-plane"></i>
+                    </button>
+                </div>
+                <div class="input-info d-flex justify-content-between">
+                    <small class="text-muted">
+                        <i class="fas fa-info-circle me-1"></i>
+                        לחץ Enter לשליחה מהירה
+                    </small>
+                    <small class="text-muted" id="messageStatus">
+                        <!-- Message status will appear here -->
+                    </small>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+// Enhanced Chat System Functions
+let isTyping = false;
+let typingTimeout = null;
+let chatInterval = null;
+let nutritionistStatus = {
+    online: true,
+    status: 'זמינה',
+    lastSeen: new Date().toISOString(),
+    workingHours: 'א-ה 8:00-18:00'
+};
+
+// Quick message templates
+const quickMessages = [
+    'איך אני במסלול?',
+    'יש לי שאלה על התזונה',
+    'דיווח על בעיה',
+    'בקשה לשיחה',
+    'מה לאכול לפני האימון?',
+    'איך אני בהכנות לתחרות?'
+];
+
+// Message status types
+const MESSAGE_STATUS = {
+    SENT: 'sent',
+    DELIVERED: 'delivered', 
+    READ: 'read'
+};
+
+/**
+ * Initialize enhanced chat features
+ */
+function initializeChatFeatures() {
+    updateNutritionistStatus();
+    loadChatMessages();
+    setupChatEventListeners();
+    initializeQuickMessages();
+    startStatusUpdates();
+    console.log('Enhanced chat system initialized');
+}
+
+/**
+ * Setup chat event listeners
+ */
+function setupChatEventListeners() {
+    const chatInput = document.getElementById('chatInput');
+    const sendButton = document.getElementById('sendButton');
+    
+    if (chatInput && sendButton) {
+        // Send button click
+        sendButton.addEventListener('click', sendMessage);
+        
+        // Enter key to send
+        chatInput.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') {
+                e.preventDefault();
+                sendMessage();
+            }
+        });
+        
+        // Typing indicator
+        chatInput.addEventListener('input', handleTyping);
+    }
+}
+
+/**
+ * Load enhanced chat messages from localStorage
+ */
+function loadChatMessages() {
+    const chatMessages = document.getElementById('chatMessages');
+    if (!chatMessages) return;
+    
+    // Get stored messages with enhanced structure
+    const messages = JSON.parse(localStorage.getItem(`chat_messages_${ATHLETE_ID}`) || '[]');
+    
+    // If no messages, add welcome message
+    if (messages.length === 0) {
+        const welcomeMessages = [
+            {
+                id: Date.now(),
+                from: 'nutritionist',
+                content: 'שלום דני! ברוך הבא למערכת המעקב התזונתי המתקדמת 🌟',
+                timestamp: new Date().toISOString(),
+                time: getCurrentTimeString(),
+                status: MESSAGE_STATUS.READ,
+                urgent: false
+            },
+            {
+                id: Date.now() + 1,
+                from: 'nutritionist', 
+                content: 'אני כאן כדי לעזור לך להגיע ליעדים שלך. איך אתה מרגיש היום? יש משהו ספציפי שתרצה לדון עליו?',
+                timestamp: new Date().toISOString(),
+                time: getCurrentTimeString(),
+                status: MESSAGE_STATUS.READ,
+                urgent: false
+            }
+        ];
+        
+        localStorage.setItem(`chat_messages_${ATHLETE_ID}`, JSON.stringify(welcomeMessages));
+        renderMessages(welcomeMessages);
+    } else {
+        renderMessages(messages);
+        markMessagesAsRead();
+    }
+}
+
+/**
+ * Render messages in chat
+ */
+function renderMessages(messages) {
+    const chatMessages = document.getElementById('chatMessages');
+    if (!chatMessages) return;
+    
+    chatMessages.innerHTML = messages.map(msg => createMessageHTML(msg)).join('');
+    scrollToBottom();
+}
+
+/**
+ * Create HTML for an enhanced message
+ */
+function createMessageHTML(message) {
+    const isNutritionist = message.from === 'nutritionist';
+    const statusIcon = getMessageStatusIcon(message.status || MESSAGE_STATUS.DELIVERED);
+    const urgentClass = message.urgent ? 'urgent-message' : '';
+    
+    return `
+        <div class="message ${isNutritionist ? 'nutritionist-message' : 'athlete-message'} ${urgentClass}" data-id="${message.id}">
+            <div class="message-bubble">
+                ${message.urgent && isNutritionist ? '<div class="urgent-badge"><i class="fas fa-exclamation-triangle"></i> דחוף</div>' : ''}
+                <div class="message-content">
+                    <p>${message.content}</p>
+                </div>
+                <div class="message-footer">
+                    <span class="message-time">${message.time}</span>
+                    ${!isNutritionist ? `<span class="message-status">${statusIcon}</span>` : ''}
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+/**
+ * Send enhanced message
+ */
+function sendMessage(messageText = null, isQuickMessage = false) {
+    const chatInput = document.getElementById('chatInput');
+    const text = messageText || chatInput.value.trim();
+    
+    if (!text) return;
+    
+    // Create new message with enhanced structure
+    const newMessage = {
+        id: Date.now(),
+        from: 'athlete',
+        content: text,
+        timestamp: new Date().toISOString(),
+        time: getCurrentTimeString(),
+        status: MESSAGE_STATUS.SENT,
+        urgent: false
+    };
+    
+    // Add to storage
+    const messages = JSON.parse(localStorage.getItem(`chat_messages_${ATHLETE_ID}`) || '[]');
+    messages.push(newMessage);
+    localStorage.setItem(`chat_messages_${ATHLETE_ID}`, JSON.stringify(messages));
+    
+    // Add to UI
+    const chatMessages = document.getElementById('chatMessages');
+    if (chatMessages) {
+        chatMessages.insertAdjacentHTML('beforeend', createMessageHTML(newMessage));
+    }
+    
+    // Clear input if not quick message
+    if (!isQuickMessage) {
+        chatInput.value = '';
+    }
+    
+    // Hide quick messages panel
+    hideQuickMessages();
+    
+    // Update message status
+    updateMessageStatus(newMessage.id, MESSAGE_STATUS.DELIVERED);
+    scrollToBottom();
+    
+    // Show message status
+    showMessageStatus('נשלח ✓');
+    
+    // Trigger nutritionist response
+    setTimeout(() => triggerNutritionistResponse(text), 1500 + Math.random() * 2000);
+}
+
+/**
+ * Trigger enhanced nutritionist response
+ */
+function triggerNutritionistResponse(userMessage = '') {
+    if (typeof userMessage !== 'string') {
+        userMessage = String(userMessage || '');
+    }
+    const responses = getSmartResponse(userMessage);
+    const isUrgent = checkForUrgentKeywords(userMessage);
+    
+    // Show typing indicator
+    showTypingIndicator();
+    
+    setTimeout(() => {
+        hideTypingIndicator();
+        
+        const responseMessage = {
+            id: Date.now(),
+            from: 'nutritionist',
+            content: responses.message,
+            timestamp: new Date().toISOString(),
+            time: getCurrentTimeString(),
+            status: MESSAGE_STATUS.DELIVERED,
+            urgent: isUrgent
+        };
+        
+        // Add to storage
+        const messages = JSON.parse(localStorage.getItem(`chat_messages_${ATHLETE_ID}`) || '[]');
+        messages.push(responseMessage);
+        localStorage.setItem(`chat_messages_${ATHLETE_ID}`, JSON.stringify(messages));
+        
+        // Add to UI
+        const chatMessages = document.getElementById('chatMessages');
+        if (chatMessages) {
+            chatMessages.insertAdjacentHTML('beforeend', createMessageHTML(responseMessage));
+        }
+        scrollToBottom();
+        
+        // Mark messages as read after delay
+        setTimeout(() => markMessagesAsRead(), 3000);
+        
+    }, 2000 + Math.random() * 1500);
+}
+
+/**
+ * Handle typing indicator
+ */
+function handleTyping() {
+    if (typingTimeout) {
+        clearTimeout(typingTimeout);
+    }
+    
+    if (!isTyping) {
+        isTyping = true;
+        // Could send typing status to server here
+    }
+    
+    typingTimeout = setTimeout(() => {
+        isTyping = false;
+        // Could send stop typing status to server here
+    }, 1000);
+}
+
+/**
+ * Show typing indicator
+ */
+function showTypingIndicator() {
+    const indicator = document.getElementById('typingIndicator');
+    if (indicator) {
+        indicator.style.display = 'flex';
+        scrollToBottom();
+    }
+}
+
+/**
+ * Hide typing indicator  
+ */
+function hideTypingIndicator() {
+    const indicator = document.getElementById('typingIndicator');
+    if (indicator) {
+        indicator.style.display = 'none';
+    }
+}
+
+/**
+ * Clear chat messages
+ */
+function clearChat() {
+    if (confirm('האם אתה בטוח שברצונך למחוק את כל ההודעות?')) {
+        localStorage.removeItem(`chat_messages_${ATHLETE_ID}`);
+        localStorage.removeItem(`chat_last_read_${ATHLETE_ID}`);
+        loadChatMessages();
+    }
+}
+
+/**
+ * Scroll to bottom of chat
+ */
+function scrollToBottom() {
+    const chatMessages = document.getElementById('chatMessages');
+    if (chatMessages) {
+        setTimeout(() => {
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        }, 100);
+    }
+}
+
+/**
+ * Get current time string
+ */
+function getCurrentTimeString() {
+    return new Date().toLocaleTimeString('he-IL', { 
+        hour: '2-digit', 
+        minute: '2-digit',
+        timeZone: 'Asia/Jerusalem'
+    });
+}
+
+/**
+ * Update nutritionist status display
+ */
+function updateNutritionistStatus() {
+    const statusIndicator = document.getElementById('statusIndicator');
+    const statusDot = document.getElementById('statusDot');
+    const statusMessage = document.getElementById('statusMessage');
+    
+    if (statusIndicator && statusDot && statusMessage) {
+        const isOnline = nutritionistStatus.online;
+        statusIndicator.className = `status-indicator ${isOnline ? 'online' : 'offline'}`;
+        statusDot.className = `fas fa-circle status-dot ${isOnline ? 'online' : 'offline'}`;
+        statusMessage.textContent = isOnline ? nutritionistStatus.status : 'לא זמינה';
+    }
+}
+
+/**
+ * Initialize quick messages
+ */
+function initializeQuickMessages() {
+    const grid = document.getElementById('quickMessagesGrid');
+    if (grid) {
+        grid.innerHTML = quickMessages.map(msg => 
+            `<button class="quick-message-btn" onclick="sendMessage('${msg}', true)">${msg}</button>`
+        ).join('');
+    }
+}
+
+/**
+ * Show quick messages panel
+ */
+function showQuickMessages() {
+    const panel = document.getElementById('quickMessagesPanel');
+    if (panel) {
+        panel.style.display = 'block';
+        panel.classList.add('slide-in');
+    }
+}
+
+/**
+ * Hide quick messages panel
+ */
+function hideQuickMessages() {
+    const panel = document.getElementById('quickMessagesPanel');
+    if (panel) {
+        panel.style.display = 'none';
+        panel.classList.remove('slide-in');
+    }
+}
+
+/**
+ * Get smart response based on user message
+ */
+function getSmartResponse(userMessage) {
+    const lowerMsg = userMessage.toLowerCase();
+    
+    if (lowerMsg.includes('בעיה') || lowerMsg.includes('כאב') || lowerMsg.includes('לא טוב')) {
+        return {
+            message: 'מצטערת לשמוע שיש בעיה. אנא פרט יותר על מה שאתה חווה, וננסה למצוא פתרון מתאים 🩺',
+            urgent: true
+        };
+    }
+    
+    if (lowerMsg.includes('תזונה') || lowerMsg.includes('אוכל') || lowerMsg.includes('ארוחה')) {
+        return {
+            message: 'בוודאי! אני כאן לעזור עם כל נושא הקשור לתזונה. מה בדיוק מעניין אותך? 🥗'
+        };
+    }
+    
+    if (lowerMsg.includes('משקל') || lowerMsg.includes('שקילה')) {
+        return {
+            message: 'נהדר שאתה עוקב אחרי המשקל! איך אתה מרגיש עם השינויים? יש משהו שמעניין אותך? ⚖️'
+        };
+    }
+    
+    if (lowerMsg.includes('תחרות') || lowerMsg.includes('הכנות')) {
+        return {
+            message: 'מעולה! איך מתקדמות ההכנות? האם יש משהו ספציפי שנצטרך להתאים בתזונה? 🥇'
+        };
+    }
+    
+    const generalResponses = [
+        'תודה על העדכון! אני כאן אם יש עוד שאלות 👍',
+        'מצוין! אתה עושה עבודה נהדרת 🌟',
+        'המשך כך! אני רואה התקדמות יפה 💪',
+        'אם יש לך עוד שאלות, אני כאן לעזור 😊',
+        'נשמע טוב! איך אתה מרגיש באופן כללי?',
+    ];
+    
+    return {
+        message: generalResponses[Math.floor(Math.random() * generalResponses.length)]
+    };
+}
+
+/**
+ * Check for urgent keywords
+ */
+function checkForUrgentKeywords(message) {
+    const urgentKeywords = ['בעיה', 'כאב', 'חרב', 'דחוף', 'עזרה', 'רע', 'לא טוב', 'בהול'];
+    return urgentKeywords.some(keyword => message.toLowerCase().includes(keyword));
+}
+
+/**
+ * Get message status icon
+ */
+function getMessageStatusIcon(status) {
+    switch(status) {
+        case MESSAGE_STATUS.SENT:
+            return '✓';
+        case MESSAGE_STATUS.DELIVERED:
+            return '✓✓';
+        case MESSAGE_STATUS.READ:
+            return '✓✓';
+        default:
+            return '';
+    }
+}
+
+/**
+ * Update message status
+ */
+function updateMessageStatus(messageId, newStatus) {
+    setTimeout(() => {
+        const messageElement = document.querySelector(`[data-id="${messageId}"] .message-status`);
+        if (messageElement) {
+            messageElement.innerHTML = getMessageStatusIcon(newStatus);
+            
+            // Update in storage
+            const messages = JSON.parse(localStorage.getItem(`chat_messages_${ATHLETE_ID}`) || '[]');
+            const message = messages.find(m => m.id === messageId);
+            if (message) {
+                message.status = newStatus;
+                localStorage.setItem(`chat_messages_${ATHLETE_ID}`, JSON.stringify(messages));
+            }
+        }
+    }, 1000);
+}
+
+/**
+ * Show message status in input area
+ */
+function showMessageStatus(status) {
+    const statusElement = document.getElementById('messageStatus');
+    if (statusElement) {
+        statusElement.textContent = status;
+        setTimeout(() => {
+            statusElement.textContent = '';
+        }, 3000);
+    }
+}
+
+/**
+ * Mark messages as read: store the id of the last nutritionist message read
+ * (a watermark) instead of rewriting the whole stored conversation
+ */
+function markMessagesAsRead() {
+    const messages = JSON.parse(localStorage.getItem(`chat_messages_${ATHLETE_ID}`) || '[]');
+    const received = messages.filter(message => message.from === 'nutritionist');
+    if (received.length) {
+        localStorage.setItem(`chat_last_read_${ATHLETE_ID}`, String(received[received.length - 1].id));
+    }
+}
+
+/**
+ * Start status updates
+ */
+function startStatusUpdates() {
+    // Update status every minute
+    chatInterval = setInterval(() => {
+        const now = new Date();
+        const hour = now.getHours();
+        
+        // Simulate working hours (8-18)
+        nutritionistStatus.online = hour >= 8 && hour < 18;
+        nutritionistStatus.status = nutritionistStatus.online ? 
+            (Math.random() > 0.8 ? 'עסוקה' : 'זמינה') : 'לא זמינה';
+        
+        updateNutritionistStatus();
+    }, 60000);
+}
+
+/**
+ * Show image upload dialog
+ */
+function showImageUpload() {
+    const input = document.createElement('input');
+    input.type = 'file';
+    input.accept = 'image/*';
+    input.onchange = function(e) {
+        const file = e.target.files[0];
+        if (file) {
+            // Simulate image upload
+            const imageMessage = `📸 התמונה נשלחה: ${file.name}`;
+            sendMessage(imageMessage, false);
+        }
+    };
+    input.click();
+}
+
+// Global functions for chat (used by inline onclick handlers)
+window.athleteInterface.clearChat = clearChat;
+window.showQuickMessages = showQuickMessages;
+window.hideQuickMessages = hideQuickMessages;
+window.showImageUpload = showImageUpload;
+window.sendMessage = sendMessage;
+
+export { getChatContent, initializeChatFeatures };
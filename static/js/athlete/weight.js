@@ -0,0 +1,683 @@
+// Athlete weight tab - loaded on demand by athlete.js
+// Chart.js is only fetched once the weight chart is first drawn
+
+const CHART_JS_URL = 'https://cdn.jsdelivr.net/npm/chart.js';
+let chartLibraryPromise = null;
+
+// Weigh-ins are stored on the server (/api/weight). localStorage only keeps
+// the last loaded series (for offline display) and a queue of entries that
+// were saved while offline; the queue is flushed in batches to /api/weight/sync.
+// Entries never change once written and are keyed by (date, ts), so merging
+// server and local lists is a plain union.
+const WEIGHT_CACHE_KEY = `weights_${ATHLETE_ID}`;
+const WEIGHT_QUEUE_KEY = `weight_queue_${ATHLETE_ID}`;
+const WEIGHT_SYNC_BATCH_SIZE = 100;
+let weightEntries = null;
+let weightSyncInFlight = null;
+let weightChartDays = 14;
+
+/**
+ * Get weight tab content - Advanced interface
+ */
+function getWeightContent() {
+    // Load the advanced weight tracking interface via AJAX
+    loadAdvancedWeightInterface();
+    
+    return `
+        <div id="advancedWeightContainer">
+            <div class="text-center py-5">
+                <div class="spinner-border text-primary" role="status">
+                    <span class="visually-hidden">טוען...</span>
+                </div>
+                <p class="mt-3 text-muted">טוען מעקב משקל מתקדם...</p>
+            </div>
+        </div>
+    `;
+}
+
+/**
+ * Load advanced weight tracking interface
+ */
+function loadAdvancedWeightInterface() {
+    setTimeout(() => {
+        const container = document.getElementById('advancedWeightContainer');
+        if (!container) return;
+        
+        container.innerHTML = `
+            <div class="weight-tracking-container">
+                <!-- Header -->
+                <div class="d-flex justify-content-between align-items-center mb-4">
+                    <div>
+                        <h2 class="h4 fw-bold text-primary mb-1">מעקב משקל</h2>
+                        <p class="text-muted small mb-0">עדכון יומי למעקב אחר ההתקדמות</p>
+                    </div>
+                    <div class="text-end">
+                        <div class="fw-bold text-primary fs-5" id="currentWeight">68.5 ק"ג</div>
+                        <small class="text-muted">משקל נוכחי</small>
+                    </div>
+                </div>
+
+                <!-- Weight Input Section -->
+                <div class="card shadow-sm mb-4">
+                    <div class="card-header bg-primary text-white">
+                        <h6 class="mb-0">
+                            <i class="fas fa-weight me-2"></i>
+                            רישום משקל חדש
+                        </h6>
+                    </div>
+                    <div class="card-body">
+                        <form id="advancedWeightForm">
+                            <!-- Weight Input -->
+                            <div class="row mb-3">
+                                <div class="col-12">
+                                    <label for="advancedWeightInput" class="form-label fw-semibold">משקל (ק"ג)</label>
+                                    <div class="input-group input-group-lg">
+                                        <input 
+                                            type="number" 
+                                            class="form-control form-control-lg text-center fw-bold" 
+                                            id="advancedWeightInput" 
+                                            inputmode="decimal"
+                                            step="0.1" 
+                                            min="40" 
+                                            max="200"
+                                            placeholder="0.0"
+                                            style="font-size: 2rem; border: 2px solid var(--primary-color); border-radius: 12px;"
+                                            required>
+                                        <span class="input-group-text bg-primary text-white">ק"ג</span>
+                                    </div>
+                                </div>
+                            </div>
+
+                            <!-- Measurement Time -->
+                            <div class="row mb-3">
+                                <div class="col-12">
+                                    <label class="form-label fw-semibold">זמן שקילה</label>
+                                    <div class="btn-group-vertical d-grid gap-1" role="group">
+                                        <input type="radio" class="btn-check" name="measurementTime" id="morning" value="בוקר" required>
+                                        <label class="btn btn-outline-primary text-start" for="morning">
+                                            <i class="fas fa-sun me-2"></i>בוקר
+                                        </label>
+                                        
+                                        <input type="radio" class="btn-check" name="measurementTime" id="evening" value="ערב" required>
+                                        <label class="btn btn-outline-primary text-start" for="evening">
+                                            <i class="fas fa-moon me-2"></i>ערב
+                                        </label>
+                                    </div>
+                                </div>
+                            </div>
+
+                            <!-- Notes -->
+                            <div class="row mb-3">
+                                <div class="col-12">
+                                    <label for="weightNotes" class="form-label fw-semibold">הערות (אופציונלי)</label>
+                                    <textarea class="form-control" id="weightNotes" rows="2" placeholder="איך את/ה מרגיש/ה, שינויים, הערות..."></textarea>
+                                </div>
+                            </div>
+
+                            <!-- Submit Button -->
+                            <div class="d-grid">
+                                <button type="submit" class="btn btn-primary btn-lg">
+                                    <i class="fas fa-save me-2"></i>
+                                    שמור משקל
+                                </button>
+                            </div>
+                        </form>
+                    </div>
+                </div>
+
+                <!-- Progress Section -->
+                <div class="card shadow-sm mb-4">
+                    <div class="card-header">
+                        <h6 class="mb-0">
+                            <i class="fas fa-bullseye me-2"></i>
+                            התקדמות ליעד
+                        </h6>
+                    </div>
+                    <div class="card-body">
+                        <div class="row text-center">
+                            <div class="col-4">
+                                <div class="progress-stat">
+                                    <div class="h5 fw-bold text-primary mb-1">66.0</div>
+                                    <small class="text-muted">יעד</small>
+                                </div>
+                            </div>
+                            <div class="col-4">
+                                <div class="progress-stat">
+                                    <div class="h5 fw-bold text-success mb-1" id="weightDifference">-2.5</div>
+                                    <small class="text-muted">נותר</small>
+                                </div>
+                            </div>
+                            <div class="col-4">
+                                <div class="progress-stat">
+                                    <div class="h5 fw-bold text-info mb-1">75%</div>
+                                    <small class="text-muted">התקדמות</small>
+                                </div>
+                            </div>
+                        </div>
+                        
+                        <!-- Progress Bar -->
+                        <div class="mt-3">
+                            <div class="progress" style="height: 12px;">
+                                <div class="progress-bar bg-success" style="width: 75%"></div>
+                            </div>
+                        </div>
+                        
+                        <!-- Smart Alerts -->
+                        <div id="smartAlerts" class="mt-3">
+                            <div class="alert alert-success alert-dismissible fade show" role="alert">
+                                <i class="fas fa-arrow-down me-2"></i>
+                                כל הכבוד! ירידה במשקל - ממשיכים כך!
+                                <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Chart Section -->
+                <div class="card shadow-sm">
+                    <div class="card-header d-flex justify-content-between align-items-center">
+                        <h6 class="mb-0">
+                            <i class="fas fa-chart-line me-2"></i>
+                            גרף התקדמות - 14 ימים אחרונים
+                        </h6>
+                        <div class="btn-group btn-group-sm">
+                            <button class="btn btn-outline-secondary" onclick="updateWeightChart(7)">7 ימים</button>
+                            <button class="btn btn-primary" onclick="updateWeightChart(14)">14 ימים</button>
+                            <button class="btn btn-outline-secondary" onclick="updateWeightChart(30)">30 ימים</button>
+                        </div>
+                    </div>
+                    <div class="card-body">
+                        <canvas id="athleteWeightChart" width="400" height="200"></canvas>
+                    </div>
+                </div>
+            </div>
+        `;
+        
+        // Initialize the advanced weight tracking
+        initializeAdvancedWeightTracking();
+    }, 500);
+}
+
+/**
+ * Initialize advanced weight tracking functionality
+ */
+let athleteWeightChart;
+
+function initializeAdvancedWeightTracking() {
+    console.log('Advanced weight tracking initialized');
+    
+    setupAdvancedWeightEventListeners();
+    updateWeightProgressDisplay();
+    createAthleteWeightChart();
+    
+    // Refresh from the server, then push anything queued offline
+    loadWeightSeries()
+        .then(() => {
+            updateWeightProgressDisplay();
+            refreshWeightChart();
+            return syncWeightQueue();
+        })
+        .catch(error => {
+            console.warn('Showing cached weights:', error.message);
+            if (getWeightEntries().length === 0) {
+                // Demo data when there is neither a server nor a cache
+                storeWeightEntries(generateSampleWeightData());
+                updateWeightProgressDisplay();
+                refreshWeightChart();
+            }
+        });
+}
+
+/**
+ * Weight entries currently known to the client (parsed once, then kept in memory)
+ */
+function getWeightEntries() {
+    if (!weightEntries) {
+        let cached = JSON.parse(localStorage.getItem(WEIGHT_CACHE_KEY) || '[]');
+        
+        // Entries saved before the server store existed have no ts and were never uploaded
+        const legacy = cached.filter(entry => entry.ts === undefined);
+        if (legacy.length) {
+            legacy.forEach(entry => {
+                const ts = Date.parse(entry.timestamp);
+                entry.ts = Number.isFinite(ts) ? ts : Date.parse(entry.date);
+            });
+            // Without a usable time the server would reject the entry, and with it the whole batch
+            cached = cached.filter(entry => Number.isFinite(entry.ts));
+            storeQueuedWeightEntries(getQueuedWeightEntries().concat(legacy.filter(entry => Number.isFinite(entry.ts))));
+            // Written back with ts, so the next page load does not queue them again
+            storeWeightEntries(cached);
+        }
+        
+        weightEntries = mergeWeightEntries(cached, getQueuedWeightEntries());
+    }
+    return weightEntries;
+}
+
+function getQueuedWeightEntries() {
+    return JSON.parse(localStorage.getItem(WEIGHT_QUEUE_KEY) || '[]');
+}
+
+function storeQueuedWeightEntries(queue) {
+    localStorage.setItem(WEIGHT_QUEUE_KEY, JSON.stringify(mergeWeightEntries(queue)));
+}
+
+function storeWeightEntries(entries) {
+    weightEntries = entries;
+    localStorage.setItem(WEIGHT_CACHE_KEY, JSON.stringify(entries));
+}
+
+function weightEntryKey(entry) {
+    return `${entry.date}|${entry.ts}`;
+}
+
+/**
+ * Union of entry lists, ordered by measurement time
+ */
+function mergeWeightEntries(...lists) {
+    const byKey = new Map();
+    lists.forEach(list => list.forEach(entry => byKey.set(weightEntryKey(entry), entry)));
+    return Array.from(byKey.values()).sort((a, b) => a.ts - b.ts);
+}
+
+/**
+ * Convert the server's column-oriented series into entry objects
+ */
+function seriesToEntries(series) {
+    return series.day.map((day, i) => ({
+        date: day,
+        ts: series.ts[i],
+        weight: series.weight[i],
+        time: series.timing[i],
+        notes: series.notes[i]
+    }));
+}
+
+function loadWeightSeries() {
+    return fetch('/api/weight?format=series', { credentials: 'same-origin' })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            storeWeightEntries(mergeWeightEntries(seriesToEntries(data.series), getQueuedWeightEntries()));
+            return weightEntries;
+        });
+}
+
+function queueWeightEntry(entry) {
+    storeQueuedWeightEntries(getQueuedWeightEntries().concat([entry]));
+    storeWeightEntries(mergeWeightEntries(getWeightEntries(), [entry]));
+    return syncWeightQueue();
+}
+
+/**
+ * Upload queued entries in batches. Resolves true once the queue is empty.
+ */
+function syncWeightQueue() {
+    if (weightSyncInFlight) return weightSyncInFlight;
+    
+    const batch = getQueuedWeightEntries().slice(0, WEIGHT_SYNC_BATCH_SIZE);
+    if (batch.length === 0) return Promise.resolve(true);
+    if (!navigator.onLine) return Promise.resolve(false);
+    
+    weightSyncInFlight = fetch('/api/weight/sync', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        credentials: 'same-origin',
+        body: JSON.stringify({
+            entries: batch.map(entry => ({
+                day: entry.date,
+                ts: entry.ts,
+                weight: entry.weight,
+                timing: entry.time,
+                notes: entry.notes
+            }))
+        })
+    })
+        .then(response => {
+            if (response.status === 400) {
+                return response.json().then(data => {
+                    if (!Number.isInteger(data.index) || !batch[data.index]) throw new Error(data.error);
+                    // The server rejected one entry: drop it and send the rest again
+                    const rejected = weightEntryKey(batch[data.index]);
+                    console.warn('Weight entry rejected:', data.error, batch[data.index]);
+                    storeQueuedWeightEntries(getQueuedWeightEntries().filter(entry => weightEntryKey(entry) !== rejected));
+                    storeWeightEntries(getWeightEntries().filter(entry => weightEntryKey(entry) !== rejected));
+                    weightSyncInFlight = null;
+                    return syncWeightQueue();
+                });
+            }
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json().then(data => {
+                // Entries queued while the request was in flight stay in the queue
+                const synced = new Set(batch.map(weightEntryKey));
+                const remaining = getQueuedWeightEntries().filter(entry => !synced.has(weightEntryKey(entry)));
+                storeQueuedWeightEntries(remaining);
+                storeWeightEntries(mergeWeightEntries(seriesToEntries(data.series), remaining));
+                weightSyncInFlight = null;
+                return remaining.length ? syncWeightQueue() : true;
+            });
+        })
+        .catch(error => {
+            weightSyncInFlight = null;
+            console.warn('Weight sync deferred:', error.message);
+            return false;
+        });
+    
+    return weightSyncInFlight;
+}
+
+window.addEventListener('online', () => syncWeightQueue());
+
+function setupAdvancedWeightEventListeners() {
+    // Weight form submission
+    const weightForm = document.getElementById('advancedWeightForm');
+    if (weightForm) {
+        weightForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            saveAdvancedWeightEntry();
+        });
+    }
+}
+
+function saveAdvancedWeightEntry() {
+    const weight = parseFloat(document.getElementById('advancedWeightInput').value);
+    const measurementTime = document.querySelector('input[name="measurementTime"]:checked')?.value;
+    const notes = document.getElementById('weightNotes')?.value;
+    
+    if (!weight || !measurementTime) {
+        alert('אנא מלא את כל השדות הנדרשים');
+        return;
+    }
+    
+    const now = new Date();
+    const entry = {
+        weight: weight,
+        time: measurementTime,
+        notes: notes,
+        ts: now.getTime(),
+        date: now.toISOString().split('T')[0]
+    };
+    
+    // Queue locally and sync to the server (kept in the queue while offline)
+    queueWeightEntry(entry);
+    
+    // Reset form
+    document.getElementById('advancedWeightForm').reset();
+    
+    // Update displays
+    updateWeightProgressDisplay();
+    refreshWeightChart();
+    updateHomeScreenWeight(weight);
+    
+    // Show success message
+    showWeightSuccessAlert('המשקל נשמר בהצלחה!');
+}
+
+/**
+ * Update weight display on home screen
+ */
+function updateHomeScreenWeight(newWeight) {
+    // Update current weight in home screen if we're on home tab
+    const currentTab = document.querySelector('[data-tab].active')?.dataset.tab;
+    if (currentTab === 'home') {
+        // Re-render home content to reflect new weight
+        setTimeout(() => {
+            const mainContent = document.querySelector('.athlete-main .container-fluid');
+            if (mainContent) {
+                mainContent.innerHTML = getHomeContentWithWeight(newWeight);
+            }
+        }, 1000); // Small delay to allow for success message
+    }
+}
+
+function updateWeightProgressDisplay() {
+    const weights = getWeightEntries();
+    if (weights.length === 0) return;
+    
+    const latestWeight = weights[weights.length - 1].weight;
+    const targetWeight = 66.0;
+    
+    const currentWeightEl = document.getElementById('currentWeight');
+    if (currentWeightEl) {
+        currentWeightEl.textContent = latestWeight.toFixed(1) + ' ק"ג';
+    }
+    
+    const difference = latestWeight - targetWeight;
+    const differenceEl = document.getElementById('weightDifference');
+    if (differenceEl) {
+        differenceEl.textContent = (difference > 0 ? '+' : '') + difference.toFixed(1);
+        differenceEl.className = `h5 fw-bold mb-1 ${difference > 0 ? 'text-warning' : 'text-success'}`;
+    }
+    
+    // Generate smart alerts
+    generateWeightSmartAlerts(weights, targetWeight);
+}
+
+function generateWeightSmartAlerts(weights, targetWeight) {
+    const alertsContainer = document.getElementById('smartAlerts');
+    if (!alertsContainer || weights.length < 2) return;
+    
+    const latest = weights[weights.length - 1];
+    const previous = weights[weights.length - 2];
+    const change = latest.weight - previous.weight;
+    
+    let alertClass = '';
+    let alertIcon = '';
+    let alertText = '';
+    
+    if (Math.abs(change) > 1.0) {
+        alertClass = 'alert-warning';
+        alertIcon = 'fas fa-exclamation-triangle';
+        alertText = `שים לב: שינוי משמעותי במשקל (${change > 0 ? '+' : ''}${change.toFixed(1)} ק"ג)`;
+    } else if (change > 0.5 && latest.weight > targetWeight) {
+        alertClass = 'alert-danger';
+        alertIcon = 'fas fa-arrow-up';
+        alertText = 'עליה במשקל - כדאי לשקול התאמת התזונה';
+    } else if (change < -0.3) {
+        alertClass = 'alert-success';
+        alertIcon = 'fas fa-arrow-down';
+        alertText = 'כל הכבוד! ירידה במשקל - ממשיכים כך!';
+    }
+    
+    if (alertText) {
+        alertsContainer.innerHTML = `
+            <div class="alert ${alertClass} alert-dismissible fade show" role="alert">
+                <i class="${alertIcon} me-2"></i>
+                ${alertText}
+                <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+            </div>
+        `;
+    }
+}
+
+/**
+ * Load Chart.js once, on first use
+ */
+function loadChartLibrary() {
+    if (window.Chart) {
+        return Promise.resolve(window.Chart);
+    }
+    
+    if (!chartLibraryPromise) {
+        chartLibraryPromise = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = CHART_JS_URL;
+            script.async = true;
+            script.onload = () => resolve(window.Chart);
+            script.onerror = () => {
+                chartLibraryPromise = null;
+                script.remove();
+                reject(new Error('Chart.js failed to load'));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    
+    return chartLibraryPromise;
+}
+
+function createAthleteWeightChart() {
+    const ctx = document.getElementById('athleteWeightChart');
+    if (!ctx) return;
+    
+    loadChartLibrary()
+        .then(() => renderAthleteWeightChart(ctx))
+        .catch(error => console.error('Error loading weight chart:', error));
+}
+
+function renderAthleteWeightChart(ctx) {
+    const chartData = prepareWeightChartData(getWeightEntries(), weightChartDays);
+    
+    athleteWeightChart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: chartData.labels,
+            datasets: [{
+                label: 'משקל (ק"ג)',
+                data: chartData.weights,
+                borderColor: '#0077C8',
+                backgroundColor: 'rgba(0, 119, 200, 0.1)',
+                tension: 0.4,
+                fill: true,
+                pointBackgroundColor: '#0077C8',
+                pointBorderColor: '#0F4C81',
+                pointRadius: 5,
+                pointHoverRadius: 8
+            }, {
+                label: 'יעד',
+                data: chartData.targets,
+                borderColor: '#FFC20E',
+                backgroundColor: 'transparent',
+                borderDash: [5, 5],
+                pointRadius: 0,
+                tension: 0
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: true,
+                    position: 'top'
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: false,
+                    min: 64,
+                    max: 74,
+                    ticks: {
+                        callback: function(value) {
+                            return value.toFixed(1) + ' ק"ג';
+                        }
+                    }
+                }
+            },
+            interaction: {
+                intersect: false,
+                mode: 'index'
+            }
+        }
+    });
+}
+
+function updateWeightChart(days) {
+    if (!athleteWeightChart) return;
+    
+    // Update button states
+    document.querySelectorAll('.btn-group-sm button').forEach(btn => {
+        btn.classList.remove('btn-primary');
+        btn.classList.add('btn-outline-secondary');
+    });
+    
+    event.target.classList.remove('btn-outline-secondary');
+    event.target.classList.add('btn-primary');
+    
+    weightChartDays = days;
+    refreshWeightChart();
+}
+
+function refreshWeightChart() {
+    if (!athleteWeightChart) return;
+    
+    const chartData = prepareWeightChartData(getWeightEntries(), weightChartDays);
+    
+    athleteWeightChart.data.labels = chartData.labels;
+    athleteWeightChart.data.datasets[0].data = chartData.weights;
+    athleteWeightChart.data.datasets[1].data = chartData.targets;
+    athleteWeightChart.update();
+}
+
+function prepareWeightChartData(weights, days) {
+    const now = new Date();
+    const labels = [];
+    const weightData = [];
+    const targets = [];
+    const targetWeight = 66.0;
+    
+    // Last weigh-in of each day
+    const weightByDay = new Map();
+    weights.forEach(w => weightByDay.set(w.date, w.weight));
+    
+    for (let i = days - 1; i >= 0; i--) {
+        const date = new Date(now);
+        date.setDate(date.getDate() - i);
+        const dateStr = date.toISOString().split('T')[0];
+        labels.push(date.toLocaleDateString('he-IL', { month: 'short', day: 'numeric' }));
+        
+        weightData.push(weightByDay.has(dateStr) ? weightByDay.get(dateStr) : null);
+        targets.push(targetWeight);
+    }
+    
+    return { labels, weights: weightData, targets };
+}
+
+function generateSampleWeightData() {
+    const sampleData = [];
+    const now = new Date();
+    let weight = 70.5;
+    
+    for (let i = 13; i >= 0; i--) {
+        const date = new Date(now);
+        date.setDate(date.getDate() - i);
+        
+        weight -= Math.random() * 0.3 + 0.1;
+        
+        sampleData.push({
+            weight: Math.round(weight * 10) / 10,
+            time: 'לפני ארוחת בוקר',
+            notes: '',
+            ts: date.getTime(),
+            date: date.toISOString().split('T')[0]
+        });
+    }
+    
+    return sampleData;
+}
+
+function showWeightSuccessAlert(message) {
+    const alertDiv = document.createElement('div');
+    alertDiv.className = 'alert alert-success alert-dismissible fade show position-fixed';
+    alertDiv.style.cssText = 'top: 20px; right: 20px; z-index: 1050; min-width: 300px;';
+    alertDiv.innerHTML = `
+        <i class="fas fa-check-circle me-2"></i>
+        ${message}
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    `;
+    
+    document.body.appendChild(alertDiv);
+    
+    setTimeout(() => {
+        if (alertDiv.parentNode) {
+            alertDiv.remove();
+        }
+    }, 3000);
+}
+
+// Used by inline onclick handlers in the weight tab markup
+window.updateWeightChart = updateWeightChart;
+
+export { getWeightContent };
@@ -9,6 +9,7 @@ function loadMessages() {
         .then(data => {
             if (data.success) {
                 displayMessages(data.messages);
+                markAsRead(data.messages);
             } else {
                 console.error('שגיאה בטעינת הודעות:', data.error);
             }
@@ -44,6 +45,30 @@ function displayMessages(messages) {
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
 }
 
+// סימון השיחה כנקראה: השרת שומר רק את מזהה ההודעה האחרונה שנקראה
+let lastReadId = 0;
+
+function markAsRead(messages) {
+    const received = messages.filter(message => message.sender_id == other_id);
+    const newestId = Math.max(0, ...received.map(message => message.id));
+    if (newestId <= lastReadId) {
+        return;
+    }
+    lastReadId = newestId;
+    fetch('/api/chat/read', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            user2_id: other_id,
+            last_read_id: newestId
+        })
+    }).catch(error => {
+        console.error('שגיאה בסימון הודעות כנקראו:', error);
+    });
+}
+
 // שליחת הודעה
 function sendMessage() {
     const input = document.getElementById('messageInput');
@@ -0,0 +1,260 @@
+"""
+Structured, non-blocking logging
+
+configure_logging() installs a QueueHandler on the root logger. A
+LogWriter thread drains the queue, formats the records and writes each
+batch with one write() call, so a request only pays for creating a record
+and putting it on a queue, never for stderr or a slow disk. Records are JSON lines (LOG_FORMAT=text gives
+key=value lines) and carry the id of the request that produced them.
+
+init_app(app) gives every request an id (the incoming X-Request-ID, or a
+new one), echoes it in the response, and writes one access record per
+request. It also decides per request whether sampled_debug() records are
+kept: every one when the logger is at DEBUG, otherwise those of a
+LOG_DEBUG_SAMPLE_RATE share of requests. Hot routes can therefore log
+details without paying for it on every request.
+
+Environment:
+    LOG_LEVEL              root level (default INFO)
+    LOG_LEVELS             per-module levels, e.g. "sql_profiler=DEBUG,werkzeug=WARNING"
+    LOG_FORMAT             json (default) or text
+    LOG_DEBUG_SAMPLE_RATE  share of requests with debug details (default 0.01)
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Weight sync stored {inserted} entries")
+    sampled_debug(logger, 'weight entry stored', athlete_id=user_id, day=entry['day'])
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_debug_sampled = contextvars.ContextVar('debug_sampled', default=False)
+_valid_request_id = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+access_logger = logging.getLogger('requests')
+
+_configure_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Runs on the logging thread of the caller: stamps the request id onto the record"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve message and traceback on the caller's thread; formatting happens on the writer
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = dict(getattr(record, 'fields', None) or {})
+        if getattr(record, 'request_id', None):
+            fields['request_id'] = record.request_id
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class LogWriter:
+    """Background thread that drains the record queue and writes it in batches"""
+
+    _STOP = object()
+
+    def __init__(self, records, stream, formatter, max_batch=1024, flush_interval=0.05):
+        self.records = records
+        self.stream = stream
+        self.formatter = formatter
+        self.max_batch = max_batch
+        # Waking up for every record would compete with request threads for the GIL
+        self.flush_interval = flush_interval
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write everything queued so far, then end the thread"""
+        if self._thread is not None:
+            self.records.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.records.get()]
+            if batch[0] is not self._STOP:
+                time.sleep(self.flush_interval)
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception as e:
+                    lines.append(f'log record from {record.name} could not be formatted: {e!r}')
+            if lines:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except (OSError, ValueError):
+                    pass
+            if self._STOP in batch:
+                return
+
+
+def parse_module_levels(spec):
+    """"a=DEBUG,b.c=WARNING" -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, module_levels=None, fmt=None, stream=None, force=False):
+    """
+    Route all records through a queue to a background writer. Only the first
+    call sets things up (every create_app() calls it); later calls return the
+    running writer unless force=True, which replaces it with the new settings.
+    """
+    global _queue_handler, _listener
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    if module_levels is None:
+        module_levels = parse_module_levels(os.environ.get('LOG_LEVELS'))
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'json')
+
+    with _configure_lock:
+        root = logging.getLogger()
+        if _listener is not None and not force:
+            return _listener
+        if _listener is not None:
+            _listener.stop()
+            root.removeHandler(_queue_handler)
+
+        records = queue.SimpleQueue()
+        _queue_handler = _QueueHandler(records)
+        _queue_handler.addFilter(RequestContextFilter())
+        _listener = LogWriter(records, stream or sys.stderr, TextFormatter() if fmt == 'text' else JSONFormatter())
+        _listener.start()
+
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        for name, module_level in module_levels.items():
+            logging.getLogger(name).setLevel(module_level)
+    return _listener
+
+
+def stop_logging():
+    """Flush the queue and stop the writer thread (registered with atexit)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger().removeHandler(_queue_handler)
+
+
+atexit.register(stop_logging)
+
+
+def sampled_debug(logger, msg, **fields):
+    """DEBUG record kept when the logger is at DEBUG or the current request was sampled"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, extra={'fields': fields}, stacklevel=2)
+    elif _debug_sampled.get() and not logger.disabled:
+        caller = sys._getframe(1)
+        logger.handle(logger.makeRecord(logger.name, logging.DEBUG, caller.f_code.co_filename,
+                                        caller.f_lineno, msg, (), None, extra={'fields': fields}))
+
+
+def init_app(app):
+    """Request ids, one access record per request, and per-request debug sampling"""
+    app.config.setdefault('LOG_DEBUG_SAMPLE_RATE', float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01)))
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if _valid_request_id.match(incoming) else uuid.uuid4().hex[:16]
+        g.log_started = time.perf_counter()
+        _request_id.set(g.request_id)
+        _debug_sampled.set(random.random() < current_app.config['LOG_DEBUG_SAMPLE_RATE'])
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id is not None:
+            response.headers['X-Request-ID'] = request_id
+            if access_logger.isEnabledFor(logging.INFO):
+                ms = (time.perf_counter() - g.log_started) * 1000
+                access_logger.info(f"{request.method} {request.path} {response.status_code}", extra={'fields': {
+                    'method': request.method, 'path': request.path, 'status': response.status_code,
+                    'endpoint': request.endpoint, 'ms': round(ms, 2)
+                }})
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc):
+        _request_id.set(None)
+        _debug_sampled.set(False)
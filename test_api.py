@@ -4,12 +4,31 @@ Test script for the forgot_password API route
 Tests the /api/forgot_password endpoint using FlaskClient
 """
 
+import os
 import sys
 import json
-from app import app
+import sqlite3
+import tempfile
+import threading
+import time
+import database
+from mail_outbox import (OutboxSender, SMTPTransport, LocalSMTPServer,
+                         create_outbox_table, enqueue_email, outbox_counts)
+from sample_data import generate_sample_data
+from reset_tokens import (create_reset_tokens_table, create_reset_token, find_reset_token_user,
+                          consume_reset_token, sweep_expired_tokens)
+
+def make_app(config=None):
+    """App on its own temporary database holding the demo user test@example.com"""
+    from app import create_app
+    db_path = os.path.join(tempfile.mkdtemp(), 'judo.db')
+    app = create_app(dict({'DATABASE': db_path}, **(config or {})))
+    database.create_user('test@example.com', 'x', 'athlete')
+    return app
 
 def test_forgot_password_api():
     """Test the forgot_password API endpoint"""
+    app = make_app()
     print("🧪 Testing /api/forgot_password endpoint...")
     print("=" * 50)
     
@@ -72,6 +91,7 @@ def test_forgot_password_api():
 
 def test_reset_password_api():
     """Test the reset_password API endpoint"""
+    app = make_app()
     print("\n\n🔐 Testing /api/reset_password endpoint...")
     print("=" * 50)
     
@@ -115,6 +135,747 @@ def test_reset_password_api():
         else:
             print("❌ Failed to get reset token")
 
+def test_mail_outbox_delivery_and_retry():
+    """Queued mail is delivered in one batch; failures are retried with backoff"""
+    print("\n\n📬 Testing mail outbox...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'outbox.db')
+        conn = sqlite3.connect(db_path)
+        create_outbox_table(conn.cursor())
+        for i in range(3):
+            enqueue_email(conn, f'user{i}@example.com', 'איפוס סיסמה', f'קישור {i}')
+        conn.commit()
+
+        # Mail server down: everything stays pending with a scheduled retry
+        with LocalSMTPServer() as server:
+            closed_port = server.port
+        sender = OutboxSender(db_path, SMTPTransport('127.0.0.1', closed_port, timeout=1))
+        assert sender.process_batch() == 3
+        assert outbox_counts(conn) == {'pending': 3}
+        assert sender.process_batch() == 0  # backoff not elapsed yet
+
+        conn.execute('UPDATE mail_outbox SET next_attempt_at = 0')
+        conn.commit()
+        with LocalSMTPServer() as server:
+            sender.transport = SMTPTransport('127.0.0.1', server.port)
+            assert sender.process_batch() == 3
+            assert sorted(m['message']['To'] for m in server.messages) == \
+                ['user0@example.com', 'user1@example.com', 'user2@example.com']
+            assert server.messages[0]['message'].get_content().strip() == 'קישור 0'
+        assert outbox_counts(conn) == {'sent': 3}
+        conn.close()
+
+def test_mail_outbox_survives_transport_errors():
+    """A transport that raises counts as a failed attempt and does not stop the sender thread"""
+    class BrokenTransport:
+        calls = 0
+
+        def send_batch(self, emails):
+            BrokenTransport.calls += 1
+            raise RuntimeError('template missing')
+
+    class BadResultTransport:
+        def send_batch(self, emails):
+            return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'outbox.db')
+        conn = sqlite3.connect(db_path)
+        create_outbox_table(conn.cursor())
+        enqueue_email(conn, 'user@example.com', 'איפוס סיסמה', 'קישור')
+        conn.commit()
+
+        sender = OutboxSender(db_path, BrokenTransport(), max_attempts=2)
+        assert sender.process_batch() == 1
+        assert outbox_counts(conn) == {'pending': 1}
+        assert conn.execute('SELECT last_error FROM mail_outbox').fetchone()[0] == \
+            'RuntimeError: template missing'
+        conn.execute('UPDATE mail_outbox SET next_attempt_at = 0')
+        conn.commit()
+        assert sender.process_batch() == 1
+        assert outbox_counts(conn) == {'failed': 1}
+
+        # Errors outside the transport call are logged; the thread keeps polling
+        enqueue_email(conn, 'other@example.com', 'שלום', 'גוף')
+        conn.commit()
+        sender = OutboxSender(db_path, BadResultTransport(), poll_interval=0.01)
+        sender.start()
+        time.sleep(0.1)
+        assert sender._thread.is_alive()
+        sender.transport = BrokenTransport()
+        BrokenTransport.calls = 0
+        conn.execute("UPDATE mail_outbox SET next_attempt_at = 0 WHERE status = 'sending'")
+        conn.commit()
+        deadline = time.time() + 5
+        while BrokenTransport.calls == 0 and time.time() < deadline:
+            sender.wake()
+            time.sleep(0.01)
+        sender.stop()
+        assert BrokenTransport.calls >= 1
+        conn.close()
+
+def test_reset_tokens_expire_and_are_single_use():
+    """Reset tokens are stored hashed, used once, and swept after expiry"""
+    conn = sqlite3.connect(':memory:')
+    create_reset_tokens_table(conn.cursor())
+    token = create_reset_token(conn, 7)
+    assert conn.execute('SELECT token_hash FROM reset_tokens').fetchone()[0] != token
+    assert find_reset_token_user(conn, token) == 7
+    assert consume_reset_token(conn, token) == 7
+    assert consume_reset_token(conn, token) is None
+
+    # A new token replaces the previous one; expired ones are no longer valid
+    first = create_reset_token(conn, 8)
+    second = create_reset_token(conn, 8)
+    assert find_reset_token_user(conn, first) is None
+    for user_id in range(100, 130):
+        create_reset_token(conn, user_id, ttl=-1)
+    assert find_reset_token_user(conn, create_reset_token(conn, 9, ttl=-1)) is None
+    assert sweep_expired_tokens(conn, batch_size=8) == 31
+    assert find_reset_token_user(conn, second) == 8
+    conn.close()
+
+def test_generate_sample_data():
+    """The generator fills every table and cuts weight before competitions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'sample.db')
+        counts = generate_sample_data(db_path, athletes=6, days=200, messages_per_day=1,
+                                      competitions_per_year=6, progress=None)
+        assert counts['athletes'] == 6 and counts['weight_log'] == 6 * 200 * 2
+        assert counts['messages'] > 0 and counts['weekly_assessments'] == 6 * 28
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('SELECT COUNT(*) FROM weight_log').fetchone()[0] == counts['weight_log']
+        user_id, athlete_id, category = conn.execute(
+            'SELECT user_id, id, weight_category FROM athletes ORDER BY id LIMIT 1').fetchone()
+        competition = conn.execute('''
+            SELECT MIN(competition_date) FROM competitions
+            WHERE athlete_id = ? AND competition_date >= DATE('now', '-150 days')
+        ''', (athlete_id,)).fetchone()[0]
+        on_the_day, month_before = conn.execute('''
+            SELECT MAX(CASE WHEN day = :c THEN weight END),
+                   AVG(CASE WHEN day BETWEEN DATE(:c, '-40 days') AND DATE(:c, '-25 days') THEN weight END)
+            FROM weight_log WHERE athlete_id = :a AND timing = 'בוקר'
+        ''', {'c': competition, 'a': user_id}).fetchone()
+        assert on_the_day <= category < month_before
+        conn.close()
+
+def test_sql_profiler_server_timing():
+    """Requests report their SQL time in Server-Timing and in the admin stats"""
+    app = make_app()
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'athlete'
+        response = client.get('/api/weight')
+        assert response.status_code == 200
+        assert response.headers['Server-Timing'].startswith('db;dur=')
+
+        assert client.get('/api/admin/sql_stats').status_code == 403
+        app.config['ADMIN_TOKEN'] = 'test-token'
+        stats = client.get('/api/admin/sql_stats', headers={'X-Admin-Token': 'test-token'}).get_json()
+        assert stats['endpoints']['main.weight_management']['queries'] >= 1
+        assert any('FROM weight_log' in s['sql'] for s in stats['statements'])
+
+def test_metrics_endpoint():
+    """/metrics exposes per-endpoint latency histograms in text format"""
+    app = make_app()
+    with app.test_client() as client:
+        client.post('/api/logout')
+        body = client.get('/metrics').get_data(as_text=True)
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'http_request_duration_seconds_count{endpoint="main.logout",method="POST"}' in body
+        assert 'http_requests_in_flight 1' in body
+
+def test_metrics_shards_follow_live_threads():
+    """A thread's shard is folded into the totals when it exits, so shards do not pile up"""
+    from metrics import MetricsRegistry
+    registry = MetricsRegistry()
+    for _ in range(200):
+        worker = threading.Thread(target=lambda: (registry.inc('requests_total'),
+                                                  registry.observe('latency_seconds', 0.01)))
+        worker.start()
+        worker.join()
+    assert len(registry._shards) <= 1
+    registry.inc('requests_total')
+    body = registry.render()
+    assert 'requests_total 201' in body
+    assert 'latency_seconds_count 200' in body
+
+def test_chat_wait_wakes_on_new_message():
+    """Register/login go through the database and /api/chat/wait returns as soon as a reply is sent"""
+    app = make_app()
+    import uuid
+    suffix = uuid.uuid4().hex[:8]
+    athlete, nutritionist = app.test_client(), app.test_client()
+    for client, role in ((athlete, 'athlete'), (nutritionist, 'nutritionist')):
+        credentials = {'email': f'{role}-{suffix}@example.com', 'password': 'chat-wait-pw'}
+        assert client.post('/api/register', json=dict(credentials, role=role, name=role)).status_code == 201
+        client.post('/api/logout')
+        response = client.post('/api/login', json=credentials)
+        assert response.status_code == 200
+        client.user_id = response.get_json()['user']['id']
+    assert athlete.get('/api/athlete/dashboard').status_code == 200
+
+    url = f'/api/chat/wait?user2_id={nutritionist.user_id}&after_id=0&timeout=0'
+    assert athlete.get(url).get_json()['messages'] == []
+
+    reply = threading.Timer(0.2, lambda: nutritionist.post(
+        '/api/send_message', json={'receiver_id': athlete.user_id, 'content': 'לשתות יותר מים'}))
+    reply.start()
+    started = time.time()
+    body = athlete.get(url.replace('timeout=0', 'timeout=10')).get_json()
+    reply.join()
+    assert time.time() - started < 5
+    assert [m['message'] for m in body['messages']] == ['לשתות יותר מים']
+    assert body['last_id'] == body['messages'][0]['id']
+
+def test_ensure_schema_runs_once_per_file():
+    """Migrations run on the first call for a file; later calls skip it until the file is recreated"""
+    from migrations import ensure_schema, SCHEMA_VERSION
+    db_path = os.path.join(tempfile.mkdtemp(), 'schema.db')
+    assert ensure_schema(db_path)[-1] == SCHEMA_VERSION
+    assert ensure_schema(db_path) == []
+    os.remove(db_path)
+    assert ensure_schema(db_path)[-1] == SCHEMA_VERSION
+
+def test_structured_logging_request_ids():
+    """Every record of a request carries its id; sampled debug details are kept at rate 1"""
+    import io
+    import structured_logging
+    make_app()  # the first app sets up logging
+    stream = io.StringIO()
+    listener = structured_logging.configure_logging(level='INFO', stream=stream, force=True)
+    # Another app (or a plain second call) leaves the running writer and its settings alone
+    app = make_app({'LOG_DEBUG_SAMPLE_RATE': 1.0})
+    assert structured_logging.configure_logging() is listener
+    try:
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+                sess['role'] = 'athlete'
+            response = client.get('/api/get_messages?user2_id=1', headers={'X-Request-ID': 'req-42'})
+            assert response.headers['X-Request-ID'] == 'req-42'
+            generated = client.get('/api/weight', headers={'X-Request-ID': 'bad id!'}).headers['X-Request-ID']
+            assert generated != 'bad id!'
+        structured_logging.stop_logging()
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        tagged = [r for r in records if r.get('request_id') == 'req-42']
+        assert {'messages fetched', 'GET /api/get_messages 200'} <= {r['msg'] for r in tagged}
+        assert any(r['level'] == 'DEBUG' and r['count'] >= 0 for r in tagged)
+        assert any(r.get('request_id') == generated and r['status'] == 200 for r in records)
+    finally:
+        structured_logging.configure_logging(force=True)
+
+def test_weight_sync_is_idempotent():
+    """Re-sending a weigh-in batch inserts nothing; the merged series comes back as columns"""
+    app = make_app()
+    client = app.test_client()
+    user_id = database.create_user(f'sync-{time.time()}@example.com', 'x', 'athlete')
+    conn = database.get_db_connection()
+    # With an athletes row the cohort triggers fire on every weigh-in
+    conn.execute("INSERT INTO athletes (user_id, name) VALUES (?, 'Sync')", (user_id,))
+    conn.commit()
+    conn.close()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = 'athlete'
+
+    batch = [{'ts': 1767250800000, 'day': '2026-01-01', 'weight': 74.2, 'timing': 'בוקר'},
+             {'ts': 1767294000000, 'day': '2026-01-01', 'weight': 75.0, 'timing': 'ערב', 'notes': 'אחרי אימון'}]
+    first = client.post('/api/weight/sync', json={'entries': batch}).get_json()
+    again = client.post('/api/weight/sync', json={'entries': batch}).get_json()
+    assert first['inserted'] == 2 and again['inserted'] == 0
+    assert again['series'] == {'day': ['2026-01-01', '2026-01-01'], 'ts': [1767250800000, 1767294000000],
+                               'weight': [74.2, 75.0], 'timing': ['בוקר', 'ערב'], 'notes': [None, 'אחרי אימון']}
+
+    assert client.post('/api/weight/sync', json={'entries': [{'weight': 70}]}).status_code == 400
+    # A bad entry rejects the batch and is named, so the client can drop it instead of retrying forever
+    for bad in ({'day': 'zzz'}, {'weight': float('nan')}, {'ts': None}, {'ts': 1.5}):
+        response = client.post('/api/weight/sync', json={'entries': [batch[0], dict(batch[1], **bad)]})
+        assert response.status_code == 400 and response.get_json()['index'] == 1
+    assert client.post('/api/weight', json={'weight': 'abc'}).status_code == 400
+    assert client.post('/api/weight', json={'weight': 73, 'date': 'zzz'}).status_code == 400
+    assert client.post('/api/weight', json={'weight': 73, 'date': '2026-01-02'}).status_code == 201
+    assert len(client.get('/api/weight?format=series').get_json()['series']['ts']) == 3
+    assert client.post('/api/weight/sync', json={'entries': 'x'}).status_code == 400
+    too_many = [{'ts': i, 'weight': 70} for i in range(501)]
+    assert client.post('/api/weight/sync', json={'entries': too_many}).status_code == 413
+
+def test_weight_cut_plans():
+    """The planner flags an athlete who hasn't started cutting and one who follows the plan"""
+    from datetime import date, timedelta
+    from migrations import ensure_schema
+    from weight_cut import recompute_plans, plan_trajectory, planned_weights
+    db_path = os.path.join(tempfile.mkdtemp(), 'weight_cut.db')
+    ensure_schema(db_path)
+    today = date.today()
+    competition = today + timedelta(days=10)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    for athlete_id in (1, 2, 3, 4):
+        conn.execute("INSERT INTO users (id, email, password_hash, role) VALUES (?, ?, 'x', 'athlete')",
+                     (athlete_id, f'cut{athlete_id}@example.com'))
+        conn.execute("INSERT INTO athletes (id, user_id, name, weight_category) VALUES (?, ?, 'A', 73)",
+                     (athlete_id, athlete_id))
+        conn.execute("INSERT INTO competitions (athlete_id, name, competition_date, target_weight) VALUES (?, 'X', ?, 73)",
+                     (athlete_id, competition.isoformat()))
+    for back in range(28, -1, -1):
+        day = today - timedelta(days=back)
+        planned = float(planned_weights((competition - day).days, 80.0, 73 * 1.02, 73.0))
+        conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (1, ?, ?, 80.0)',
+                     (day.isoformat(), back))
+        conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (2, ?, ?, ?)',
+                     (day.isoformat(), back, round(planned, 1)))
+    # Athlete 4 last weighed in at walk-around weight, before the cut started
+    for back in range(22, 15, -1):
+        conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (4, ?, ?, 80.0)',
+                     ((today - timedelta(days=back)).isoformat(), back))
+    conn.commit()
+
+    assert recompute_plans(conn, today) == 4
+    plans = {row['athlete_id']: row for row in conn.execute('SELECT * FROM weight_cut_plans')}
+    assert plans[1]['status'] == 'behind' and plans[1]['deviation'] > 3
+    assert plans[2]['status'] == 'on_track' and plans[2]['start_weight'] == 80.0
+    assert plans[3]['status'] == 'no_data'
+    assert plans[4]['status'] == 'on_track' and plans[4]['deviation'] == 0.0
+    trajectory = plan_trajectory(plans[2])
+    assert trajectory[-1] == {'day': competition.isoformat(), 'planned': 73.0}
+    conn.close()
+
+def test_anomaly_alerts_incremental():
+    """A sudden weight jump and a bad night raise alerts; an incremental rescan only touches athletes with new data"""
+    from datetime import date, timedelta
+    from migrations import ensure_schema
+    from anomaly_alerts import run_scan
+    db_path = os.path.join(tempfile.mkdtemp(), 'alerts.db')
+    ensure_schema(db_path)
+    today = date.today()
+    conn = sqlite3.connect(db_path)
+    for athlete_id in (1, 2):
+        conn.execute("INSERT INTO users (id, email, password_hash, role) VALUES (?, ?, 'x', 'athlete')",
+                     (athlete_id, f'alert{athlete_id}@example.com'))
+        conn.execute("INSERT INTO athletes (id, user_id, name) VALUES (?, ?, 'A')", (athlete_id, athlete_id))
+    for back in range(40, -1, -1):
+        day = today - timedelta(days=back)
+        for athlete_id in (1, 2):
+            weight = 70.0 + (0.2 if back % 2 else -0.2)
+            if athlete_id == 1 and back == 1:
+                weight += 2.5
+            conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (?, ?, ?, ?)',
+                         (athlete_id, day.isoformat(), 100 - back, weight))
+    for week in range(10, -1, -1):
+        answers = {'sleepHours': '7-8' if week else 'less-than-6', 'sleepQuality': 4, 'appetite': 3}
+        conn.execute('INSERT INTO weekly_assessments (athlete_id, responses, completed_at) VALUES (2, ?, ?)',
+                     (json.dumps(answers), f'{today - timedelta(weeks=week)} 21:00:00'))
+    conn.commit()
+
+    assert run_scan(conn, full=True, today=today, chunk_size=1)['chunks'] == 2
+    alerts = conn.execute('SELECT athlete_id, metric, day FROM athlete_alerts ORDER BY athlete_id, day').fetchall()
+    yesterday = (today - timedelta(days=1)).isoformat()
+    assert (1, 'weight_change', yesterday) in alerts
+    assert (2, 'sleep_hours', today.isoformat()) in alerts
+    assert not [a for a in alerts if a[0] == 2 and a[1] == 'weight_change']
+
+    assert run_scan(conn, today=today)['athletes'] == 0
+    conn.execute("UPDATE athlete_alerts SET acknowledged_at = CURRENT_TIMESTAMP WHERE athlete_id = 1")
+    conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (1, ?, 101, 70.1)', (today.isoformat(),))
+    conn.commit()
+    assert run_scan(conn, today=today)['athletes'] == 1
+    assert conn.execute('SELECT COUNT(*) FROM athlete_alerts WHERE acknowledged_at IS NOT NULL').fetchone()[0] >= 1
+    conn.close()
+
+def test_cohort_rollups_incremental():
+    """Rollups follow new weigh-ins and profile changes through the dirty-week queue"""
+    from datetime import date, timedelta
+    from migrations import ensure_schema
+    from cohort_rollups import refresh_rollups
+    db_path = os.path.join(tempfile.mkdtemp(), 'cohorts.db')
+    ensure_schema(db_path)
+    monday = date.today() - timedelta(days=date.today().weekday())
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    for athlete_id, gender, drop in ((1, 'male', 1.0), (2, 'male', 3.0), (3, 'female', 0.5)):
+        conn.execute("INSERT INTO users (id, email, password_hash, role) VALUES (?, ?, 'x', 'athlete')",
+                     (athlete_id, f'cohort{athlete_id}@example.com'))
+        conn.execute("INSERT INTO athletes (id, user_id, name, gender, weight_category) VALUES (?, ?, 'A', ?, 73)",
+                     (athlete_id, athlete_id, gender))
+        conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (?, ?, 1, 75)',
+                     (athlete_id, (monday - timedelta(days=7)).isoformat()))
+        conn.execute('INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (?, ?, 2, ?)',
+                     (athlete_id, monday.isoformat(), 75 - drop))
+    conn.execute("INSERT INTO weekly_assessments (athlete_id, responses, completed_at) VALUES (1, ?, ?)",
+                 (json.dumps({'sleepHours': '7-8', 'appetite': 4}), f'{monday} 21:00:00'))
+    conn.commit()
+
+    assert refresh_rollups(conn)['weeks'] == 3
+    def cohort(dimension, label):
+        return conn.execute('SELECT * FROM cohort_weekly WHERE dimension = ? AND cohort = ? AND week_start = ?',
+                            (dimension, label, monday.isoformat())).fetchone()
+    assert cohort('gender', 'male')['weight_delta_mean'] == -2.0
+    assert cohort('all', 'all')['weight_delta_median'] == -1.0
+    assert cohort('weight_category', '73')['sleep_hours'] == 7.5
+    assert refresh_rollups(conn) == {'athlete_weeks': 0, 'weeks': 0}
+
+    conn.execute("UPDATE athletes SET gender = 'female' WHERE id = 2")
+    conn.commit()
+    refresh_rollups(conn)
+    assert cohort('gender', 'male')['athletes'] == 1
+    assert cohort('gender', 'female')['weight_delta_mean'] == -1.75
+    conn.close()
+
+def test_chat_search_scoped_to_own_conversations():
+    """FTS search finds Hebrew words with prefixes, only in the caller's conversations"""
+    app = make_app()
+    client = app.test_client()
+    ids = []
+    for name in ('coach', 'athlete', 'other'):
+        email = f'search-{name}-{time.time()}@example.com'
+        client.post('/api/register', json={'email': email, 'password': 'pw123456', 'role': 'athlete', 'name': name})
+        ids.append(database.get_user_by_email(email)['id'])
+    coach, athlete, other = ids
+    database.add_message(coach, athlete, 'תזכורת: והקריאטין אחרי האימון, 5 גרם <b>', None)
+    database.add_message(coach, other, 'קריאטין רק בעונה', None)
+    database.add_message(athlete, coach, 'Creatine before or after?', None)
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = athlete
+        sess['role'] = 'athlete'
+    response = client.get('/api/chat/search?q=קריאטין')
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert len(results) == 1 and results[0]['receiver_id'] == athlete
+    assert '<mark>קריאטין</mark>' in results[0]['snippet'] and '&lt;b&gt;' in results[0]['snippet']
+    assert len(client.get('/api/chat/search?q=CREATINE').get_json()['results']) == 1
+    assert client.get(f'/api/chat/search?q=creatine&user2_id={other}').get_json()['results'] == []
+    assert client.get('/api/chat/search?q=5').status_code == 400
+
+def test_nutritionist_athlete_search():
+    """Prefix search, filters and pagination of /api/nutritionist/athletes"""
+    app = make_app()
+    from datetime import date, timedelta
+    client = app.test_client()
+    stamp = int(time.time() * 1000)
+    nutritionist = database.create_user(f'search-coach-{stamp}@example.com', 'x', 'nutritionist')
+    athletes = (('Zz Maor', 'national'), ('zz Maya', 'junior'), ('Zz Noa', 'national'))
+    user_ids = [database.create_user(f'zz{stamp}-{i}@example.com', 'x', 'athlete') for i in range(len(athletes))]
+    conn = database.get_db_connection()
+    ids = []
+    for user_id, (name, level) in zip(user_ids, athletes):
+        athlete_id = conn.execute("INSERT INTO athletes (user_id, name, weight_category, sport_level) VALUES (?, ?, 57, ?)",
+                                  (user_id, f'{name} {stamp}', level)).lastrowid
+        ids.append((user_id, athlete_id))
+    conn.execute("INSERT INTO competitions (athlete_id, name, competition_date) VALUES (?, 'X', ?)",
+                 (ids[2][1], (date.today() + timedelta(days=5)).isoformat()))
+    conn.execute("INSERT INTO messages (sender_id, receiver_id, role, message) VALUES (?, ?, 'athlete', 'hi')",
+                 (ids[1][0], nutritionist))
+    conn.commit()
+    conn.close()
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = nutritionist
+        sess['role'] = 'nutritionist'
+    def names(query):
+        response = client.get(f'/api/nutritionist/athletes?{query}')
+        assert response.status_code == 200
+        return [a['name'].split()[1] for a in response.get_json()['athletes']]
+    assert names('q=zz ma') == ['Maor', 'Maya']
+    assert names(f'q=ZZ{stamp}-2') == ['Noa']
+    assert names('q=zz&sport_level=national&weight_category=57') == ['Maor', 'Noa']
+    assert names('q=zz&competition_within=7') == ['Noa']
+    assert names('q=zz&has_unread=1') == ['Maya']
+    page = client.get('/api/nutritionist/athletes?q=zz&limit=2').get_json()
+    assert page['has_more'] and page['next_offset'] == 2
+    assert client.get('/api/nutritionist/athletes?competition_within=-1').status_code == 400
+
+def test_message_archive_paging():
+    """Old read messages move to the archive file; paging back merges them with the hot history"""
+    from datetime import datetime, timedelta, timezone
+    from migrations import ensure_schema
+    from message_archive import archive_messages, conversation_page, default_archive_path
+    from chat_search import search_messages
+    from read_watermarks import mark_read
+    db_path = os.path.join(tempfile.mkdtemp(), 'chat.db')
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    for user_id in (1, 2):
+        conn.execute("INSERT INTO users (id, email, password_hash, role) VALUES (?, ?, 'x', 'athlete')",
+                     (user_id, f'archive{user_id}@example.com'))
+    now = datetime.now(timezone.utc)
+    def stamp(days_ago):
+        return (now - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
+    # The recent ones are inserted out of time order, like sample_data does
+    for days_ago in (400, 390, 380, 370, 360, 300, 2, 4, 1, 3):
+        conn.execute("INSERT INTO messages (sender_id, receiver_id, role, message, timestamp) "
+                     "VALUES (1, 2, 'athlete', ?, ?)", (f'creatine day {days_ago}', stamp(days_ago)))
+    # Read up to the 360-day-old message; the 300-day-old one is unread
+    mark_read(conn, 2, 1, up_to_id=5)
+    conn.commit()
+
+    archive_path = default_archive_path(db_path)
+    assert archive_messages(conn, archive_path, older_than_days=180, batch_size=2) == 5
+    assert archive_messages(conn, archive_path, older_than_days=180) == 0
+    # The unread old message stays hot
+    assert conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0] == 5
+    archive = sqlite3.connect(archive_path)
+    assert archive.execute('SELECT COUNT(*) FROM messages').fetchone()[0] == 5
+    archive.close()
+
+    first = conversation_page(conn, 1, 2, limit=4)
+    assert [row['message'] for row in first] == [f'creatine day {d}' for d in (1, 2, 3, 4)]
+    last = first[-1]
+    second = conversation_page(conn, 1, 2, limit=4, before=(last['timestamp'], last['id']))
+    assert [row['message'] for row in second] == [f'creatine day {d}' for d in (300, 360, 370, 380)]
+    last = second[-1]
+    third = conversation_page(conn, 1, 2, limit=4, before=(last['timestamp'], last['id']))
+    assert [row['message'] for row in third] == ['creatine day 390', 'creatine day 400']
+    # Archived rows have left the search index
+    results, _, _ = search_messages(conn, 1, 'creatine')
+    assert len(results) == 5
+    conn.close()
+
+def test_chunked_attachment_upload():
+    """Chunks in any order, dedup by content hash, access control, Range download and thumbnail"""
+    import io
+    from PIL import Image
+    from attachments import CHUNK_SIZE
+    upload_folder = tempfile.mkdtemp()
+    client = make_app({'UPLOAD_FOLDER': upload_folder}).test_client()
+    stamp = int(time.time() * 1000)
+    sender, receiver, outsider = (database.create_user(f'attach-{name}-{stamp}@example.com', 'x', 'athlete')
+                                  for name in ('sender', 'receiver', 'outsider'))
+    buffer = io.BytesIO()
+    Image.effect_noise((1400, 1000), 64).convert('RGB').save(buffer, 'PNG')
+    photo = buffer.getvalue()
+    assert len(photo) > 2 * CHUNK_SIZE
+
+    def login(user_id):
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['role'] = 'athlete'
+    def upload(data):
+        started = client.post('/api/uploads', json={'filename': 'meal.png', 'size': len(data),
+                                                    'content_type': 'image/png'}).get_json()
+        chunks = list(range(started['chunks']))
+        for index in reversed(chunks):
+            body = data[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+            status = client.put(f"/api/uploads/{started['upload_id']}/chunks/{index}", data=body).get_json()
+            if index == chunks[-1]:
+                # Resending a chunk is harmless; the status lists what arrived
+                client.put(f"/api/uploads/{started['upload_id']}/chunks/{index}", data=body)
+                assert client.get(f"/api/uploads/{started['upload_id']}").get_json()['received'] == [index]
+        return started['upload_id'], status
+
+    login(sender)
+    assert client.post('/api/uploads', json={'filename': 'x.svg', 'size': 10,
+                                             'content_type': 'image/svg+xml'}).status_code == 415
+    upload_id, status = upload(photo)
+    assert status['complete']
+    sha256 = status['attachment']
+    _, again = upload(photo)
+    assert again['attachment'] == sha256
+    assert os.listdir(os.path.join(upload_folder, 'blobs', sha256[:2])) == [sha256]
+    assert client.post('/api/send_message', json={'receiver_id': receiver, 'upload_id': upload_id}).status_code == 200
+
+    login(outsider)
+    assert client.get(f'/api/attachments/{sha256}').status_code == 404
+    login(receiver)
+    ranged = client.get(f'/api/attachments/{sha256}', headers={'Range': 'bytes=100-199'})
+    assert ranged.status_code == 206 and ranged.data == photo[100:200]
+    assert ranged.headers['ETag'] == f'"{sha256}"'
+    messages = client.get(f'/api/get_messages?user2_id={sender}').get_json()['messages']
+    assert messages[0]['message_type'] == 'image' and json.loads(messages[0]['context'])['attachment'] == sha256
+
+    deadline = time.time() + 30
+    thumbnail = client.get(f'/api/attachments/{sha256}/thumbnail')
+    while thumbnail.status_code == 202 and time.time() < deadline:
+        time.sleep(0.1)
+        thumbnail = client.get(f'/api/attachments/{sha256}/thumbnail')
+    assert thumbnail.status_code == 200 and thumbnail.mimetype == 'image/jpeg'
+    assert max(Image.open(io.BytesIO(thumbnail.data)).size) == 320
+
+def test_read_watermarks():
+    """Marking read moves one watermark; unread counts and is_read follow it"""
+    app = make_app()
+    client = app.test_client()
+    stamp = int(time.time() * 1000)
+    reader, writer, other = (database.create_user(f'read-{name}-{stamp}@example.com', 'x', 'athlete')
+                             for name in ('reader', 'writer', 'other'))
+    ids = [database.add_message(writer, reader, f'message {i}', None) for i in range(5)]
+    database.add_message(other, reader, 'hello', None)
+    database.add_message(reader, writer, 'reply', None)
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = reader
+        sess['role'] = 'athlete'
+    unread = client.get('/api/chat/unread').get_json()
+    assert unread['total'] == 6 and unread['by_sender'] == {str(writer): 5, str(other): 1}
+
+    response = client.post('/api/chat/read', json={'user2_id': writer, 'last_read_id': ids[2]})
+    assert response.get_json()['last_read_id'] == ids[2]
+    # Watermarks never move back, nor past the newest message
+    assert client.post('/api/chat/read', json={'user2_id': writer, 'last_read_id': ids[0]}).get_json()['last_read_id'] == ids[2]
+    assert client.get('/api/chat/unread').get_json()['by_sender'] == {str(writer): 2, str(other): 1}
+    # Search reports the same read state as the conversation
+    found = client.get(f'/api/chat/search?q=message&user2_id={writer}').get_json()['results']
+    assert {r['id']: bool(r['is_read']) for r in found} == {
+        ids[0]: True, ids[1]: True, ids[2]: True, ids[3]: False, ids[4]: False}
+    messages = client.get(f'/api/get_messages?user2_id={writer}').get_json()['messages']
+    assert {m['id']: m['is_read'] for m in messages if m['sender_id'] == writer} == {
+        ids[0]: True, ids[1]: True, ids[2]: True, ids[3]: False, ids[4]: False}
+
+    assert client.post('/api/chat/read', json={'user2_id': writer, 'last_read_id': 10 ** 12}).get_json()['last_read_id'] == ids[4]
+    assert client.get('/api/chat/unread').get_json() == {'success': True, 'total': 1, 'by_sender': {str(other): 1}}
+    conn = database.get_db_connection()
+    # The sender's own rows were never updated
+    assert conn.execute('SELECT MAX(is_read) FROM messages WHERE sender_id = ?', (writer,)).fetchone()[0] == 0
+    conn.close()
+
+def test_job_queue_lease_retry_and_worker():
+    """Jobs are leased by priority, retried with backoff, fenced by lease token, and run by the worker pool"""
+    import job_queue
+    from migrations import migrate
+
+    def flaky(db_path, n):
+        if n == 2:
+            return 1 / 0
+    job_queue.HANDLERS['test_flaky'] = flaky
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'jobs.db')
+        conn = sqlite3.connect(db_path)
+        migrate(conn)
+        with conn:
+            job_queue.enqueue(conn, 'test_flaky', {'n': 1})
+            job_queue.enqueue(conn, 'test_flaky', {'n': 2}, priority=5, max_attempts=2)
+            assert job_queue.enqueue(conn, 'test_flaky', {'n': 3}, dedupe_key='once') is not None
+            assert job_queue.enqueue(conn, 'test_flaky', {'n': 3}, dedupe_key='once') is None
+
+        token, jobs = job_queue.lease(conn, limit=1)
+        assert [job['payload']['n'] for job in jobs] == [2]  # highest priority first
+        job_queue.record_results(conn, token, list(zip(jobs, job_queue.run_jobs(db_path, jobs))))
+        assert conn.execute("SELECT status, attempts FROM jobs WHERE id = ?", (jobs[0]['id'],)).fetchone() == ('queued', 1)
+
+        # A lease that ran out is handed out again; the first worker's late result is ignored
+        stale_token, stale = job_queue.lease(conn, limit=1, lease_seconds=-1)
+        token, jobs = job_queue.lease(conn, limit=10)
+        assert {job['payload']['n'] for job in jobs} == {1, 3}
+        job_queue.record_results(conn, stale_token, [(job, None) for job in stale])
+        assert conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0] == 3
+        job_queue.record_results(conn, token, [(job, None) for job in jobs])
+
+        # The flaky job gives up after max_attempts (backoff skipped)
+        conn.execute('UPDATE jobs SET available_at = 0')
+        conn.commit()
+        worker = job_queue.Worker(db_path, processes=0)
+        assert worker.run_once(conn) == 1
+        assert conn.execute('SELECT status, last_error FROM jobs').fetchall() == [('dead', 'ZeroDivisionError: division by zero')]
+
+        # Worker with a process pool, stopped once the queue is empty
+        with conn:
+            job_queue.enqueue_many(conn, [('noop', {'i': i}, 0) for i in range(50)])
+        worker = job_queue.Worker(db_path, processes=1, batch_size=20, poll_interval=0.05)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        deadline = time.time() + 30
+        while worker.processed < 50 and time.time() < deadline:
+            time.sleep(0.05)
+        worker.stop()
+        thread.join(timeout=30)
+        assert worker.processed == 50
+        assert job_queue.queue_stats(conn) == {('default', 'dead'): (1, 0)}
+        conn.close()
+
+def test_rate_limits():
+    """Token buckets per IP and account answer 429 with Retry-After; the SQLite storage is shared"""
+    from rate_limit import SQLiteBuckets
+    limited_app = make_app({'RATE_LIMITS': {'login': {'ip': '5/minute', 'account': '2/minute'},
+                                              'send_message': {'user': '3/hour'}}})
+    client = limited_app.test_client()
+    attempt = lambda email, ip='10.9.0.1': client.post('/api/login', json={'email': email, 'password': 'wrong'},
+                                                       environ_base={'REMOTE_ADDR': ip})
+    assert [attempt('Victim@example.com').status_code for _ in range(2)] == [401, 401]
+    blocked = attempt(' victim@example.com')
+    assert blocked.status_code == 429 and 1 <= int(blocked.headers['Retry-After']) <= 30
+    # Another account from the same IP until the IP bucket is empty; other IPs are not affected
+    assert [attempt('other@example.com').status_code for _ in range(3)] == [401, 401, 429]
+    # Denied by the IP bucket: the targeted account's bucket is left alone
+    assert [attempt('fresh@example.com').status_code for _ in range(3)] == [429, 429, 429]
+    assert [attempt('fresh@example.com', ip='10.9.0.3').status_code for _ in range(2)] == [401, 401]
+    assert attempt('someone@example.com', ip='10.9.0.2').status_code == 401
+
+    stamp = int(time.time() * 1000)
+    sender, other_sender, receiver = (database.create_user(f'limit-{name}-{stamp}@example.com', 'x', 'athlete')
+                                      for name in ('sender', 'other', 'receiver'))
+    def send(user_id):
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['role'] = 'athlete'
+        return client.post('/api/send_message', json={'receiver_id': receiver, 'content': 'hi'}).status_code
+    assert [send(sender) for _ in range(4)] == [200, 200, 200, 429]
+    assert send(other_sender) == 200
+
+    # Two workers with the same storage file draw from the same bucket
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rate_limits.db')
+        first, second = SQLiteBuckets(path), SQLiteBuckets(path)
+        assert first.take('k', 2, 1, now=100.0) == 0 and second.take('k', 2, 1, now=100.0) == 0
+        assert first.take('k', 2, 1, now=100.5) == 0.5
+        assert second.take('k', 2, 1, now=101.0) == 0
+        assert len(first) == 1
+
+def test_fragment_cache_versions_from_database():
+    """Data versions follow writes from any connection; the cache is bounded in UTF-8 bytes"""
+    from fragment_cache import DataVersions, FragmentCache
+    from migrations import ensure_schema
+    db_path = os.path.join(tempfile.mkdtemp(), 'versions.db')
+    ensure_schema(db_path)
+    versions = DataVersions(db_path)
+    assert versions.get('roster') == 0
+
+    # Another process writing to the file: the triggers bump the versions
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, password_hash, role) VALUES (5, 'v@example.com', 'x', 'athlete')")
+    conn.execute("INSERT INTO athletes (id, user_id, name) VALUES (9, 5, 'A')")
+    conn.commit()
+    roster, athlete = versions.get('roster'), versions.get('athlete', 5)
+    conn.execute("INSERT INTO weight_log (athlete_id, day, ts, weight) VALUES (5, '2026-01-01', 1, 70)")
+    conn.commit()
+    assert versions.get('roster') == roster + 1 and versions.get('athlete', 5) == athlete + 1
+    conn.execute("INSERT INTO weekly_assessments (athlete_id, responses) VALUES (9, '{}')")
+    conn.commit()
+    assert versions.get('athlete', 5) == athlete + 2
+    assert versions.bump('athlete', 5) == athlete + 3
+    conn.close()
+
+    cache = FragmentCache(max_entries=10, max_bytes=100)
+    cache.set('a', 'ש' * 40)  # 80 bytes
+    cache.set('b', 'x' * 30)
+    assert cache.get('a') is None and cache.stats()['bytes'] == 30
+
+    # The loader behind a fragment only runs on a miss; a version is read once per request
+    from flask import render_template_string
+    import fragment_cache
+    app = make_app()
+    loads, reads = [], []
+    versions = fragment_cache.data_versions
+    def counted_get(*scope):
+        reads.append(scope)
+        return type(versions).get(versions, *scope)
+    versions.get = counted_get
+    template = ("{% cache 'names', data_version('roster') %}{{ load()|join(',') }}{% endcache %}"
+                "{% cache 'count', data_version('roster') %}{{ load()|length }}{% endcache %}")
+    def render():
+        with app.test_request_context():
+            return render_template_string(template, load=lambda: loads.append(1) or ['Noa', 'Maya'])
+    try:
+        assert render() == 'Noa,Maya2' and len(loads) == 2 and len(reads) == 1
+        assert render() == 'Noa,Maya2' and len(loads) == 2
+        database.create_user('roster@example.com', 'x', 'athlete')
+        assert render() == 'Noa,Maya2' and len(loads) == 4
+    finally:
+        del versions.get
+
 if __name__ == "__main__":
     try:
         print("🚀 Starting API tests...")
@@ -122,6 +883,28 @@ if __name__ == "__main__":
         
         test_forgot_password_api()
         test_reset_password_api()
+        test_mail_outbox_delivery_and_retry()
+        test_mail_outbox_survives_transport_errors()
+        test_reset_tokens_expire_and_are_single_use()
+        test_generate_sample_data()
+        test_sql_profiler_server_timing()
+        test_metrics_endpoint()
+        test_metrics_shards_follow_live_threads()
+        test_chat_wait_wakes_on_new_message()
+        test_ensure_schema_runs_once_per_file()
+        test_structured_logging_request_ids()
+        test_weight_sync_is_idempotent()
+        test_weight_cut_plans()
+        test_anomaly_alerts_incremental()
+        test_cohort_rollups_incremental()
+        test_chat_search_scoped_to_own_conversations()
+        test_nutritionist_athlete_search()
+        test_message_archive_paging()
+        test_chunked_attachment_upload()
+        test_read_watermarks()
+        test_job_queue_lease_retry_and_worker()
+        test_rate_limits()
+        test_fragment_cache_versions_from_database()
         
         print("\n✅ All tests completed!")
         
@@ -2,40 +2,27 @@
 """
 Script to upgrade the messages table structure
 Adds missing columns to match the new schema
+
+The actual upgrade steps now live in migrations.py (versioned with
+PRAGMA user_version); this script runs them and prints the result.
 """
 
-from database import get_db_connection
+import sqlite3
+
+from database import DATABASE
+from migrations import migrate, get_schema_version
 
 def upgrade_messages_table():
     """Upgrade messages table to include all required columns"""
     
-    # Define required columns and their definitions
-    required_columns = {
-        'message_type': "TEXT DEFAULT 'text'",
-        'context': "TEXT",
-        'is_read': "BOOLEAN DEFAULT 0"
-    }
-
-    conn = get_db_connection()
+    # A plain connection: get_db_connection() would already have migrated the file
+    conn = sqlite3.connect(DATABASE)
     cursor = conn.cursor()
 
     try:
-        # Get existing columns
-        cursor.execute("PRAGMA table_info(messages)")
-        existing_columns = [row[1] for row in cursor.fetchall()]
-        
-        print(f"Existing columns: {existing_columns}")
-        
-        # Add missing columns
-        for column_name, column_def in required_columns.items():
-            if column_name not in existing_columns:
-                alter_sql = f"ALTER TABLE messages ADD COLUMN {column_name} {column_def}"
-                cursor.execute(alter_sql)
-                print(f"✅ Added column: {column_name}")
-            else:
-                print(f"✅ Column already exists: {column_name}")
-
-        conn.commit()
+        applied = migrate(conn, verbose=True)
+        if not applied:
+            print(f"✅ Schema already at version {get_schema_version(conn)}")
         print("✅ Messages table upgrade completed successfully!")
         
         # Verify final structure
@@ -47,9 +34,8 @@ def upgrade_messages_table():
             
     except Exception as e:
         print(f"❌ Error upgrading table: {e}")
-        conn.rollback()
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    upgrade_messages_table() 
\ No newline at end of file
+    upgrade_messages_table() 
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Competition weight-cut planner
+
+For every athlete with an upcoming competition, plans a daily target
+weight and compares it with their morning weigh-ins:
+
+- more than CUT_DAYS before the competition: hold the walk-around weight
+  (median morning weight of the week before the cut starts);
+- diet phase: linear descent to the diet target, target_weight plus
+  WATER_CUT_FRACTION, reached WATER_CUT_DAYS before the competition;
+- water cut: linear from the diet target down to target_weight on
+  competition day.
+
+recompute_plans() loads the roster's recent weigh-ins into one
+athletes x days NumPy matrix and evaluates the whole roster at once.
+It then rewrites weight_cut_plans, which the nutritionist competitions
+API reads. Meant to run nightly:
+
+    python weight_cut.py [db_path]
+
+Statuses: on_track, behind (heavier than planned by more than the
+tolerance), ahead (lighter than planned: cutting too fast), no_data.
+The latest weigh-in is judged against the plan for the day it was
+taken, not against today's planned weight.
+"""
+
+import sys
+import time
+import warnings
+from datetime import date, timedelta
+
+CUT_DAYS = 21
+WATER_CUT_DAYS = 2
+WATER_CUT_FRACTION = 0.02
+# Days of weigh-ins before the cut used for the walk-around weight
+BASELINE_DAYS = 7
+# Allowed deviation from the plan: max(TOLERANCE_KG, TOLERANCE_FRACTION * target)
+TOLERANCE_KG = 0.5
+TOLERANCE_FRACTION = 0.01
+
+STATUSES = ('on_track', 'behind', 'ahead', 'no_data')
+
+
+def planned_weights(days_to, start_weight, diet_target, target_weight):
+    """Planned weight at days_to days before the competition (NumPy arrays broadcast)"""
+    import numpy as np  # deferred: only the planner needs NumPy
+
+    days_to = np.asarray(days_to, dtype=float)
+    diet_progress = np.clip((CUT_DAYS - days_to) / (CUT_DAYS - WATER_CUT_DAYS), 0, 1)
+    water_progress = np.clip((WATER_CUT_DAYS - days_to) / WATER_CUT_DAYS, 0, 1)
+    diet = start_weight - (start_weight - diet_target) * diet_progress
+    return np.where(days_to > WATER_CUT_DAYS, diet,
+                    diet_target - (diet_target - target_weight) * water_progress)
+
+
+def load_roster(conn, today):
+    """Next competition per athlete: [(athlete_id, user_id, competition_id, date, target_weight)]"""
+    return conn.execute('''
+        SELECT c.athlete_id, a.user_id, c.id, c.competition_date,
+               COALESCE(c.target_weight, c.weight_category, a.target_weight, a.weight_category)
+        FROM competitions c
+        JOIN athletes a ON a.id = c.athlete_id
+        WHERE c.competition_date >= ?
+          AND c.competition_date = (
+              SELECT MIN(competition_date) FROM competitions
+              WHERE athlete_id = c.athlete_id AND competition_date >= ?
+          )
+        GROUP BY c.athlete_id
+        HAVING COALESCE(c.target_weight, c.weight_category, a.target_weight, a.weight_category) IS NOT NULL
+        ORDER BY c.athlete_id
+    ''', (today.isoformat(), today.isoformat())).fetchall()
+
+
+def morning_matrix(conn, user_ids, first_day, days):
+    """len(user_ids) x days matrix of each day's first weigh-in (NaN where missing)"""
+    import numpy as np
+
+    matrix = np.full((len(user_ids), days), np.nan)
+    if not user_ids:
+        return matrix
+    row_of = {user_id: i for i, user_id in enumerate(user_ids)}
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS plan_users (user_id INTEGER PRIMARY KEY)')
+    conn.execute('DELETE FROM plan_users')
+    conn.executemany('INSERT INTO plan_users (user_id) VALUES (?)', [(u,) for u in user_ids])
+    # With MIN(ts), SQLite returns the weight of the day's earliest row; groups follow the primary key
+    rows = conn.execute('''
+        SELECT w.athlete_id, CAST(julianday(w.day) - julianday(?) AS INTEGER), w.weight, MIN(w.ts)
+        FROM weight_log w JOIN plan_users p ON p.user_id = w.athlete_id
+        WHERE w.day >= ? AND w.day < ?
+        GROUP BY w.athlete_id, w.day
+    ''', (first_day.isoformat(), first_day.isoformat(), (first_day + timedelta(days=days)).isoformat())).fetchall()
+    conn.execute('DELETE FROM plan_users')
+    if rows:
+        athlete_ids, columns, weights, _ = zip(*rows)
+        matrix[[row_of[u] for u in athlete_ids], columns] = weights
+    return matrix
+
+
+def compute_plans(roster, matrix, first_day, today):
+    """Evaluate the whole roster at once; returns rows for weight_cut_plans"""
+    import numpy as np
+
+    if not roster:
+        return []
+    window = matrix.shape[1]
+    offsets = np.arange(window)  # column j is first_day + j
+    today_col = (today - first_day).days
+    comp_cols = np.array([(date.fromisoformat(r[3]) - first_day).days for r in roster])
+    target = np.array([r[4] for r in roster], dtype=float)
+    diet_target = target * (1 + WATER_CUT_FRACTION)
+
+    # Walk-around weight: median of the week before the cut starts (or before today, if later)
+    baseline_end = np.minimum(comp_cols - CUT_DAYS, today_col + 1)[:, None]
+    in_baseline = (offsets < baseline_end) & (offsets >= baseline_end - BASELINE_DAYS)
+    seen = ~np.isnan(matrix)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows: no weigh-ins before the cut
+        baseline = np.nanmedian(np.where(in_baseline, matrix, np.nan), axis=1)
+
+    # Latest weigh-in per athlete
+    has_data = seen.any(axis=1)
+    last_col = window - 1 - np.argmax(seen[:, ::-1], axis=1)
+    latest = matrix[np.arange(len(roster)), last_col]
+    start = np.where(np.isnan(baseline), latest, baseline)
+
+    days_to = comp_cols - today_col
+    planned = planned_weights(days_to, start, diet_target, target)
+    # The latest weigh-in may be days old: compare it with the plan for its own day
+    deviation = latest - planned_weights(comp_cols - last_col, start, diet_target, target)
+    tolerance = np.maximum(TOLERANCE_KG, TOLERANCE_FRACTION * target)
+    status = np.select(
+        [~has_data, deviation > tolerance, deviation < -tolerance],
+        ['no_data', 'behind', 'ahead'], default='on_track'
+    )
+    # Loss per day still needed to make the diet target before the water cut
+    required = (latest - diet_target) / np.maximum(days_to - WATER_CUT_DAYS, 1)
+
+    def value(array, i, digits=2):
+        return None if not has_data[i] or np.isnan(array[i]) else round(float(array[i]), digits)
+
+    plans = []
+    for i, (athlete_id, _user_id, competition_id, competition_date, _target) in enumerate(roster):
+        plans.append((
+            athlete_id, competition_id, competition_date, value(start, i), round(float(diet_target[i]), 2),
+            round(float(target[i]), 2),
+            (first_day + timedelta(days=int(last_col[i]))).isoformat() if has_data[i] else None,
+            value(latest, i), value(planned, i), value(deviation, i), value(required, i, 3),
+            str(status[i]), today.isoformat()
+        ))
+    return plans
+
+
+def recompute_plans(conn, today=None):
+    """Rewrite weight_cut_plans for every athlete with an upcoming competition; returns the row count"""
+    today = today or date.today()
+    roster = load_roster(conn, today)
+    # Oldest column needed: the baseline week before a cut that started CUT_DAYS ago
+    first_day = today - timedelta(days=CUT_DAYS + BASELINE_DAYS)
+    matrix = morning_matrix(conn, [r[1] for r in roster], first_day, (today - first_day).days + 1)
+    plans = compute_plans(roster, matrix, first_day, today)
+    with conn:
+        conn.execute('DELETE FROM weight_cut_plans')
+        conn.executemany('''
+            INSERT INTO weight_cut_plans (athlete_id, competition_id, competition_date, start_weight,
+                                          diet_target, target_weight, latest_day, latest_weight,
+                                          planned_today, deviation, required_per_day, status, computed_on)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', plans)
+    return len(plans)
+
+
+def plan_trajectory(plan):
+    """Daily planned weights from the start of the cut to competition day for one plan row"""
+    competition_day = date.fromisoformat(plan['competition_date'])
+    days_to = list(range(CUT_DAYS + BASELINE_DAYS, -1, -1))
+    start = plan['start_weight'] if plan['start_weight'] is not None else plan['diet_target']
+    weights = planned_weights(days_to, start, plan['diet_target'], plan['target_weight'])
+    return [
+        {'day': (competition_day - timedelta(days=d)).isoformat(), 'planned': round(float(w), 2)}
+        for d, w in zip(days_to, weights)
+    ]
+
+
+def main(argv):
+    from database import DATABASE, get_db_connection
+
+    db_path = argv[1] if len(argv) > 1 else DATABASE
+    conn = get_db_connection(db_path)
+    started = time.perf_counter()
+    count = recompute_plans(conn)
+    elapsed = time.perf_counter() - started
+    summary = dict(conn.execute('SELECT status, COUNT(*) FROM weight_cut_plans GROUP BY status').fetchall())
+    conn.close()
+    print(f"🏆 Planned {count} upcoming competitions in {elapsed:.2f}s")
+    for status in STATUSES:
+        print(f"   {status}: {summary.get(status, 0)}")
+
+
+if __name__ == '__main__':
+    main(sys.argv)